@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Mapping, Sequence, Tuple
+
+from .concurrency import CapacityExceeded
+from .metrics import ADMISSION_REJECTED
+
+# Weight of the latest request in the moving average of hold times used for Retry-After.
+HOLD_TIME_SMOOTHING = 0.2
+
+
+class QueueFull(CapacityExceeded):
+    # The wait queue is already full: the client should slow down (429), unlike a request that
+    # waited its whole timeout for a slot (503).
+    pass
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    name: str
+    # Lower is served first when a shared slot frees up.
+    priority: int
+    max_concurrency: int
+    max_queue: int
+    queue_timeout: float
+
+
+class _ClassState:
+    def __init__(self, route_class: RouteClass) -> None:
+        self.route_class = route_class
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.hold_seconds = 1.0
+
+    def has_waiters(self) -> bool:
+        return any(not waiter.done() for waiter in self.waiters)
+
+
+class AdmissionController:
+    # A shared budget of slots for expensive work, split into route classes. Each class has its
+    # own concurrency cap and bounded FIFO queue; a freed slot goes to the highest-priority class
+    # that has a waiter and room under its cap, so operator turns overtake queued audience and
+    # spectator requests. Waiters are futures on the running loop, as in ConcurrencyLimiter.
+
+    def __init__(self, max_concurrency: int, classes: Sequence[RouteClass]) -> None:
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._classes: Dict[str, _ClassState] = {item.name: _ClassState(item) for item in classes}
+        self._by_priority = sorted(self._classes.values(), key=lambda state: state.route_class.priority)
+        self._active = 0
+
+    def _has_room(self, state: _ClassState) -> bool:
+        return self._active < self.max_concurrency and state.active < state.route_class.max_concurrency
+
+    def _ahead_of(self, state: _ClassState) -> bool:
+        # A queued request of the same or a higher priority goes first, unless its own class cap
+        # holds it back anyway.
+        priority = state.route_class.priority
+        return any(
+            other.has_waiters() and self._has_room(other)
+            for other in self._by_priority
+            if other.route_class.priority <= priority
+        )
+
+    def _retry_after(self, state: _ClassState) -> int:
+        # Roughly the time for the queue ahead to drain at the recent pace.
+        backlog = len(state.waiters) + 1
+        estimate = state.hold_seconds * backlog / max(1, state.route_class.max_concurrency)
+        return max(1, math.ceil(min(estimate, max(1.0, state.route_class.queue_timeout))))
+
+    def _take_slot(self, state: _ClassState) -> None:
+        self._active += 1
+        state.active += 1
+        state.admitted += 1
+
+    def _reject(self, state: _ClassState, error: type, status: int) -> CapacityExceeded:
+        state.rejected += 1
+        ADMISSION_REJECTED.inc(state.route_class.name, str(status))
+        return error(state.route_class.name, self._retry_after(state))
+
+    async def acquire(self, name: str) -> None:
+        state = self._classes[name]
+        if self._has_room(state) and not self._ahead_of(state):
+            self._take_slot(state)
+            return
+        if len(state.waiters) >= state.route_class.max_queue:
+            raise self._reject(state, QueueFull, 429)
+
+        waiter = asyncio.get_running_loop().create_future()
+        state.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, state.route_class.queue_timeout or None)
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as this caller gave up: pass it on.
+                self.release(name)
+            else:
+                waiter.cancel()
+                try:
+                    state.waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(exc, asyncio.TimeoutError):
+                raise self._reject(state, CapacityExceeded, 503) from None
+            raise
+
+    def release(self, name: str, held_seconds: float | None = None) -> None:
+        state = self._classes[name]
+        state.active = max(0, state.active - 1)
+        self._active = max(0, self._active - 1)
+        if held_seconds is not None:
+            state.hold_seconds += HOLD_TIME_SMOOTHING * (held_seconds - state.hold_seconds)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for state in self._by_priority:
+            while state.waiters and self._has_room(state):
+                waiter = state.waiters.popleft()
+                if not waiter.done():
+                    self._take_slot(state)
+                    waiter.set_result(None)
+
+    def queue_depths(self) -> Dict[Tuple[str, str], int]:
+        depths: Dict[Tuple[str, str], int] = {}
+        for name, state in self._classes.items():
+            depths[(f"admission_{name}", "active")] = state.active
+            depths[(f"admission_{name}", "waiting")] = len(state.waiters)
+        return depths
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "classes": {
+                name: {
+                    "priority": state.route_class.priority,
+                    "active": state.active,
+                    "waiting": len(state.waiters),
+                    "max_concurrency": state.route_class.max_concurrency,
+                    "max_queue": state.route_class.max_queue,
+                    "admitted": state.admitted,
+                    "rejected": state.rejected,
+                }
+                for name, state in self._classes.items()
+            },
+        }
+
+
+class AdmissionMiddleware:
+    # Plain ASGI so the slot is held until the response body is fully sent, streams included.
+
+    def __init__(self, app, controller: AdmissionController, routes: Mapping[Tuple[str, str], str]) -> None:
+        self.app = app
+        self.controller = controller
+        self.routes = dict(routes)
+
+    async def __call__(self, scope, receive, send) -> None:
+        name = self.routes.get((scope.get("method", ""), scope.get("path", ""))) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.controller.acquire(name)
+        except CapacityExceeded as exc:
+            await _send_rejection(send, 429 if isinstance(exc, QueueFull) else 503, str(exc), exc.retry_after)
+            return
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name, time.monotonic() - started)
+
+
+async def _send_rejection(send, status: int, detail: str, retry_after: int) -> None:
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(retry_after).encode("ascii")),
+                (b"cache-control", b"no-store"),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
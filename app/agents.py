@@ -4,10 +4,12 @@ import ast
 import json
 import logging
 import re
-import unicodedata
+import time
+from contextvars import copy_context
 from dataclasses import dataclass
-from difflib import SequenceMatcher
-from typing import Callable, Dict, List
+from queue import Empty, SimpleQueue
+from threading import Event, Thread
+from typing import Callable, Dict, Iterable, Iterator, List, TypeVar
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
 from langchain_openai import ChatOpenAI
@@ -27,9 +29,24 @@ try:
 except Exception:
     service_account = None
 
+from .clustering import cluster_proposals
+from .cassette import RecordingChatModel, ReplayChatModel, open_cassette
 from .config import Settings
-from .scenario import TECH_SUPPORT_STEPS, detect_stage_from_text
+from .fake_llm import FakeChatModel
+from .metrics import (
+    AGENT_FALLBACKS,
+    AGENT_REMOTE_DISABLED,
+    LLM_CALL_SECONDS,
+    LLM_STREAM_FIRST_TOKEN_SECONDS,
+    timed_call,
+)
+from .ranking import rank_proposals
+from .safety import SafetyFilter
+from .scenario import TECH_SUPPORT_SCENARIO, Scenario, detect_stage_from_text, load_scenarios
+from .spelling import SymSpellIndex, load_lexicon
+from .text import bounded_edit_distance, fold_text
 from .tools import SOUND_TOOL_REGISTRY, extract_sound_effects, run_tool_by_name
+from .tracing import span
 
 JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
 JSON_LIST_RE = re.compile(r"\[.*\]", re.DOTALL)
@@ -47,6 +64,30 @@ STREAM_INLINE_PREFIX_RE = re.compile(
     re.IGNORECASE,
 )
 SOUND_EFFECT_TAG_TEMPLATE = "[SOUND_EFFECT: {effect}]"
+SPELLING_TOKEN_RE = re.compile(r"\w+|[^\w\s]+|\s+", re.UNICODE)
+SPELLING_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+LEXICON_WORD_RE = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ]+")
+SPACE_BEFORE_PUNCT_RE = re.compile(r"\s+([,.;:!?])")
+SPACE_AFTER_OPEN_RE = re.compile(r"([(\[{])\s+")
+SPACE_BEFORE_CLOSE_RE = re.compile(r"\s+([)\]}])")
+SPACED_APOSTROPHE_RE = re.compile(r"\s+'\s*")
+VOUS_ETE_RE = re.compile(r"\bvous\s+ete\b", re.IGNORECASE)
+WHITESPACE_RE = re.compile(r"\s+")
+# Trailing letters that only mark inflection (plural, gender, verb endings) in French.
+INFLECTION_LETTERS = frozenset("aeinrstxz")
+WORD_CORRECTION_CACHE_SIZE = 8192
+# Best locally ranked clusters forwarded to spelling correction, then to the optional LLM re-ranker.
+MAX_MODERATION_CANDIDATES = 12
+MAX_RERANK_CANDIDATES = 6
+CANCEL_POLL_SECONDS = 0.1
+
+T = TypeVar("T")
+EMPTY_REPLY_FALLBACK = "Pardon ? Vous pouvez repeter calmement ?"
+HEURISTIC_PRIVATE_DATA_REPLY = "Je ne donne jamais mes informations privees par telephone."
+HEURISTIC_REMOTE_ACCESS_REPLY = "Attendez... je ne trouve pas le bouton Demarrer. Vous pouvez repeter lentement ?"
+HEURISTIC_PRESSURE_REPLY = "Vous allez trop vite. Je comprends rien si vous criez."
+HEURISTIC_DEFAULT_REPLY = "D'accord... vous dites quoi exactement sur mon ordinateur ?"
+HEURISTIC_CONSTRAINT_TEMPLATE = "Attendez deux secondes, {constraint}"
 LOGGER = logging.getLogger(__name__)
 GOOGLE_CLOUD_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
 
@@ -62,6 +103,11 @@ def _is_network_oauth_error(exc: Exception) -> bool:
     )
 
 
+def _invoke_timed(agent: str, chat: object, messages: List[object]):
+    with timed_call(LLM_CALL_SECONDS, agent):
+        return chat.invoke(messages)
+
+
 def _to_text(content: object) -> str:
     if content is None:
         return ""
@@ -125,12 +171,26 @@ def _parse_fallback_list(raw_text: str) -> List[str] | None:
     return extracted
 
 
-def _stage_index_from_key(stage_key: str, fallback_stage: int, latest_scammer: str) -> int:
-    normalized = (stage_key or "").strip().lower()
-    for idx, step in enumerate(TECH_SUPPORT_STEPS):
-        if step.key == normalized:
-            return idx
-    return detect_stage_from_text(latest_scammer, fallback_stage)
+def _stage_index_from_key(stage_key: str, fallback_stage: int, latest_scammer: str, scenario: Scenario) -> int:
+    idx = scenario.stage_index(stage_key)
+    if idx is not None and scenario.can_transition(fallback_stage, idx):
+        return idx
+    return detect_stage_from_text(latest_scammer, fallback_stage, scenario)
+
+
+def heuristic_voice_segments(audience_constraint: str = "") -> List[str]:
+    # Every sentence a heuristic reply can be made of, in the order they are joined.
+    segments = [
+        HEURISTIC_PRIVATE_DATA_REPLY,
+        HEURISTIC_REMOTE_ACCESS_REPLY,
+        HEURISTIC_PRESSURE_REPLY,
+        HEURISTIC_DEFAULT_REPLY,
+        EMPTY_REPLY_FALLBACK,
+    ]
+    constraint = str(audience_constraint or "").strip()
+    if constraint:
+        segments.append(_sanitize_spoken_text(HEURISTIC_CONSTRAINT_TEMPLATE.format(constraint=constraint.lower())))
+    return segments
 
 
 def _sanitize_spoken_text(raw_text: str) -> str:
@@ -211,10 +271,15 @@ class GoogleGenAIChatAdapter:
             contents=prompt,
         )
 
-        for chunk in stream:
-            chunk_text = getattr(chunk, "text", "")
-            if isinstance(chunk_text, str) and chunk_text:
-                yield AIMessage(content=chunk_text)
+        try:
+            for chunk in stream:
+                chunk_text = getattr(chunk, "text", "")
+                if isinstance(chunk_text, str) and chunk_text:
+                    yield AIMessage(content=chunk_text)
+        finally:
+            close = getattr(stream, "close", None)
+            if callable(close):
+                close()
 
     def invoke(self, messages: List[object]) -> AIMessage:
         chunks: List[str] = []
@@ -294,7 +359,18 @@ def _build_google_vertex_chat(settings: Settings):
     return GoogleGenAIChatAdapter(client=client, model=settings.vertex_model)
 
 
-def _build_chat_model(settings: Settings, temperature: float):
+def _build_chat_model(settings: Settings, temperature: float, agent: str = ""):
+    cassette = open_cassette(settings.llm_cassette_file, settings.llm_cassette_mode, settings.llm_cassette_speed)
+    if settings.llm_provider == "replay":
+        return ReplayChatModel(cassette, agent) if cassette is not None else None
+
+    chat = _build_provider_chat_model(settings, temperature)
+    if chat is not None and cassette is not None and cassette.mode == "record":
+        return RecordingChatModel(chat, cassette, agent)
+    return chat
+
+
+def _build_provider_chat_model(settings: Settings, temperature: float):
     if settings.llm_provider == "openai":
         if not settings.openai_api_key:
             return None
@@ -331,6 +407,9 @@ def _build_chat_model(settings: Settings, temperature: float):
     if settings.llm_provider == "vertex":
         return _build_google_vertex_chat(settings)
 
+    if settings.llm_provider == "fake":
+        return FakeChatModel(settings)
+
     return None
 
 
@@ -341,26 +420,116 @@ class DirectorDecision:
     reason: str
 
 
+class TurnCancelled(RuntimeError):
+    # The client that asked for the turn went away: nothing of the turn is kept.
+    def __init__(self) -> None:
+        super().__init__("Tour annule: le client s'est deconnecte.")
+
+
+def raise_if_cancelled(cancel: Event | None) -> None:
+    if cancel is not None and cancel.is_set():
+        raise TurnCancelled()
+
+
+def run_until_cancelled(call: Callable[[], T], cancel: Event | None) -> T:
+    # Same idea for a blocking call (the director): its result is dropped if cancel is set first.
+    if cancel is None:
+        return call()
+    outcome: List[object] = []
+    done = Event()
+
+    def run() -> None:
+        try:
+            outcome.append((True, call()))
+        except BaseException as exc:
+            outcome.append((False, exc))
+        finally:
+            done.set()
+
+    Thread(target=copy_context().run, args=(run,), daemon=True, name="llm-call").start()
+    while not done.wait(CANCEL_POLL_SECONDS):
+        raise_if_cancelled(cancel)
+    ok, value = outcome[0]
+    if not ok:
+        raise value
+    return value
+
+
+def iterate_until_cancelled(items: Iterable[object], cancel: Event | None) -> Iterator[object]:
+    # A provider stream blocks until its next chunk (the first one can take seconds). It is read
+    # in a helper thread so the turn stops waiting as soon as cancel is set; the helper closes the
+    # stream once the pending read returns.
+    if cancel is None:
+        yield from items
+        return
+
+    queue: SimpleQueue = SimpleQueue()
+    stop = Event()
+
+    def pump() -> None:
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                queue.put((True, item))
+        except BaseException as exc:
+            queue.put((False, exc))
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if callable(close):
+                close()
+        queue.put((False, None))
+
+    Thread(target=copy_context().run, args=(pump,), daemon=True, name="llm-stream").start()
+    try:
+        while not cancel.is_set():
+            try:
+                ok, value = queue.get(timeout=CANCEL_POLL_SECONDS)
+            except Empty:
+                continue
+            if ok:
+                yield value
+            elif value is None:
+                return
+            else:
+                raise value
+    finally:
+        stop.set()
+
+
 @dataclass
 class VictimReply:
     text: str
     sound_effects: List[str]
+    # "llm" or "heuristic" (fallback), kept on the message for analytics.
+    source: str = "llm"
 
 
 class DirectorAgent:
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
-        self.chat = _build_chat_model(settings, temperature=0.1)
+        self.chat = _build_chat_model(settings, temperature=0.1, agent="director")
         self._remote_llm_disabled = False
 
-    def decide(self, latest_scammer: str, history: List[Dict[str, object]], current_stage: int) -> DirectorDecision:
+    def decide(
+        self,
+        latest_scammer: str,
+        history: List[Dict[str, object]],
+        current_stage: int,
+        scenario: Scenario | None = None,
+    ) -> DirectorDecision:
+        active = scenario or TECH_SUPPORT_SCENARIO
         if self._can_use_remote_llm():
-            decision = self._decide_with_llm(latest_scammer, history, current_stage)
+            decision = self._decide_with_llm(latest_scammer, history, current_stage, active)
             if decision is not None:
                 return decision
 
-        stage_index = detect_stage_from_text(latest_scammer, current_stage)
-        objective = TECH_SUPPORT_STEPS[stage_index].objective
+        AGENT_FALLBACKS.inc("director")
+        with span("director.heuristic"):
+            stage_index = detect_stage_from_text(latest_scammer, current_stage, active)
+        objective = active.steps[stage_index].objective
         reason = "Heuristique locale: progression basee sur mots-cles."
         return DirectorDecision(stage_index=stage_index, objective=objective, reason=reason)
 
@@ -371,6 +540,7 @@ class DirectorAgent:
         if _is_network_oauth_error(exc):
             if not self._remote_llm_disabled:
                 self._remote_llm_disabled = True
+                AGENT_REMOTE_DISABLED.inc("director")
                 LOGGER.warning("Director remote LLM disabled for this run: %s", exc)
             return
         LOGGER.warning("Director LLM call failed; fallback to heuristic: %s", exc)
@@ -380,45 +550,52 @@ class DirectorAgent:
         latest_scammer: str,
         history: List[Dict[str, object]],
         current_stage: int,
+        scenario: Scenario,
     ) -> DirectorDecision | None:
         history_excerpt = "\n".join(
             f"{msg.get('role', 'unknown')}: {msg.get('content', '')}"
             for msg in history[-8:]
         )
-        available_stage_keys = ", ".join(step.key for step in TECH_SUPPORT_STEPS)
-        current_stage_key = TECH_SUPPORT_STEPS[current_stage].key
+        current_stage_key = scenario.steps[current_stage].key
+        available_stage_keys = ", ".join([current_stage_key, *scenario.next_stage_keys(current_stage)])
 
         system_prompt = (
             "Tu es le Directeur de Scenario. Tu ne reponds jamais en langage naturel.\n"
             "Tu dois renvoyer strictement un JSON valide avec ce schema:\n"
             '{"next_stage_key":"...", "objective":"...", "reason":"..."}\n'
-            f"Stages autorises: {available_stage_keys}.\n"
-            "Ne regresse pas de stage. Aucune autre cle n'est autorisee."
+            f"Stages autorises depuis {current_stage_key}: {available_stage_keys}.\n"
+            "Reste sur le stage actuel si rien ne change. Aucune autre cle n'est autorisee."
         )
 
         user_prompt = (
+            f"Scenario: {scenario.name}\n"
             f"Stage actuel: {current_stage_key}\n"
             f"Dernier message arnaqueur: {latest_scammer}\n"
             f"Historique recent:\n{history_excerpt}"
         )
 
         try:
-            raw = self.chat.invoke([SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)])
+            with span("director.llm_call"):
+                raw = _invoke_timed(
+                    "director", self.chat, [SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)]
+                )
         except Exception as exc:
             self._handle_remote_llm_error(exc)
             return None
 
-        payload = _parse_json_object(_to_text(raw.content))
-        if payload is None:
-            return None
+        with span("director.parse") as parse_span:
+            payload = _parse_json_object(_to_text(raw.content))
+            parse_span.set("valid", payload is not None)
+            if payload is None:
+                return None
 
-        stage_key = str(payload.get("next_stage_key", "")).strip()
-        objective = str(payload.get("objective", "")).strip()
-        reason = str(payload.get("reason", "")).strip()
+            stage_key = str(payload.get("next_stage_key", "")).strip()
+            objective = str(payload.get("objective", "")).strip()
+            reason = str(payload.get("reason", "")).strip()
 
-        stage_index = _stage_index_from_key(stage_key, current_stage, latest_scammer)
+            stage_index = _stage_index_from_key(stage_key, current_stage, latest_scammer, scenario)
         if not objective:
-            objective = TECH_SUPPORT_STEPS[stage_index].objective
+            objective = scenario.steps[stage_index].objective
         if not reason:
             reason = "LLM decision sans justification explicite."
         return DirectorDecision(stage_index=stage_index, objective=objective, reason=reason)
@@ -427,37 +604,59 @@ class DirectorAgent:
 class AudienceModeratorAgent:
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
-        self.chat = _build_chat_model(settings, temperature=0.2)
+        self.chat = _build_chat_model(settings, temperature=0.2, agent="moderator")
         self._local_spelling_lexicon = self._build_local_spelling_lexicon()
         self._known_typo_corrections = self._build_known_typo_corrections()
+        self._spelling_index = SymSpellIndex(
+            list(self._local_spelling_lexicon.values()) + load_lexicon(settings.spelling_lexicon_file)
+        )
+        self._word_corrections: Dict[str, str] = {}
+        self._safety_filter = SafetyFilter(settings.safety_lexicon_file)
         self._remote_llm_disabled = False
 
-    def select_choices(self, proposals: List[str], stage_name: str, objective: str) -> List[str]:
-        cleaned = self._sanitize_proposals(proposals)
+    def select_choices(
+        self,
+        proposals: List[str],
+        stage_name: str,
+        objective: str,
+        keywords: List[str] | None = None,
+    ) -> List[str]:
+        # Exact duplicates are kept here: the cluster size is the popularity signal.
+        cleaned = self._sanitize_proposals(proposals, dedupe=False)
         if not cleaned:
             return []
 
-        corrected = self._correct_proposals(cleaned)
+        with span("moderator.cluster_rank") as rank_span:
+            clusters = cluster_proposals(cleaned)
+            ranked = rank_proposals(
+                candidates=[cluster.representative for cluster in clusters],
+                popularity=[cluster.size for cluster in clusters],
+                context=[stage_name, objective, *(keywords or [])],
+                limit=MAX_MODERATION_CANDIDATES,
+            )
+            rank_span.set("clusters", len(clusters))
+        with span("moderator.correct"):
+            corrected = self._correct_proposals([item.text for item in ranked])
         if not corrected:
             return []
 
         if len(corrected) <= 3:
             return corrected
 
-        if self._can_use_remote_llm():
-            picked = self._select_with_llm(corrected, stage_name, objective)
+        if self.settings.moderator_llm_rerank and self._can_use_remote_llm():
+            with span("moderator.rerank"):
+                picked = self._select_with_llm(corrected[:MAX_RERANK_CANDIDATES], stage_name, objective)
             if picked:
                 return picked
 
         return corrected[:3]
 
     def _correct_proposals(self, proposals: List[str]) -> List[str]:
-        if not self._can_use_remote_llm():
-            return self._correct_with_heuristic(proposals)
-
-        corrected = self._correct_with_llm(proposals)
-        if corrected:
-            return corrected
+        if self._can_use_remote_llm():
+            corrected = self._correct_with_llm(proposals)
+            if corrected:
+                return corrected
+        AGENT_FALLBACKS.inc("moderator")
         return self._correct_with_heuristic(proposals)
 
     def _can_use_remote_llm(self) -> bool:
@@ -467,6 +666,7 @@ class AudienceModeratorAgent:
         if _is_network_oauth_error(exc):
             if not self._remote_llm_disabled:
                 self._remote_llm_disabled = True
+                AGENT_REMOTE_DISABLED.inc("moderator")
                 LOGGER.warning(
                     "Moderator remote LLM disabled for this run (%s): %s",
                     context,
@@ -491,7 +691,9 @@ class AudienceModeratorAgent:
         )
 
         try:
-            raw = self.chat.invoke([SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)])
+            raw = _invoke_timed(
+                "moderator", self.chat, [SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)]
+            )
         except Exception as exc:
             self._handle_remote_llm_error(exc, "Moderator spelling correction failed; keeping original proposals")
             return None
@@ -528,12 +730,10 @@ class AudienceModeratorAgent:
         if not normalized:
             return ""
 
-        tokens = re.findall(r"\w+|[^\w\s]+|\s+", normalized, flags=re.UNICODE)
         corrected_parts: List[str] = []
-
-        for token in tokens:
-            if re.fullmatch(r"[^\W\d_]+", token, flags=re.UNICODE):
-                corrected_parts.append(self._correct_word_with_heuristic(token))
+        for token in SPELLING_TOKEN_RE.findall(normalized):
+            if SPELLING_WORD_RE.fullmatch(token):
+                corrected_parts.append(self._correct_word_cached(token))
             else:
                 corrected_parts.append(token)
 
@@ -544,14 +744,24 @@ class AudienceModeratorAgent:
     @staticmethod
     def _polish_french_spacing(text: str) -> str:
         out = str(text or "")
-        out = re.sub(r"\s+([,.;:!?])", r"\1", out)
-        out = re.sub(r"([([{])\s+", r"\1", out)
-        out = re.sub(r"\s+([)\]}])", r"\1", out)
-        out = re.sub(r"\s+'\s*", "'", out)
-        out = re.sub(r"\bvous\s+ete\b", "vous êtes", out, flags=re.IGNORECASE)
-        out = re.sub(r"\s+", " ", out).strip()
+        out = SPACE_BEFORE_PUNCT_RE.sub(r"\1", out)
+        out = SPACE_AFTER_OPEN_RE.sub(r"\1", out)
+        out = SPACE_BEFORE_CLOSE_RE.sub(r"\1", out)
+        out = SPACED_APOSTROPHE_RE.sub("'", out)
+        out = VOUS_ETE_RE.sub("vous êtes", out)
+        out = WHITESPACE_RE.sub(" ", out).strip()
         return out
 
+    def _correct_word_cached(self, word: str) -> str:
+        cached = self._word_corrections.get(word)
+        if cached is not None:
+            return cached
+        corrected = self._correct_word_with_heuristic(word)
+        if len(self._word_corrections) >= WORD_CORRECTION_CACHE_SIZE:
+            self._word_corrections.clear()
+        self._word_corrections[word] = corrected
+        return corrected
+
     def _correct_word_with_heuristic(self, word: str) -> str:
         lower = word.lower()
         folded = self._fold_for_spelling_check(lower)
@@ -567,10 +777,40 @@ class AudienceModeratorAgent:
             return self._match_word_case(word, known)
 
         # Accent restoration only when folded form is identical.
-        exact = self._local_spelling_lexicon.get(folded)
+        exact = self._local_spelling_lexicon.get(folded) or self._spelling_index.exact(folded)
         if exact:
             return self._match_word_case(word, exact)
-        return word
+
+        budget = self._fuzzy_distance_budget(folded)
+        if budget <= 0:
+            return word
+        candidate = self._spelling_index.lookup(folded, max_distance=budget)
+        if not candidate or self._differs_only_by_inflection(folded, fold_text(candidate)):
+            return word
+        return self._match_word_case(word, candidate)
+
+    @staticmethod
+    def _fuzzy_distance_budget(folded: str) -> int:
+        # Short words have too many legitimate neighbours to be corrected safely.
+        if len(folded) < 6:
+            return 0
+        if len(folded) < 10:
+            return 1
+        return 2
+
+    @staticmethod
+    def _differs_only_by_inflection(source: str, target: str) -> bool:
+        prefix = 0
+        for left, right in zip(source, target):
+            if left != right:
+                break
+            prefix += 1
+        source_tail = source[prefix:]
+        target_tail = target[prefix:]
+        if sorted(source_tail) == sorted(target_tail):
+            # Swapped letters are a typo, not an inflection.
+            return False
+        return all(ch in INFLECTION_LETTERS for ch in source_tail + target_tail)
 
     @staticmethod
     def _match_word_case(source: str, target: str) -> str:
@@ -668,11 +908,12 @@ class AudienceModeratorAgent:
             "finale",
         }
 
-        for step in TECH_SUPPORT_STEPS:
-            seeds.update(re.findall(r"[A-Za-zÀ-ÖØ-öø-ÿ]+", step.name))
-            seeds.update(re.findall(r"[A-Za-zÀ-ÖØ-öø-ÿ]+", step.objective))
+        steps = [step for scenario in load_scenarios(self.settings.scenario_packs_dir).values() for step in scenario.steps]
+        for step in steps:
+            seeds.update(LEXICON_WORD_RE.findall(step.name))
+            seeds.update(LEXICON_WORD_RE.findall(step.objective))
             for keyword in step.trigger_keywords:
-                seeds.update(re.findall(r"[A-Za-zÀ-ÖØ-öø-ÿ]+", keyword))
+                seeds.update(LEXICON_WORD_RE.findall(keyword))
 
         out: Dict[str, str] = {}
         for raw in seeds:
@@ -750,9 +991,11 @@ class AudienceModeratorAgent:
         )
 
         try:
-            raw = self.chat.invoke([SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)])
+            raw = _invoke_timed(
+                "moderator", self.chat, [SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)]
+            )
         except Exception as exc:
-            self._handle_remote_llm_error(exc, "Moderator LLM call failed; fallback to first proposals")
+            self._handle_remote_llm_error(exc, "Moderator LLM call failed; fallback to local ranking")
             return None
 
         parsed = _parse_json_list(_to_text(raw.content))
@@ -786,9 +1029,7 @@ class AudienceModeratorAgent:
             return None
         return result
 
-    @staticmethod
-    def _sanitize_proposals(proposals: List[str]) -> List[str]:
-        banned_words = {"haine", "raciste", "menace", "violence", "suicide", "arme"}
+    def _sanitize_proposals(self, proposals: List[str], dedupe: bool = True) -> List[str]:
         out: List[str] = []
         seen = set()
 
@@ -796,12 +1037,12 @@ class AudienceModeratorAgent:
             text = str(raw).strip()
             if not text:
                 continue
-            lowered = text.lower()
-            if any(word in lowered for word in banned_words):
-                continue
-            if text in seen:
+            if self._safety_filter.is_blocked(text):
                 continue
-            seen.add(text)
+            if dedupe:
+                if text in seen:
+                    continue
+                seen.add(text)
             out.append(text[:180])
         return out
 
@@ -813,32 +1054,35 @@ class AudienceModeratorAgent:
             return False
         if normalized_original == normalized_corrected:
             return True
-        original_folded = AudienceModeratorAgent._fold_for_spelling_check(normalized_original)
-        corrected_folded = AudienceModeratorAgent._fold_for_spelling_check(normalized_corrected)
-        if original_folded == corrected_folded:
+        original_tokens = normalized_original.split()
+        corrected_tokens = normalized_corrected.split()
+        # Folding word by word keeps the memoized fold cache hot across proposals.
+        original_folded = [AudienceModeratorAgent._fold_for_spelling_check(token) for token in original_tokens]
+        corrected_folded = [AudienceModeratorAgent._fold_for_spelling_check(token) for token in corrected_tokens]
+        if " ".join(filter(None, original_folded)) == " ".join(filter(None, corrected_folded)):
             # Difference limited to accents / punctuation / case.
             return True
 
-        original_tokens = normalized_original.split()
-        corrected_tokens = normalized_corrected.split()
         if len(original_tokens) != len(corrected_tokens):
             return False
 
-        global_similarity = SequenceMatcher(None, normalized_original, normalized_corrected).ratio()
-        if global_similarity < 0.86:
-            return False
-
-        for original_token, corrected_token in zip(original_tokens, corrected_tokens):
-            if original_token == corrected_token:
+        # At most 14% of the longer text may change overall, and at most half of any single word.
+        # Tokens are aligned one to one, so the per-token distances add up to the global one.
+        global_budget = int(max(len(normalized_original), len(normalized_corrected)) * 0.14)
+        spent = 0
+        for idx, (original_token, corrected_token) in enumerate(zip(original_tokens, corrected_tokens)):
+            if original_folded[idx] == corrected_folded[idx]:
                 continue
 
             # Do not allow altering numeric values.
             if any(ch.isdigit() for ch in original_token + corrected_token):
                 return False
 
-            token_similarity = SequenceMatcher(None, original_token, corrected_token).ratio()
-            if token_similarity < 0.5:
+            token_budget = min(max(len(original_token), len(corrected_token)) // 2, global_budget - spent)
+            distance = bounded_edit_distance(original_folded[idx], corrected_folded[idx], max(token_budget, 0))
+            if distance > token_budget:
                 return False
+            spent += distance
 
         return True
 
@@ -848,16 +1092,13 @@ class AudienceModeratorAgent:
 
     @staticmethod
     def _fold_for_spelling_check(text: str) -> str:
-        folded = unicodedata.normalize("NFKD", str(text))
-        without_marks = "".join(ch for ch in folded if not unicodedata.combining(ch))
-        without_punct = re.sub(r"[^\w\s]", " ", without_marks, flags=re.UNICODE)
-        return " ".join(without_punct.lower().split())
+        return fold_text(str(text))
 
 
 class VictimAgent:
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
-        self.chat = _build_chat_model(settings, temperature=0.7)
+        self.chat = _build_chat_model(settings, temperature=0.7, agent="victim")
         self._remote_llm_disabled = False
         if self.chat and hasattr(self.chat, "bind_tools"):
             self.chat_with_tools = self.chat.bind_tools(list(SOUND_TOOL_REGISTRY.values()))
@@ -877,7 +1118,9 @@ class VictimAgent:
             if reply is not None:
                 return reply
 
-        return self._respond_with_heuristic(latest_scammer, objective, audience_constraint)
+        AGENT_FALLBACKS.inc("victim")
+        with span("victim.heuristic"):
+            return self._respond_with_heuristic(latest_scammer, objective, audience_constraint)
 
     def respond_stream(
         self,
@@ -887,8 +1130,10 @@ class VictimAgent:
         audience_constraint: str,
         stage_name: str,
         on_text_chunk: Callable[[str], None] | None = None,
+        cancel: Event | None = None,
     ) -> VictimReply:
         emit = on_text_chunk or (lambda _chunk: None)
+        raise_if_cancelled(cancel)
 
         if self._can_use_remote_llm():
             reply = self._respond_with_llm_stream(
@@ -898,9 +1143,11 @@ class VictimAgent:
                 audience_constraint,
                 stage_name,
                 emit,
+                cancel,
             )
             if reply is not None:
                 return reply
+            raise_if_cancelled(cancel)
             if self._can_use_remote_llm():
                 reply = self._respond_with_llm(
                     latest_scammer,
@@ -913,7 +1160,9 @@ class VictimAgent:
                     self._emit_text_chunks(reply.text, emit)
                     return reply
 
-        reply = self._respond_with_heuristic(latest_scammer, objective, audience_constraint)
+        AGENT_FALLBACKS.inc("victim")
+        with span("victim.heuristic"):
+            reply = self._respond_with_heuristic(latest_scammer, objective, audience_constraint)
         self._emit_text_chunks(reply.text, emit)
         return reply
 
@@ -924,6 +1173,7 @@ class VictimAgent:
         if _is_network_oauth_error(exc):
             if not self._remote_llm_disabled:
                 self._remote_llm_disabled = True
+                AGENT_REMOTE_DISABLED.inc("victim")
                 LOGGER.warning("Victim remote LLM disabled for this run (%s): %s", context, exc)
             return
         LOGGER.warning("%s: %s", context, exc)
@@ -997,6 +1247,7 @@ class VictimAgent:
         audience_constraint: str,
         stage_name: str,
         emit: Callable[[str], None],
+        cancel: Event | None = None,
     ) -> VictimReply | None:
         stream_fn = getattr(self.chat_with_tools, "stream", None)
         if not callable(stream_fn):
@@ -1014,28 +1265,52 @@ class VictimAgent:
         streamed = False
         preview_carry = ""
         carry_size = 64
-        try:
-            for chunk in stream_fn(messages):
-                content = getattr(chunk, "content", chunk)
-                if isinstance(content, str):
-                    piece = content
+        # The director call may have outlasted the client: do not open a provider stream for nobody.
+        raise_if_cancelled(cancel)
+        with span("victim.llm_stream") as stream_span:
+            started = time.perf_counter()
+            outcome = "error"
+            stream = None
+            try:
+                stream = iterate_until_cancelled(stream_fn(messages), cancel)
+                for chunk in stream:
+                    if cancel is not None and cancel.is_set():
+                        outcome = "cancelled"
+                        break
+                    content = getattr(chunk, "content", chunk)
+                    if isinstance(content, str):
+                        piece = content
+                    else:
+                        piece = _to_text(content)
+                    if not piece:
+                        continue
+                    if not raw_chunks:
+                        first_token = time.perf_counter() - started
+                        LLM_STREAM_FIRST_TOKEN_SECONDS.observe(first_token, "victim")
+                        stream_span.set("first_token_ms", round(1000 * first_token, 3))
+                    raw_chunks.append(piece)
+                    preview_buffer = _sanitize_stream_preview(preview_carry + piece)
+                    if len(preview_buffer) <= carry_size:
+                        preview_carry = preview_buffer
+                        continue
+                    emit_piece = preview_buffer[:-carry_size]
+                    preview_carry = preview_buffer[-carry_size:]
+                    if emit_piece and emit_piece.strip():
+                        emit(emit_piece)
+                        streamed = True
                 else:
-                    piece = _to_text(content)
-                if not piece:
-                    continue
-                raw_chunks.append(piece)
-                preview_buffer = _sanitize_stream_preview(preview_carry + piece)
-                if len(preview_buffer) <= carry_size:
-                    preview_carry = preview_buffer
-                    continue
-                emit_piece = preview_buffer[:-carry_size]
-                preview_carry = preview_buffer[-carry_size:]
-                if emit_piece and emit_piece.strip():
-                    emit(emit_piece)
-                    streamed = True
-        except Exception as exc:
-            self._handle_remote_llm_error(exc, "Victim LLM stream failed; fallback to standard call")
-            return None
+                    outcome = "cancelled" if cancel is not None and cancel.is_set() else "ok"
+            except Exception as exc:
+                self._handle_remote_llm_error(exc, "Victim LLM stream failed; fallback to standard call")
+                return None
+            finally:
+                # Closing the generator early closes the provider response instead of draining it.
+                close = getattr(stream, "close", None)
+                if callable(close):
+                    close()
+                LLM_CALL_SECONDS.observe(time.perf_counter() - started, "victim_stream", outcome)
+                stream_span.set("chunks", len(raw_chunks))
+        raise_if_cancelled(cancel)
 
         final_preview = _sanitize_stream_preview(preview_carry)
         if final_preview and final_preview.strip():
@@ -1046,11 +1321,12 @@ class VictimAgent:
         if not raw_text:
             return None
 
-        sound_effects = extract_sound_effects(raw_text)
-        text = _sanitize_spoken_text(raw_text)
-        if not text:
-            text = "Pardon ? Vous pouvez repeter calmement ?"
-        text = _ensure_sound_tags_in_text(text, _dedupe(sound_effects))
+        with span("victim.sanitize"):
+            sound_effects = extract_sound_effects(raw_text)
+            text = _sanitize_spoken_text(raw_text)
+            if not text:
+                text = EMPTY_REPLY_FALLBACK
+            text = _ensure_sound_tags_in_text(text, _dedupe(sound_effects))
         if not streamed:
             self._emit_text_chunks(text, emit)
         return VictimReply(text=text, sound_effects=_dedupe(sound_effects))
@@ -1073,7 +1349,8 @@ class VictimAgent:
         )
 
         try:
-            first = self.chat_with_tools.invoke(messages)
+            with span("victim.llm_call"):
+                first = _invoke_timed("victim", self.chat_with_tools, messages)
         except Exception as exc:
             self._handle_remote_llm_error(exc, "Victim LLM call failed; fallback to heuristic")
             return None
@@ -1082,34 +1359,32 @@ class VictimAgent:
         tool_messages: List[ToolMessage] = []
 
         tool_calls = getattr(first, "tool_calls", []) or []
-        for idx, tool_call in enumerate(tool_calls):
-            name = str(tool_call.get("name", "")).strip()
-            args = tool_call.get("args", {}) or {}
-            effect_result = run_tool_by_name(name, args)
-            sound_effects.extend(extract_sound_effects(effect_result))
-            call_id = str(tool_call.get("id", "")).strip() or f"tool_call_{idx + 1}"
-            tool_messages.append(ToolMessage(content=effect_result, tool_call_id=call_id))
+        with span("victim.tools", calls=len(tool_calls)):
+            for idx, tool_call in enumerate(tool_calls):
+                name = str(tool_call.get("name", "")).strip()
+                args = tool_call.get("args", {}) or {}
+                effect_result = run_tool_by_name(name, args)
+                sound_effects.extend(extract_sound_effects(effect_result))
+                call_id = str(tool_call.get("id", "")).strip() or f"tool_call_{idx + 1}"
+                tool_messages.append(ToolMessage(content=effect_result, tool_call_id=call_id))
 
         if tool_messages:
             try:
-                final = self.chat.invoke(messages + [first] + tool_messages)
+                with span("victim.llm_final_call"):
+                    final = _invoke_timed("victim", self.chat, messages + [first] + tool_messages)
             except Exception as exc:
                 self._handle_remote_llm_error(exc, "Victim final LLM call failed after tool calls")
                 return None
             raw_text = _to_text(final.content)
+        else:
+            raw_text = _to_text(first.content)
+
+        with span("victim.sanitize"):
             sound_effects.extend(extract_sound_effects(raw_text))
             text = _sanitize_spoken_text(raw_text)
             if not text:
-                text = "Pardon ? Vous pouvez repeter calmement ?"
+                text = EMPTY_REPLY_FALLBACK
             text = _ensure_sound_tags_in_text(text, _dedupe(sound_effects))
-            return VictimReply(text=text, sound_effects=_dedupe(sound_effects))
-
-        raw_text = _to_text(first.content)
-        sound_effects.extend(extract_sound_effects(raw_text))
-        text = _sanitize_spoken_text(raw_text)
-        if not text:
-            text = "Pardon ? Vous pouvez repeter calmement ?"
-        text = _ensure_sound_tags_in_text(text, _dedupe(sound_effects))
         return VictimReply(text=text, sound_effects=_dedupe(sound_effects))
 
     def _respond_with_heuristic(
@@ -1123,17 +1398,17 @@ class VictimAgent:
         sound_effects: List[str] = []
 
         if "mot de passe" in lower or "password" in lower or "carte" in lower:
-            chunks.append("Je ne donne jamais mes informations privees par telephone.")
+            chunks.append(HEURISTIC_PRIVATE_DATA_REPLY)
         elif "installer" in lower or "telecharger" in lower or "anydesk" in lower or "teamviewer" in lower:
-            chunks.append("Attendez... je ne trouve pas le bouton Demarrer. Vous pouvez repeter lentement ?")
+            chunks.append(HEURISTIC_REMOTE_ACCESS_REPLY)
         elif "urgent" in lower or "vite" in lower or "maintenant" in lower:
-            chunks.append("Vous allez trop vite. Je comprends rien si vous criez.")
+            chunks.append(HEURISTIC_PRESSURE_REPLY)
             sound_effects.extend(extract_sound_effects(run_tool_by_name("coughing_fit")))
         else:
-            chunks.append("D'accord... vous dites quoi exactement sur mon ordinateur ?")
+            chunks.append(HEURISTIC_DEFAULT_REPLY)
 
         if audience_constraint:
-            chunks.append(f"Attendez deux secondes, {audience_constraint.lower()}")
+            chunks.append(HEURISTIC_CONSTRAINT_TEMPLATE.format(constraint=audience_constraint.lower()))
             if "sonne" in audience_constraint.lower() or "porte" in audience_constraint.lower():
                 sound_effects.extend(extract_sound_effects(run_tool_by_name("doorbell")))
             if "chien" in audience_constraint.lower():
@@ -1142,6 +1417,6 @@ class VictimAgent:
                 sound_effects.extend(extract_sound_effects(run_tool_by_name("tv_background")))
         text = _sanitize_spoken_text(" ".join(chunks))
         if not text:
-            text = "Pardon ? Vous pouvez repeter calmement ?"
+            text = EMPTY_REPLY_FALLBACK
         text = _ensure_sound_tags_in_text(text, _dedupe(sound_effects))
-        return VictimReply(text=text, sound_effects=_dedupe(sound_effects))
+        return VictimReply(text=text, sound_effects=_dedupe(sound_effects), source="heuristic")
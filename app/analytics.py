@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Sequence
+from uuid import uuid4
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+LOGGER = logging.getLogger(__name__)
+ROLES = ("scammer", "victim")
+ROLE_OTHER = len(ROLES)
+UNKNOWN = "unknown"
+# One .npy per column so a store can be opened memory-mapped; vocabularies go in meta.json.
+COLUMNS = (
+    "call",
+    "role",
+    "stage",
+    "source",
+    "length_chars",
+    "length_words",
+    "timestamp_ms",
+    "effect_offsets",
+    "effect_codes",
+)
+_ARCHIVE_LOCK = Lock()
+
+
+def transcript_record(scenario: str, messages: List[Dict[str, object]], origin: str, record_id: str = "") -> Dict[str, object]:
+    # Same shape as the lines written by scripts/batch_simulate.py, so both feed the same analysis.
+    return {
+        "id": record_id or uuid4().hex,
+        "scenario": scenario,
+        "status": "ok",
+        "origin": origin,
+        "ended_at": datetime.now(tz=timezone.utc).isoformat(),
+        "messages": messages,
+    }
+
+
+def append_transcript(path: str, record: Dict[str, object]) -> None:
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    try:
+        with _ARCHIVE_LOCK:
+            target = Path(path)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with target.open("a", encoding="utf-8") as handle:
+                handle.write(line)
+    except OSError as exc:
+        LOGGER.warning("Transcript archive failed (%s): %s", path, exc)
+
+
+def iter_transcripts(paths: Iterable[str | Path]) -> Iterable[Dict[str, object]]:
+    for path in paths:
+        source = Path(path)
+        if not source.is_file():
+            continue
+        with source.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Last line of an interrupted run.
+                    continue
+                if isinstance(record, dict) and record.get("messages"):
+                    yield record
+
+
+class _Vocabulary:
+    def __init__(self, values: Sequence[str] = ()) -> None:
+        self.values: List[str] = list(values)
+        self._codes = {value: code for code, value in enumerate(self.values)}
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+@dataclass
+class TranscriptColumns:
+    # One row per message, rows of a call contiguous and in order. Sound effects are a ragged
+    # column: effects of row i are effect_codes[effect_offsets[i]:effect_offsets[i + 1]].
+    call: "np.ndarray"
+    role: "np.ndarray"
+    stage: "np.ndarray"
+    source: "np.ndarray"
+    length_chars: "np.ndarray"
+    length_words: "np.ndarray"
+    timestamp_ms: "np.ndarray"
+    effect_offsets: "np.ndarray"
+    effect_codes: "np.ndarray"
+    call_ids: List[str]
+    stages: List[str]
+    sources: List[str]
+    effects: List[str]
+
+    @property
+    def rows(self) -> int:
+        return int(self.role.shape[0])
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy indisponible pour les statistiques.")
+
+
+def build_columns(records: Iterable[Dict[str, object]]) -> TranscriptColumns:
+    # The only per-message Python loop: everything after works on the arrays.
+    _require_numpy()
+    call: List[int] = []
+    role: List[int] = []
+    stage: List[int] = []
+    source: List[int] = []
+    length_chars: List[int] = []
+    length_words: List[int] = []
+    timestamps: List[str] = []
+    effect_counts: List[int] = []
+    effect_codes: List[int] = []
+    call_ids: List[str] = []
+    stages = _Vocabulary([UNKNOWN])
+    sources = _Vocabulary([UNKNOWN])
+    effects = _Vocabulary()
+    roles = {name: code for code, name in enumerate(ROLES)}
+
+    for record in records:
+        call_code = len(call_ids)
+        call_ids.append(str(record.get("id") or call_code))
+        for message in record.get("messages") or []:
+            content = str(message.get("content") or "")
+            call.append(call_code)
+            role.append(roles.get(str(message.get("role") or ""), ROLE_OTHER))
+            stage.append(stages.code(str(message.get("stage_key") or UNKNOWN)))
+            source.append(sources.code(str(message.get("reply_source") or UNKNOWN)))
+            length_chars.append(len(content))
+            length_words.append(len(content.split()))
+            # UTC ISO strings; numpy parses them once the offset is dropped.
+            timestamps.append(str(message.get("timestamp") or "")[:26] or "NaT")
+            sound_effects = message.get("sound_effects") or []
+            effect_counts.append(len(sound_effects))
+            effect_codes.extend(effects.code(str(effect)) for effect in sound_effects)
+
+    offsets = np.zeros(len(effect_counts) + 1, dtype=np.int64)
+    np.cumsum(np.asarray(effect_counts, dtype=np.int64), out=offsets[1:])
+    parsed = np.array(timestamps, dtype="datetime64[us]").astype("datetime64[ms]")
+    return TranscriptColumns(
+        call=np.asarray(call, dtype=np.int32),
+        role=np.asarray(role, dtype=np.int8),
+        stage=np.asarray(stage, dtype=np.int16),
+        source=np.asarray(source, dtype=np.int8),
+        length_chars=np.asarray(length_chars, dtype=np.int32),
+        length_words=np.asarray(length_words, dtype=np.int32),
+        # NaT becomes int64 min; _durations ignores it.
+        timestamp_ms=parsed.astype(np.int64),
+        effect_offsets=offsets,
+        effect_codes=np.asarray(effect_codes, dtype=np.int16),
+        call_ids=call_ids,
+        stages=stages.values,
+        sources=sources.values,
+        effects=effects.values,
+    )
+
+
+def write_columns(columns: TranscriptColumns, directory: str | Path) -> None:
+    target = Path(directory)
+    target.mkdir(parents=True, exist_ok=True)
+    for name in COLUMNS:
+        np.save(target / f"{name}.npy", getattr(columns, name))
+    meta = {
+        "rows": columns.rows,
+        "call_ids": columns.call_ids,
+        "stages": columns.stages,
+        "sources": columns.sources,
+        "effects": columns.effects,
+    }
+    (target / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+
+def load_columns(directory: str | Path, mmap: bool = True) -> TranscriptColumns:
+    _require_numpy()
+    source = Path(directory)
+    meta = json.loads((source / "meta.json").read_text(encoding="utf-8"))
+    arrays = {name: np.load(source / f"{name}.npy", mmap_mode="r" if mmap else None) for name in COLUMNS}
+    return TranscriptColumns(
+        call_ids=meta["call_ids"],
+        stages=meta["stages"],
+        sources=meta["sources"],
+        effects=meta["effects"],
+        **arrays,
+    )
+
+
+def _distribution(values: "np.ndarray") -> Dict[str, float]:
+    if values.size == 0:
+        return {"count": 0}
+    p50, p95 = np.percentile(values, [50, 95])
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+def _durations_s(columns: TranscriptColumns) -> "np.ndarray":
+    # Time the scammer spent on each call: first to last message. Rows of a call are contiguous.
+    valid = columns.timestamp_ms != np.iinfo(np.int64).min
+    calls = columns.call[valid]
+    stamps = columns.timestamp_ms[valid]
+    if calls.size == 0:
+        return np.zeros(0, dtype=np.float64)
+    starts = np.flatnonzero(np.r_[True, calls[1:] != calls[:-1]])
+    spans = np.maximum.reduceat(stamps, starts) - np.minimum.reduceat(stamps, starts)
+    return spans.astype(np.float64) / 1000.0
+
+
+def _counts(codes: "np.ndarray", labels: List[str]) -> Dict[str, int]:
+    counts = np.bincount(codes, minlength=len(labels)) if codes.size else np.zeros(len(labels), dtype=np.int64)
+    return {label: int(count) for label, count in zip(labels, counts) if count}
+
+
+def compute_stats(columns: TranscriptColumns) -> Dict[str, object]:
+    _require_numpy()
+    victim = np.asarray(columns.role) == ROLES.index("victim")
+    scammer = np.asarray(columns.role) == ROLES.index("scammer")
+    stage = np.asarray(columns.stage)
+    source = np.asarray(columns.source)
+    victim_stage = stage[victim]
+    victim_source = source[victim]
+
+    heuristic_code = columns.sources.index("heuristic") if "heuristic" in columns.sources else -1
+    fallback = victim_source == heuristic_code
+    known_source = victim_source != columns.sources.index(UNKNOWN)
+    stage_replies = np.bincount(victim_stage, minlength=len(columns.stages))
+    stage_fallbacks = np.bincount(victim_stage[fallback], minlength=len(columns.stages))
+    fallback_by_stage = {
+        columns.stages[code]: round(float(stage_fallbacks[code] / stage_replies[code]), 4)
+        for code in np.flatnonzero(stage_replies)
+    }
+
+    effect_codes = np.asarray(columns.effect_codes)
+    offsets = np.asarray(columns.effect_offsets)
+    effects_per_row = np.diff(offsets)
+    victim_replies = int(victim.sum())
+    turns_per_call = np.bincount(np.asarray(columns.call)[scammer], minlength=len(columns.call_ids))
+    durations = _durations_s(columns)
+
+    return {
+        "calls": len(columns.call_ids),
+        "messages": columns.rows,
+        "victim_replies": victim_replies,
+        "turns_per_stage": _counts(victim_stage, columns.stages),
+        "turns_per_call": _distribution(turns_per_call),
+        "time_wasted_s": {**_distribution(durations), "total": round(float(durations.sum()), 3)},
+        "sound_effects": {
+            "counts": _counts(effect_codes, columns.effects),
+            "replies_with_effect": round(float((effects_per_row[victim] > 0).mean()), 4) if victim_replies else 0.0,
+        },
+        "fallback_rate": round(float(fallback[known_source].mean()), 4) if known_source.any() else None,
+        "fallback_rate_by_stage": fallback_by_stage,
+        "reply_sources": _counts(victim_source, columns.sources),
+        "reply_length": {
+            "chars": _distribution(np.asarray(columns.length_chars)[victim]),
+            "words": _distribution(np.asarray(columns.length_words)[victim]),
+        },
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.analytics",
+        description="Statistiques agregees sur des transcriptions (sorties de batch_simulate, spectacles archives).",
+    )
+    parser.add_argument("transcripts", nargs="*", help="Fichiers JSON lines de transcriptions.")
+    parser.add_argument("--columnar", help="Dossier colonnaire: ecrit depuis les transcriptions, ou relu (memory-mapped) sans elles.")
+    args = parser.parse_args(argv)
+
+    if args.transcripts:
+        columns = build_columns(iter_transcripts(args.transcripts))
+        if args.columnar:
+            write_columns(columns, args.columnar)
+    elif args.columnar:
+        columns = load_columns(args.columnar)
+    else:
+        parser.error("Donnez des fichiers de transcriptions ou --columnar.")
+    print(json.dumps(compute_stats(columns), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import mmap
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+LOGGER = logging.getLogger(__name__)
+FINGERPRINT_LENGTH = 12
+# Effect clips under this size stay mapped in memory; larger files are read from disk per range.
+MMAP_MAX_BYTES = 1024 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+COMPRESSIBLE_TYPES = frozenset(
+    {"text/html", "text/css", "text/javascript", "application/javascript", "application/json", "image/svg+xml"}
+)
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+ASSET_REF_RE = re.compile(r'(\b(?:href|src)=")(/[^"#?]+)(")')
+MANIFEST_ELEMENT_ID = "asset-manifest"
+PREFERRED_ENCODINGS = ("br", "gzip")
+
+
+@dataclass
+class Asset:
+    logical_path: str
+    fingerprinted_path: str
+    file_path: Path
+    media_type: str
+    size: int
+    etag: str
+    # In-memory body: raw bytes for text assets, an mmap for small binaries, None for large files.
+    body: object = None
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+def _media_type(path: Path) -> str:
+    if path.suffix == ".js":
+        return "text/javascript"
+    guessed, _encoding = mimetypes.guess_type(path.name)
+    return guessed or "application/octet-stream"
+
+
+def _fingerprinted(logical_path: str, digest: str) -> str:
+    parent, _sep, name = logical_path.rpartition("/")
+    stem, dot, suffix = name.rpartition(".")
+    if not dot:
+        return f"{logical_path}.{digest}"
+    return f"{parent}/{stem}.{digest}.{suffix}"
+
+
+def _compress(data: bytes) -> Dict[str, bytes]:
+    variants: Dict[str, bytes] = {}
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        variants["gzip"] = gz
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            variants["br"] = br
+    return variants
+
+
+def _accepted_encodings(header: str) -> List[str]:
+    accepted: List[str] = []
+    for item in header.split(","):
+        name, _sep, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in {"q=0", "q=0.0", "q=0.00", "q=0.000"}:
+            continue
+        if name.strip():
+            accepted.append(name.strip().lower())
+    return accepted
+
+
+def _negotiate_encoding(asset: Asset, header: str) -> str:
+    if not asset.encoded:
+        return ""
+    accepted = _accepted_encodings(header)
+    for encoding in PREFERRED_ENCODINGS:
+        if encoding in asset.encoded and encoding in accepted:
+            return encoding
+    return ""
+
+
+class AssetStore:
+    # Serves a directory with content-hash fingerprints: "/app.js" is also reachable as
+    # "/app.<hash>.js", which never changes and can be cached forever by browsers and proxies.
+
+    def __init__(self, root: Path, url_prefix: str = "") -> None:
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        self._by_path: Dict[str, Asset] = {}
+        self._mappings: List[mmap.mmap] = []
+        if root.is_dir():
+            self._scan()
+
+    def __len__(self) -> int:
+        return len({id(asset) for asset in self._by_path.values()})
+
+    def _scan(self) -> None:
+        for file_path in sorted(self.root.rglob("*")):
+            if not file_path.is_file() or file_path.name.startswith("."):
+                continue
+            try:
+                self.add(file_path)
+            except OSError as exc:
+                LOGGER.warning("Static asset skipped (%s): %s", file_path, exc)
+
+    def add(self, file_path: Path, content: bytes | None = None) -> Asset:
+        logical_path = f"{self.url_prefix}/{file_path.relative_to(self.root).as_posix()}"
+        media_type = _media_type(file_path)
+        size = len(content) if content is not None else file_path.stat().st_size
+
+        hasher = hashlib.sha256()
+        if content is not None:
+            hasher.update(content)
+        else:
+            with file_path.open("rb") as handle:
+                for chunk in iter(lambda: handle.read(READ_CHUNK_BYTES), b""):
+                    hasher.update(chunk)
+        digest = hasher.hexdigest()[:FINGERPRINT_LENGTH]
+
+        asset = Asset(
+            logical_path=logical_path,
+            fingerprinted_path=_fingerprinted(logical_path, digest),
+            file_path=file_path,
+            media_type=media_type,
+            size=size,
+            etag=f'"{digest}"',
+        )
+        if media_type in COMPRESSIBLE_TYPES:
+            asset.body = content if content is not None else file_path.read_bytes()
+            asset.encoded = _compress(asset.body)
+        elif 0 < size <= MMAP_MAX_BYTES:
+            # The mapping keeps its own descriptor, so the file object can be closed right away.
+            with file_path.open("rb") as handle:
+                asset.body = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mappings.append(asset.body)
+
+        previous = self._by_path.get(logical_path)
+        if previous is not None:
+            self._by_path.pop(previous.fingerprinted_path, None)
+        self._by_path[logical_path] = asset
+        self._by_path[asset.fingerprinted_path] = asset
+        return asset
+
+    def get(self, url_path: str) -> Asset | None:
+        return self._by_path.get(url_path)
+
+    def url_for(self, logical_path: str) -> str:
+        asset = self._by_path.get(logical_path)
+        return asset.fingerprinted_path if asset is not None else logical_path
+
+    def manifest(self) -> Dict[str, str]:
+        # Pages are always revalidated, so only their sub-resources need fingerprinted URLs.
+        return {
+            path: asset.fingerprinted_path
+            for path, asset in self._by_path.items()
+            if path == asset.logical_path and asset.media_type != "text/html"
+        }
+
+    def render_html(self, file_path: Path, manifests: Dict[str, str]) -> Asset:
+        # Rewrites href/src references to fingerprinted URLs and embeds the full manifest so that
+        # scripts can resolve the URLs they build themselves (sound effects).
+        html = file_path.read_text(encoding="utf-8")
+        html = ASSET_REF_RE.sub(
+            lambda match: f"{match.group(1)}{manifests.get(match.group(2), match.group(2))}{match.group(3)}",
+            html,
+        )
+        payload = json.dumps(manifests, ensure_ascii=False, sort_keys=True).replace("</", "<\\/")
+        tag = f'<script id="{MANIFEST_ELEMENT_ID}" type="application/json">{payload}</script>\n'
+        html = html.replace("</head>", f"{tag}</head>", 1)
+        return self.add(file_path, content=html.encode("utf-8"))
+
+    def respond(self, asset: Asset, request: Request, url_path: str) -> Response:
+        immutable = url_path == asset.fingerprinted_path and asset.fingerprinted_path != asset.logical_path
+        range_header = request.headers.get("range", "")
+        if_range = request.headers.get("if-range", "")
+        ranged = bool(range_header) and (not if_range or if_range.strip() == asset.etag)
+        # Compressed bodies are sent whole; ranges apply to the identity encoding only.
+        encoding = "" if ranged else _negotiate_encoding(asset, request.headers.get("accept-encoding", ""))
+        # Each encoding is its own representation, with its own validator.
+        etag = f'{asset.etag[:-1]}-{encoding}"' if encoding else asset.etag
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE,
+            "Accept-Ranges": "bytes",
+        }
+        if asset.encoded:
+            headers["Vary"] = "Accept-Encoding"
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match and (if_none_match.strip() == "*" or etag in if_none_match):
+            return Response(status_code=304, headers=headers)
+
+        if ranged:
+            return self._range_response(asset, range_header, headers)
+        if encoding:
+            headers.pop("Accept-Ranges")
+            headers["Content-Encoding"] = encoding
+            return Response(content=asset.encoded[encoding], media_type=asset.media_type, headers=headers)
+        return self._body_response(asset, 0, asset.size - 1, 200, headers)
+
+    def _range_response(self, asset: Asset, range_header: str, headers: Dict[str, str]) -> Response:
+        match = RANGE_RE.match(range_header.strip())
+        if match is None:
+            # Multi-range and other units are optional: answer with the whole file.
+            return self._body_response(asset, 0, asset.size - 1, 200, headers)
+        first, last = match.groups()
+        if not first and not last:
+            return self._body_response(asset, 0, asset.size - 1, 200, headers)
+        if not first:
+            start = max(0, asset.size - int(last))
+            end = asset.size - 1
+        else:
+            start = int(first)
+            end = min(int(last), asset.size - 1) if last else asset.size - 1
+        if start >= asset.size or start > end:
+            headers["Content-Range"] = f"bytes */{asset.size}"
+            return Response(status_code=416, headers=headers)
+        headers["Content-Range"] = f"bytes {start}-{end}/{asset.size}"
+        return self._body_response(asset, start, end, 206, headers)
+
+    def _body_response(self, asset: Asset, start: int, end: int, status_code: int, headers: Dict[str, str]) -> Response:
+        if asset.body is not None:
+            return Response(
+                content=asset.body[start : end + 1],
+                status_code=status_code,
+                media_type=asset.media_type,
+                headers=headers,
+            )
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            _read_file_range(asset.file_path, start, end),
+            status_code=status_code,
+            media_type=asset.media_type,
+            headers=headers,
+        )
+
+    def close(self) -> None:
+        for mapping in self._mappings:
+            mapping.close()
+        self._mappings.clear()
+
+
+def _read_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    remaining = end - start + 1
+    with path.open("rb") as handle:
+        handle.seek(start)
+        while remaining > 0:
+            chunk = handle.read(min(READ_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import logging
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+from typing import Iterable, List, Set, Tuple
+
+from .voice import VictimVoiceSynthesizer, spoken_text
+
+LOGGER = logging.getLogger(__name__)
+MAX_BANK_SEGMENTS = 256
+# Short breath between two pre-rendered sentences, as a speaker would leave.
+SEGMENT_GAP_SECONDS = 0.15
+
+# (channels, sample width, frame rate)
+WavFormat = Tuple[int, int, int]
+
+
+class AudioBank:
+    # Pre-rendered PCM for the fixed sentences of heuristic replies. A reply made only of known
+    # sentences is assembled by concatenation, without any TTS call.
+
+    def __init__(self, synthesizer: VictimVoiceSynthesizer, max_segments: int = MAX_BANK_SEGMENTS) -> None:
+        self.synthesizer = synthesizer
+        self.max_segments = max(1, max_segments)
+        self._segments: OrderedDict[str, Tuple[WavFormat, bytes]] = OrderedDict()
+        self._pending: Set[str] = set()
+        self._lock = Lock()
+        # One worker: warming up must never compete with live requests for provider quota.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-bank")
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, segment: str) -> bool:
+        return spoken_text(segment) in self._segments
+
+    def prewarm(self, segments: Iterable[str]) -> int:
+        if not self.synthesizer.enabled:
+            return 0
+        submitted = 0
+        for raw in segments:
+            segment = spoken_text(raw)
+            with self._lock:
+                if not segment or segment in self._segments or segment in self._pending:
+                    continue
+                self._pending.add(segment)
+            self._executor.submit(self._render, segment)
+            submitted += 1
+        return submitted
+
+    def _render(self, segment: str) -> None:
+        try:
+            audio_bytes, mime_type = self.synthesizer.synthesize(segment)
+            if "wav" not in str(mime_type).lower():
+                LOGGER.warning("Audio bank skipped non-WAV segment (%s): %s", mime_type, segment)
+                return
+            with wave.open(BytesIO(audio_bytes), "rb") as wav_file:
+                fmt = (wav_file.getnchannels(), wav_file.getsampwidth(), wav_file.getframerate())
+                frames = wav_file.readframes(wav_file.getnframes())
+        except Exception as exc:
+            LOGGER.warning("Audio bank warm-up failed for %r: %s", segment, exc)
+            return
+        finally:
+            with self._lock:
+                self._pending.discard(segment)
+
+        with self._lock:
+            self._segments[segment] = (fmt, frames)
+            self._segments.move_to_end(segment)
+            while len(self._segments) > self.max_segments:
+                self._segments.popitem(last=False)
+
+    def _split(self, text: str) -> List[str] | None:
+        # Longest known sentence first at each position; any unknown remainder means a miss.
+        pieces: List[str] = []
+        rest = text
+        while rest:
+            best = ""
+            for segment in self._segments:
+                if len(segment) > len(best) and rest.startswith(segment):
+                    if len(rest) == len(segment) or rest[len(segment)] == " ":
+                        best = segment
+            if not best:
+                return None
+            pieces.append(best)
+            rest = rest[len(best) :].lstrip()
+        return pieces
+
+    def assemble(self, text: str) -> bytes | None:
+        target = spoken_text(text)
+        if not target:
+            return None
+        with self._lock:
+            if not self._segments:
+                return None
+            pieces = self._split(target)
+            if not pieces:
+                return None
+            rendered = [self._segments[piece] for piece in pieces]
+            for piece in pieces:
+                self._segments.move_to_end(piece)
+
+        fmt = rendered[0][0]
+        if any(item[0] != fmt for item in rendered):
+            return None
+        channels, sample_width, rate = fmt
+        gap = b"\x00" * (int(SEGMENT_GAP_SECONDS * rate) * channels * sample_width)
+
+        out = BytesIO()
+        with wave.open(out, "wb") as wav_file:
+            wav_file.setnchannels(channels)
+            wav_file.setsampwidth(sample_width)
+            wav_file.setframerate(rate)
+            wav_file.writeframes(gap.join(frames for _fmt, frames in rendered))
+        return out.getvalue()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
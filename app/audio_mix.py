@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import logging
+import re
+import wave
+from io import BytesIO
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import miniaudio
+except Exception:
+    miniaudio = None
+
+from .config import Settings
+from .tools import SOUND_EFFECT_ASSETS
+
+LOGGER = logging.getLogger(__name__)
+SOUNDS_DIR = Path(__file__).resolve().parent / "sounds"
+SOUND_TAG_RE = re.compile(r"\[SOUND_EFFECT:\s*([A-Z_]+)\s*\]", re.IGNORECASE)
+WHITESPACE_RE = re.compile(r"\s+")
+# Gemini TTS answers in 24 kHz L16; assets are decoded at that rate ahead of the first request.
+DEFAULT_SAMPLE_RATE = 24000
+# Effects may ring a little past the last word instead of being cut with the voice.
+MAX_TAIL_SECONDS = 4.0
+FADE_OUT_SECONDS = 0.3
+
+
+def _spoken(text: str) -> str:
+    return WHITESPACE_RE.sub(" ", SOUND_TAG_RE.sub(" ", text)).strip()
+
+
+def build_cue_plan(text: str, sound_effects: Sequence[str] = ()) -> List[Tuple[str, float]]:
+    # Each tag starts at the share of spoken characters before it, the same estimate the
+    # browser used when it scheduled effects against the voice duration.
+    content = str(text or "")
+    total_spoken = max(len(_spoken(content)), 1)
+    cues: List[Tuple[str, float]] = []
+    cursor = 0
+    spoken_before = 0
+    for match in SOUND_TAG_RE.finditer(content):
+        spoken_before += len(_spoken(content[cursor : match.start()]))
+        effect = match.group(1).upper()
+        if effect in SOUND_EFFECT_ASSETS:
+            cues.append((effect, min(spoken_before / total_spoken, 1.0)))
+        cursor = match.end()
+    if cues:
+        return cues
+
+    seen: List[str] = []
+    for raw in sound_effects:
+        effect = str(raw or "").strip().upper()
+        if effect in SOUND_EFFECT_ASSETS and effect not in seen:
+            seen.append(effect)
+    return [(effect, 0.0) for effect in seen]
+
+
+class SoundEffectMixer:
+    def __init__(self, settings: Settings, sounds_dir: Path = SOUNDS_DIR) -> None:
+        self.settings = settings
+        self.sounds_dir = sounds_dir
+        self._buffers: Dict[Tuple[str, int], object] = {}
+        self._lock = Lock()
+        self._unavailable_reason = ""
+
+        if not settings.victim_voice_server_mix:
+            self._unavailable_reason = "Mixage serveur desactive (VICTIM_VOICE_SERVER_MIX=false)."
+        elif np is None:
+            self._unavailable_reason = "numpy indisponible pour le mixage serveur."
+        elif miniaudio is None:
+            self._unavailable_reason = "miniaudio indisponible pour decoder les bruitages."
+        else:
+            Thread(target=self.warm, daemon=True).start()
+
+    @property
+    def enabled(self) -> bool:
+        return not self._unavailable_reason
+
+    @property
+    def unavailable_reason(self) -> str:
+        return self._unavailable_reason
+
+    def warm(self, sample_rate: int = DEFAULT_SAMPLE_RATE) -> None:
+        for effect in SOUND_EFFECT_ASSETS:
+            self._effect_samples(effect, sample_rate)
+
+    def _effect_samples(self, effect: str, sample_rate: int):
+        key = (effect, sample_rate)
+        with self._lock:
+            if key in self._buffers:
+                return self._buffers[key]
+            filename, _gain = SOUND_EFFECT_ASSETS[effect]
+            path = self.sounds_dir / filename
+            try:
+                decoded = miniaudio.decode_file(
+                    str(path),
+                    output_format=miniaudio.SampleFormat.FLOAT32,
+                    nchannels=1,
+                    sample_rate=sample_rate,
+                )
+                samples = np.frombuffer(decoded.samples, dtype=np.float32).copy()
+            except Exception as exc:
+                LOGGER.warning("Sound effect decode failed (%s): %s", path, exc)
+                samples = None
+            # Failures are cached too so a broken asset is not decoded again on every reply.
+            self._buffers[key] = samples
+            return samples
+
+    def mix(self, audio_bytes: bytes, mime_type: str, text: str, sound_effects: Sequence[str] = ()) -> bytes | None:
+        if not self.enabled or not audio_bytes or "wav" not in str(mime_type or "").lower():
+            return None
+        cues = build_cue_plan(text, sound_effects)
+        if not cues:
+            return None
+
+        try:
+            with wave.open(BytesIO(audio_bytes), "rb") as wav_file:
+                channels = wav_file.getnchannels()
+                sample_width = wav_file.getsampwidth()
+                sample_rate = wav_file.getframerate()
+                frames = wav_file.readframes(wav_file.getnframes())
+        except (wave.Error, EOFError) as exc:
+            LOGGER.warning("Voice WAV unreadable, effects left to the client: %s", exc)
+            return None
+        if sample_width != 2 or sample_rate <= 0:
+            return None
+
+        voice = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+        if channels > 1:
+            voice = voice[: len(voice) - len(voice) % channels].reshape(-1, channels).mean(axis=1)
+        voice_length = len(voice)
+        max_length = voice_length + int(MAX_TAIL_SECONDS * sample_rate)
+
+        placed: List[Tuple[int, object, float]] = []
+        total_length = voice_length
+        for effect, position in cues:
+            samples = self._effect_samples(effect, sample_rate)
+            if samples is None:
+                continue
+            offset = int(position * voice_length)
+            length = min(len(samples), max_length - offset)
+            if length <= 0:
+                continue
+            placed.append((offset, samples[:length], SOUND_EFFECT_ASSETS[effect][1]))
+            total_length = max(total_length, offset + length)
+        if not placed:
+            return None
+
+        mixed = np.zeros(total_length, dtype=np.float32)
+        mixed[:voice_length] = voice
+        for offset, samples, gain in placed:
+            mixed[offset : offset + len(samples)] += samples * np.float32(gain)
+        tail = total_length - voice_length
+        if tail > 0:
+            fade = min(tail, int(FADE_OUT_SECONDS * sample_rate))
+            mixed[total_length - fade :] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)
+        np.clip(mixed, -1.0, 1.0, out=mixed)
+
+        out = BytesIO()
+        with wave.open(out, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes((mixed * 32767.0).astype("<i2").tobytes())
+        return out.getvalue()
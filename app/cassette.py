@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import time
+import zlib
+from collections import defaultdict, deque
+from pathlib import Path
+from threading import Lock
+from typing import Deque, Dict, Iterator, List, Tuple
+
+from langchain_core.messages import AIMessage
+
+LOGGER = logging.getLogger(__name__)
+CASSETTE_MODES = frozenset({"record", "replay"})
+KIND_INVOKE = "chat.invoke"
+KIND_STREAM = "chat.stream"
+KIND_TTS = "tts"
+
+
+class CassetteMiss(RuntimeError):
+    pass
+
+
+class ReplayedError(RuntimeError):
+    pass
+
+
+def _jsonable(value: object) -> object:
+    return json.loads(json.dumps(value, ensure_ascii=False, default=str))
+
+
+def request_key(scope: str, messages: List[object], tool_names: List[str]) -> str:
+    payload = [
+        scope,
+        tool_names,
+        [
+            [type(message).__name__, getattr(message, "content", message), getattr(message, "tool_calls", None) or []]
+            for message in messages
+        ],
+    ]
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def call_scope(scope: str, messages: List[object]) -> str:
+    # Agent plus the opening words of its system prompt: tells apart the calls one agent makes
+    # for different tasks (spelling vs. selection) while ignoring the per-turn context after them.
+    system = next((message for message in messages if type(message).__name__ == "SystemMessage"), None)
+    opening = " ".join(str(getattr(system, "content", "")).split()[:4]) if system is not None else ""
+    return f"{scope}:{opening}" if opening else scope
+
+
+def _message_payload(message: object) -> Dict[str, object]:
+    payload: Dict[str, object] = {"content": _jsonable(getattr(message, "content", message))}
+    tool_calls = getattr(message, "tool_calls", None) or []
+    if tool_calls:
+        payload["tool_calls"] = _jsonable(
+            [{"name": call.get("name"), "args": call.get("args") or {}, "id": call.get("id")} for call in tool_calls]
+        )
+    return payload
+
+
+def _message_from_payload(payload: Dict[str, object]) -> AIMessage:
+    tool_calls = payload.get("tool_calls") or []
+    if tool_calls:
+        return AIMessage(content=payload.get("content") or "", tool_calls=tool_calls)
+    return AIMessage(content=payload.get("content") or "")
+
+
+class Cassette:
+    # gzip JSON lines, one record per provider call. Each record is flushed as a sync point, so a
+    # show cut short still leaves every completed call readable.
+
+    def __init__(self, path: str | Path, mode: str, speed: float = 1.0) -> None:
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Mode de cassette inconnu: {mode}.")
+        self.path = Path(path)
+        self.mode = mode
+        # Multiplier on recorded delays: 1 replays at recorded speed, 0 as fast as possible.
+        self.speed = max(0.0, float(speed))
+        self._lock = Lock()
+        self._handle = None
+        self._by_key: Dict[Tuple[str, str], Deque[dict]] = defaultdict(deque)
+        self._by_scope: Dict[Tuple[str, str], Deque[dict]] = defaultdict(deque)
+        self.records = 0
+        self.misses = 0
+        if mode == "replay":
+            self._load()
+        else:
+            # A new recording session replaces the previous one: stale calls would replay first.
+            self._open_unlocked("wt")
+
+    def _load(self) -> None:
+        if not self.path.is_file():
+            LOGGER.warning("Cassette introuvable: %s", self.path)
+            return
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    self._index(json.loads(line))
+        except (EOFError, zlib.error, gzip.BadGzipFile) as exc:
+            # Recording interrupted without the gzip trailer: keep what was flushed.
+            LOGGER.warning("Cassette tronquee (%s): %s", self.path, exc)
+        LOGGER.info("Cassette chargee: %s (%d appels)", self.path, self.records)
+
+    def _index(self, record: dict) -> None:
+        record["served"] = False
+        self._by_key[(record["kind"], record["key"])].append(record)
+        self._by_scope[(record["kind"], record.get("scope", ""))].append(record)
+        self.records += 1
+
+    def write(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            if self._handle is None:
+                self._open_unlocked("at")
+            self._handle.write(line)
+            self._handle.flush()
+            self.records += 1
+
+    def _open_unlocked(self, mode: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = gzip.open(self.path, mode, encoding="utf-8")
+
+    def take(self, kind: str, key: str, scope: str = "") -> dict:
+        # Exact request first. When prompts changed (new sanitizer, new engine), the next unserved
+        # call of the same agent in recording order stands in for it, so a show still replays.
+        with self._lock:
+            exact = self._by_key.get((kind, key))
+            while exact:
+                record = exact.popleft()
+                if not record["served"]:
+                    record["served"] = True
+                    return record
+            ordered = self._by_scope.get((kind, scope))
+            while ordered:
+                record = ordered.popleft()
+                if not record["served"]:
+                    record["served"] = True
+                    self.misses += 1
+                    return record
+        raise CassetteMiss(f"Aucun enregistrement {kind} pour {scope or key[:12]}.")
+
+    def pause(self, delay_ms: float) -> None:
+        if self.speed > 0 and delay_ms > 0:
+            time.sleep(self.speed * delay_ms / 1000.0)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+
+class RecordingChatModel:
+    # Passes every call through to the real model and appends request hash, response and timing.
+
+    def __init__(self, inner: object, cassette: Cassette, scope: str, tool_names: List[str] | None = None) -> None:
+        self.inner = inner
+        self.cassette = cassette
+        self.scope = scope
+        self.tool_names = list(tool_names or [])
+
+    def bind_tools(self, tools: List[object]) -> "RecordingChatModel":
+        names = [str(getattr(tool, "name", "") or getattr(tool, "__name__", "")) for tool in tools]
+        return RecordingChatModel(self.inner.bind_tools(tools), self.cassette, self.scope, names)
+
+    def _record(self, kind: str, messages: List[object], **fields: object) -> None:
+        record = {
+            "kind": kind,
+            "scope": call_scope(self.scope, messages),
+            "key": request_key(self.scope, messages, self.tool_names),
+        }
+        record.update(fields)
+        try:
+            self.cassette.write(record)
+        except OSError as exc:
+            LOGGER.warning("Cassette write failed: %s", exc)
+
+    def invoke(self, messages: List[object]) -> AIMessage:
+        started = time.perf_counter()
+        try:
+            result = self.inner.invoke(messages)
+        except Exception as exc:
+            self._record(KIND_INVOKE, messages, elapsed_ms=_elapsed_ms(started), error=str(exc))
+            raise
+        self._record(KIND_INVOKE, messages, elapsed_ms=_elapsed_ms(started), response=_message_payload(result))
+        return result
+
+    def stream(self, messages: List[object]) -> Iterator[object]:
+        chunks: List[list] = []
+        error = ""
+        completed = False
+        last = time.perf_counter()
+        try:
+            for chunk in self.inner.stream(messages):
+                now = time.perf_counter()
+                # [delay since the previous chunk (or the request), content]
+                chunks.append([round(1000.0 * (now - last), 3), _jsonable(getattr(chunk, "content", chunk))])
+                last = now
+                yield chunk
+            completed = True
+        except Exception as exc:
+            error = str(exc)
+            raise
+        finally:
+            # A stream the consumer closed early (cancelled turn) would replay as a full response.
+            if completed or error:
+                fields: Dict[str, object] = {"chunks": chunks}
+                if error:
+                    fields["error"] = error
+                self._record(KIND_STREAM, messages, **fields)
+
+
+class ReplayChatModel:
+    def __init__(self, cassette: Cassette, scope: str, tool_names: List[str] | None = None) -> None:
+        self.cassette = cassette
+        self.scope = scope
+        self.tool_names = list(tool_names or [])
+
+    def bind_tools(self, tools: List[object]) -> "ReplayChatModel":
+        names = [str(getattr(tool, "name", "") or getattr(tool, "__name__", "")) for tool in tools]
+        return ReplayChatModel(self.cassette, self.scope, names)
+
+    def invoke(self, messages: List[object]) -> AIMessage:
+        key = request_key(self.scope, messages, self.tool_names)
+        record = self.cassette.take(KIND_INVOKE, key, call_scope(self.scope, messages))
+        self.cassette.pause(float(record.get("elapsed_ms", 0.0)))
+        if record.get("error"):
+            raise ReplayedError(record["error"])
+        return _message_from_payload(record.get("response") or {})
+
+    def stream(self, messages: List[object]) -> Iterator[AIMessage]:
+        key = request_key(self.scope, messages, self.tool_names)
+        record = self.cassette.take(KIND_STREAM, key, call_scope(self.scope, messages))
+        for delay_ms, content in record.get("chunks") or []:
+            self.cassette.pause(float(delay_ms))
+            yield AIMessage(content=content)
+        if record.get("error"):
+            raise ReplayedError(record["error"])
+
+
+def record_tts(cassette: Cassette, key: str, started: float, audio_bytes: bytes, mime_type: str) -> None:
+    record = {
+        "kind": KIND_TTS,
+        "scope": KIND_TTS,
+        "key": key,
+        "elapsed_ms": _elapsed_ms(started),
+        "mime": mime_type,
+        "audio": base64.b64encode(audio_bytes).decode("ascii"),
+    }
+    try:
+        cassette.write(record)
+    except OSError as exc:
+        LOGGER.warning("Cassette write failed: %s", exc)
+
+
+def replay_tts(cassette: Cassette, key: str) -> Tuple[bytes, str]:
+    record = cassette.take(KIND_TTS, key, KIND_TTS)
+    cassette.pause(float(record.get("elapsed_ms", 0.0)))
+    return base64.b64decode(record["audio"]), str(record.get("mime") or "audio/wav")
+
+
+def _elapsed_ms(started: float) -> float:
+    return round(1000.0 * (time.perf_counter() - started), 3)
+
+
+_CASSETTES: Dict[Tuple[str, str], Cassette] = {}
+_CASSETTES_LOCK = Lock()
+
+
+def open_cassette(path: str, mode: str, speed: float = 1.0) -> Cassette | None:
+    # One shared cassette per file, so every agent and the voice write to (or read from) the same show.
+    if mode not in CASSETTE_MODES or not path:
+        return None
+    with _CASSETTES_LOCK:
+        cassette = _CASSETTES.get((path, mode))
+        if cassette is None:
+            cassette = Cassette(path, mode, speed)
+            _CASSETTES[(path, mode)] = cassette
+        return cassette
+
+
+def close_cassettes() -> None:
+    with _CASSETTES_LOCK:
+        for cassette in _CASSETTES.values():
+            cassette.close()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import random
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Set, Tuple
+
+from .text import fold_text
+
+MERSENNE_PRIME = (1 << 61) - 1
+DEFAULT_NUM_PERM = 30
+DEFAULT_BANDS = 10
+DEFAULT_SIMILARITY = 0.75
+MAX_VERIFIED_CANDIDATES = 4
+# Crowded buckets only hold boilerplate shingles; capping them keeps inserts and queries O(1).
+MAX_BUCKET_SIZE = 32
+
+
+@dataclass
+class ProposalCluster:
+    representative: str
+    members: List[str] = field(default_factory=list)
+    first_index: int = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+
+def _shingles(folded: str, width: int = 3) -> Set[str]:
+    if len(folded) <= width:
+        return {folded}
+    padded = f" {folded} "
+    return {padded[idx : idx + width] for idx in range(len(padded) - width + 1)}
+
+
+def _jaccard(left: Set[str], right: Set[str]) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+class MinHashLSH:
+    # Banded MinHash: two texts whose shingle sets overlap enough share at least one band with high
+    # probability, so each insert/query only touches its own buckets instead of every cluster.
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, bands: int = DEFAULT_BANDS, seed: int = 1) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm doit etre un multiple de bands.")
+        rng = random.Random(seed)
+        self._rows = num_perm // bands
+        self._bands = bands
+        self._permutations = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+
+    def signature(self, shingles: Set[str]) -> List[int]:
+        hashes = [zlib.crc32(item.encode("utf-8")) for item in shingles]
+        return [min([(a * value + b) % MERSENNE_PRIME for value in hashes]) for a, b in self._permutations]
+
+    def _band_keys(self, signature: Sequence[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [
+            (band, tuple(signature[band * self._rows : (band + 1) * self._rows]))
+            for band in range(self._bands)
+        ]
+
+    def query(self, signature: Sequence[int], limit: int = MAX_VERIFIED_CANDIDATES) -> List[int]:
+        # Items sharing the most bands are the most similar; only those are worth verifying.
+        hits: Dict[int, int] = {}
+        for key in self._band_keys(signature):
+            for item_id in self._buckets.get(key, ()):
+                hits[item_id] = hits.get(item_id, 0) + 1
+        ranked = sorted(hits, key=lambda item_id: (-hits[item_id], item_id))
+        return ranked[:limit]
+
+    def insert(self, item_id: int, signature: Sequence[int]) -> None:
+        for key in self._band_keys(signature):
+            bucket = self._buckets.setdefault(key, [])
+            if len(bucket) < MAX_BUCKET_SIZE:
+                bucket.append(item_id)
+
+
+def cluster_proposals(
+    proposals: Sequence[str],
+    similarity: float = DEFAULT_SIMILARITY,
+    num_perm: int = DEFAULT_NUM_PERM,
+    bands: int = DEFAULT_BANDS,
+) -> List[ProposalCluster]:
+    clusters: List[ProposalCluster] = []
+    cluster_shingles: List[Set[str]] = []
+    by_folded: Dict[str, int] = {}
+    index = MinHashLSH(num_perm=num_perm, bands=bands)
+
+    for position, raw in enumerate(proposals):
+        text = str(raw).strip()
+        if not text:
+            continue
+        folded = fold_text(text) or text.lower()
+
+        # Case / accent / punctuation variants collapse without hashing.
+        cluster_id = by_folded.get(folded)
+        if cluster_id is None:
+            shingles = _shingles(folded)
+            signature = index.signature(shingles)
+            best_score = similarity
+            for candidate in index.query(signature):
+                score = _jaccard(shingles, cluster_shingles[candidate])
+                if score >= best_score:
+                    best_score = score
+                    cluster_id = candidate
+            if cluster_id is None:
+                cluster_id = len(clusters)
+                clusters.append(ProposalCluster(representative=text, first_index=position))
+                cluster_shingles.append(shingles)
+                index.insert(cluster_id, signature)
+            by_folded[folded] = cluster_id
+        clusters[cluster_id].members.append(text)
+
+    for cluster in clusters:
+        cluster.representative = _pick_representative(cluster.members)
+    clusters.sort(key=lambda item: (-item.size, item.first_index))
+    return clusters
+
+
+def _pick_representative(members: List[str]) -> str:
+    # Most frequent exact wording wins; ties keep the earliest submission.
+    counts: Dict[str, int] = {}
+    first_seen: Dict[str, int] = {}
+    for position, member in enumerate(members):
+        counts[member] = counts.get(member, 0) + 1
+        first_seen.setdefault(member, position)
+    return max(counts, key=lambda item: (counts[item], -first_seen[item]))
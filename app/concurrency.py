@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Generic, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class CapacityExceeded(RuntimeError):
+    def __init__(self, name: str, retry_after: int) -> None:
+        super().__init__(f"Capacite {name} saturee, reessayez dans {retry_after} s.")
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    # Async semaphore with a bounded FIFO queue. Waiters are plain futures created on the running
+    # loop, so the limiter is not tied to the loop that happened to build it. Callers beyond
+    # max_queue, or still queued after queue_timeout, are rejected instead of piling up.
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float) -> None:
+        self.name = name
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = max(0.0, float(queue_timeout))
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self._queue_time_total = 0.0
+        self._queue_time_max = 0.0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.queue_timeout or 1.0))
+
+    def _admit(self, started: float) -> None:
+        waited = time.monotonic() - started
+        self.admitted += 1
+        self._queue_time_total += waited
+        self._queue_time_max = max(self._queue_time_max, waited)
+
+    async def acquire(self) -> None:
+        started = time.monotonic()
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self._admit(started)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise CapacityExceeded(self.name, self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout or None)
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as this caller gave up: pass it on.
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(exc, asyncio.TimeoutError):
+                self.rejected += 1
+                raise CapacityExceeded(self.name, self._retry_after()) from None
+            raise
+        self._admit(started)
+
+    def release(self) -> None:
+        # The slot goes straight to the oldest live waiter, so _active only drops when nobody waits.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active = max(0, self._active - 1)
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *_exc_info) -> None:
+        self.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "queue_time_avg_ms": round(1000.0 * self._queue_time_total / self.admitted, 2) if self.admitted else 0.0,
+            "queue_time_max_ms": round(1000.0 * self._queue_time_max, 2),
+        }
+
+
+class SingleFlight(Generic[T]):
+    # Concurrent calls with the same key share one in-flight task instead of each doing the work.
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            self.started += 1
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        # A caller that disconnects must not cancel the work the other callers are waiting on.
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Marks the exception as retrieved when every caller has already gone away.
+            task.exception()
+
+    def stats(self) -> dict:
+        return {"inflight": len(self._inflight), "started": self.started, "coalesced": self.coalesced}
+
+
+class _StreamFlight:
+    def __init__(self) -> None:
+        self.ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        # Marks a start failure as retrieved when every caller has already gone away.
+        self.ready.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.chunks: List[bytes] = []
+        self.finished = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class _StreamSubscription:
+    # A follower's place in a flight, held from open() until its stream ends or is closed. A body
+    # that is never iterated (the response was dropped before it started) releases its place when
+    # it is closed or collected, so the producer is not kept running for nobody.
+
+    def __init__(self, flight: _StreamFlight, chunks: AsyncIterator[bytes]) -> None:
+        self._flight = flight
+        self._chunks = chunks
+        self._released = False
+
+    def __aiter__(self) -> "_StreamSubscription":
+        return self
+
+    async def __anext__(self) -> bytes:
+        try:
+            return await self._chunks.__anext__()
+        except BaseException:
+            self._release()
+            raise
+
+    async def aclose(self) -> None:
+        self._release()
+        await self._chunks.aclose()
+
+    def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._flight.subscribers -= 1
+
+    def __del__(self) -> None:
+        self._release()
+
+
+class StreamSingleFlight:
+    # SingleFlight for streamed bodies: the first caller opens the source, later callers with the
+    # same key replay the chunks already produced, then follow it live. The source is closed once
+    # it is drained or its last follower is gone.
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, _StreamFlight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def open(
+        self,
+        key: str,
+        start: Callable[[], Awaitable[Tuple[AsyncIterator[bytes], str]]],
+    ) -> Tuple[AsyncIterator[bytes], str]:
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = self._inflight[key] = _StreamFlight()
+            self.started += 1
+            asyncio.ensure_future(self._produce(key, flight, start))
+        else:
+            self.coalesced += 1
+        flight.subscribers += 1
+        try:
+            media_type = await asyncio.shield(flight.ready)
+        except BaseException:
+            flight.subscribers -= 1
+            raise
+        return _StreamSubscription(flight, self._follow(flight)), media_type
+
+    async def _produce(
+        self,
+        key: str,
+        flight: _StreamFlight,
+        start: Callable[[], Awaitable[Tuple[AsyncIterator[bytes], str]]],
+    ) -> None:
+        try:
+            source, media_type = await start()
+        except BaseException as exc:
+            self._forget(key, flight)
+            flight.ready.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        flight.ready.set_result(media_type)
+        try:
+            async for chunk in source:
+                flight.chunks.append(chunk)
+                flight.notify()
+                if not flight.subscribers:
+                    break
+        except BaseException as exc:
+            flight.error = exc
+            if not isinstance(exc, Exception):
+                raise
+        finally:
+            await source.aclose()
+            flight.finished = True
+            self._forget(key, flight)
+            flight.notify()
+
+    async def _follow(self, flight: _StreamFlight) -> AsyncIterator[bytes]:
+        index = 0
+        while True:
+            changed = flight.changed
+            if index < len(flight.chunks):
+                index += 1
+                yield flight.chunks[index - 1]
+                continue
+            if flight.error is not None:
+                raise flight.error
+            if flight.finished:
+                return
+            await changed.wait()
+
+    def _forget(self, key: str, flight: _StreamFlight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {"inflight": len(self._inflight), "started": self.started, "coalesced": self.coalesced}
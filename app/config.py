@@ -54,6 +54,28 @@ def _resolve_existing_file(path_value: str) -> Path | None:
     return None
 
 
+def _resolve_existing_dir(path_value: str) -> Path | None:
+    raw = (path_value or "").strip()
+    if not raw:
+        return None
+    path = Path(raw).expanduser()
+    candidates = [path]
+    if not path.is_absolute():
+        candidates.append((PROJECT_ROOT / path).expanduser())
+
+    for candidate in candidates:
+        if candidate.exists() and candidate.is_dir():
+            return candidate.resolve()
+    return None
+
+
+def _resolve_dir_path(path_value: str) -> Path:
+    path = Path((path_value or "").strip() or ".").expanduser()
+    if not path.is_absolute():
+        path = PROJECT_ROOT / path
+    return path.resolve()
+
+
 def _is_google_service_account(path: Path) -> bool:
     data = _read_json_file(path)
     return str(data.get("type", "")).strip().lower() == "service_account"
@@ -116,6 +138,12 @@ class Settings:
     vertex_location: str
     vertex_model: str
     victim_voice_enabled: bool
+    victim_voice_server_mix: bool
+    voice_cache_dir: str
+    voice_cache_max_bytes: int
+    voice_max_concurrency: int
+    voice_max_queue: int
+    voice_queue_timeout_seconds: float
     vertex_tts_model: str
     vertex_tts_voice: str
     vertex_tts_language: str
@@ -124,10 +152,43 @@ class Settings:
     app_host: str
     app_port: int
     max_history_messages: int
+    spelling_lexicon_file: str
+    moderator_llm_rerank: bool
+    safety_lexicon_file: str
+    scenario_packs_dir: str
+    default_scenario: str
+    trace_buffer_size: int
+    trace_export_file: str
+    fake_llm_ttft_ms: float
+    fake_llm_tokens_per_second: float
+    fake_llm_tool_call_rate: float
+    fake_llm_error_rate: float
+    fake_llm_seed: int
+    llm_cassette_mode: str
+    llm_cassette_file: str
+    llm_cassette_speed: float
+    transcripts_file: str
+    state_backend: str
+    state_db_file: str
+    state_redis_url: str
+    state_key: str
+    admission_max_concurrency: int
+    admission_turn_concurrency: int
+    admission_turn_queue: int
+    admission_turn_timeout_seconds: float
+    admission_audience_concurrency: int
+    admission_audience_queue: int
+    admission_audience_timeout_seconds: float
+    admission_voice_concurrency: int
+    admission_voice_queue: int
+    admission_voice_timeout_seconds: float
+    idempotency_max_entries: int
+    idempotency_ttl_seconds: float
+    idempotency_grace_seconds: float
 
     @property
     def llm_enabled(self) -> bool:
-        return self.llm_provider in {"openai", "anthropic", "gemini", "vertex"}
+        return self.llm_provider in {"openai", "anthropic", "gemini", "vertex", "fake", "replay"}
 
 
 def get_settings() -> Settings:
@@ -201,6 +262,21 @@ def get_settings() -> Settings:
             "Toujours lire exactement le texte fourni, sans ajouter ni retirer de mots."
         ),
     ).strip()
+    spelling_lexicon_path = _resolve_existing_file(os.getenv("SPELLING_LEXICON_FILE", ""))
+    spelling_lexicon_file = str(spelling_lexicon_path) if spelling_lexicon_path else ""
+    safety_lexicon_path = _resolve_existing_file(os.getenv("SAFETY_LEXICON_FILE", ""))
+    safety_lexicon_file = str(safety_lexicon_path) if safety_lexicon_path else ""
+    scenario_packs_path = _resolve_existing_dir(os.getenv("SCENARIO_PACKS_DIR", ""))
+    scenario_packs_dir = str(scenario_packs_path) if scenario_packs_path else ""
+    trace_export_raw = os.getenv("TRACE_EXPORT_FILE", "").strip()
+    trace_export_file = str(_resolve_dir_path(trace_export_raw)) if trace_export_raw else ""
+    transcripts_raw = os.getenv("TRANSCRIPTS_FILE", "").strip()
+    transcripts_file = str(_resolve_dir_path(transcripts_raw)) if transcripts_raw else ""
+    # Sharing the show across workers is opt-in: by default a single process keeps the show in
+    # memory, checkpointed without serialization, and starts a fresh one each time.
+    state_backend = os.getenv("STATE_BACKEND", "none").strip().lower()
+    if state_backend not in {"sqlite", "redis", "memory", "none"}:
+        state_backend = "none"
 
     # Determine provider based on preference or available keys
     if provider_pref == "openai":
@@ -211,6 +287,9 @@ def get_settings() -> Settings:
         llm_provider = "gemini" if google_api_key else "none"
     elif provider_pref == "vertex":
         llm_provider = "vertex" if google_credentials else "none"
+    elif provider_pref == "fake":
+        # Offline deterministic provider for benchmarks (app/fake_llm.py).
+        llm_provider = "fake"
     elif provider_pref == "none":
         llm_provider = "none"
     else:
@@ -226,6 +305,11 @@ def get_settings() -> Settings:
         else:
             llm_provider = "none"
 
+    llm_cassette_mode = os.getenv("LLM_CASSETTE_MODE", "").strip().lower()
+    if llm_cassette_mode == "replay":
+        # Every chat call is served from the cassette, whatever keys are configured.
+        llm_provider = "replay"
+
     # Set model based on provider
     if llm_provider == "openai":
         llm_model = openai_model
@@ -235,6 +319,10 @@ def get_settings() -> Settings:
         llm_model = google_model
     elif llm_provider == "vertex":
         llm_model = vertex_model
+    elif llm_provider == "fake":
+        llm_model = "fake"
+    elif llm_provider == "replay":
+        llm_model = "cassette"
     else:
         llm_model = "heuristic-only"
 
@@ -252,6 +340,12 @@ def get_settings() -> Settings:
         vertex_location=vertex_location,
         vertex_model=vertex_model,
         victim_voice_enabled=victim_voice_enabled,
+        victim_voice_server_mix=_read_bool_env("VICTIM_VOICE_SERVER_MIX", default=False),
+        voice_cache_dir=str(_resolve_dir_path(os.getenv("VOICE_CACHE_DIR", ".cache/voice"))),
+        voice_cache_max_bytes=int(os.getenv("VOICE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)).strip()),
+        voice_max_concurrency=int(os.getenv("VOICE_MAX_CONCURRENCY", "4").strip()),
+        voice_max_queue=int(os.getenv("VOICE_MAX_QUEUE", "16").strip()),
+        voice_queue_timeout_seconds=float(os.getenv("VOICE_QUEUE_TIMEOUT_SECONDS", "10").strip()),
         vertex_tts_model=vertex_tts_model,
         vertex_tts_voice=vertex_tts_voice,
         vertex_tts_language=vertex_tts_language,
@@ -259,4 +353,37 @@ def get_settings() -> Settings:
         app_host=os.getenv("APP_HOST", "127.0.0.1").strip(),
         app_port=int(os.getenv("APP_PORT", "8000").strip()),
         max_history_messages=int(os.getenv("MAX_HISTORY_MESSAGES", "40").strip()),
+        spelling_lexicon_file=spelling_lexicon_file,
+        moderator_llm_rerank=_read_bool_env("MODERATOR_LLM_RERANK", default=True),
+        safety_lexicon_file=safety_lexicon_file,
+        scenario_packs_dir=scenario_packs_dir,
+        default_scenario=os.getenv("DEFAULT_SCENARIO", "tech_support_microsoft").strip(),
+        trace_buffer_size=int(os.getenv("TRACE_BUFFER_SIZE", "50").strip()),
+        trace_export_file=trace_export_file,
+        fake_llm_ttft_ms=float(os.getenv("FAKE_LLM_TTFT_MS", "300").strip()),
+        fake_llm_tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "40").strip()),
+        fake_llm_tool_call_rate=float(os.getenv("FAKE_LLM_TOOL_CALL_RATE", "0.2").strip()),
+        fake_llm_error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0").strip()),
+        fake_llm_seed=int(os.getenv("FAKE_LLM_SEED", "0").strip()),
+        llm_cassette_mode=llm_cassette_mode,
+        llm_cassette_file=str(_resolve_dir_path(os.getenv("LLM_CASSETTE_FILE", ".cache/cassettes/show.jsonl.gz"))),
+        llm_cassette_speed=float(os.getenv("LLM_CASSETTE_SPEED", "1").strip()),
+        transcripts_file=transcripts_file,
+        state_backend=state_backend,
+        state_db_file=str(_resolve_dir_path(os.getenv("STATE_DB_FILE", ".cache/state/show.sqlite3"))),
+        state_redis_url=os.getenv("STATE_REDIS_URL", "redis://localhost:6379/0").strip(),
+        state_key=os.getenv("STATE_KEY", "show").strip() or "show",
+        admission_max_concurrency=int(os.getenv("ADMISSION_MAX_CONCURRENCY", "12").strip()),
+        admission_turn_concurrency=int(os.getenv("ADMISSION_TURN_CONCURRENCY", "2").strip()),
+        admission_turn_queue=int(os.getenv("ADMISSION_TURN_QUEUE", "4").strip()),
+        admission_turn_timeout_seconds=float(os.getenv("ADMISSION_TURN_TIMEOUT_SECONDS", "30").strip()),
+        admission_audience_concurrency=int(os.getenv("ADMISSION_AUDIENCE_CONCURRENCY", "2").strip()),
+        admission_audience_queue=int(os.getenv("ADMISSION_AUDIENCE_QUEUE", "8").strip()),
+        admission_audience_timeout_seconds=float(os.getenv("ADMISSION_AUDIENCE_TIMEOUT_SECONDS", "10").strip()),
+        admission_voice_concurrency=int(os.getenv("ADMISSION_VOICE_CONCURRENCY", "8").strip()),
+        admission_voice_queue=int(os.getenv("ADMISSION_VOICE_QUEUE", "32").strip()),
+        admission_voice_timeout_seconds=float(os.getenv("ADMISSION_VOICE_TIMEOUT_SECONDS", "10").strip()),
+        idempotency_max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "256").strip()),
+        idempotency_ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600").strip()),
+        idempotency_grace_seconds=float(os.getenv("IDEMPOTENCY_GRACE_SECONDS", "5").strip()),
     )
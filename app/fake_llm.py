@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Iterator, List
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from .config import Settings
+
+ALLOWED_STAGES_RE = re.compile(r"Stages autorises depuis [^:]+:\s*([^\n]+?)\.\n")
+LIST_ITEM_RE = re.compile(r"^- (.+)$", re.MULTILINE)
+TOKEN_RE = re.compile(r"\S+\s*")
+FAKE_VICTIM_REPLIES = (
+    "Allo ? Attendez, je n'entends pas bien. Vous etes qui exactement ?",
+    "Mon neveu m'a dit de ne jamais donner mes codes. Pourquoi vous voulez ca ?",
+    "Attendez, je cherche mes lunettes... Vous pouvez repeter le numero de dossier ?",
+    "Ah non, l'ordinateur c'est ma fille qui s'en occupe. Elle rentre jeudi.",
+    "Vous parlez trop vite. A mon age on prend son temps, vous savez.",
+    "Je note, je note... Comment vous dites votre nom deja ?",
+)
+FAKE_TOOL_NAMES = ("dog_bark", "doorbell", "coughing_fit", "tv_background")
+
+
+class FakeLLMError(RuntimeError):
+    pass
+
+
+class FakeChatModel:
+    # Offline stand-in for the chat providers: recognises each agent from its system prompt and
+    # answers in the format that agent parses. Replies depend only on the prompt and the seed, so a
+    # run is reproducible; latency, tool calls and failures follow the FAKE_LLM_* settings.
+
+    def __init__(self, settings: Settings, bound_tool_names: List[str] | None = None) -> None:
+        self.settings = settings
+        self._bound_tool_names = list(bound_tool_names or [])
+
+    def bind_tools(self, tools: List[object]) -> "FakeChatModel":
+        names = [str(getattr(tool, "name", "") or getattr(tool, "__name__", "")).strip() for tool in tools]
+        return FakeChatModel(self.settings, bound_tool_names=[name for name in names if name])
+
+    def _rng(self, messages: List[object]) -> random.Random:
+        digest = hashlib.sha256(str(self.settings.fake_llm_seed).encode("utf-8"))
+        for message in messages:
+            digest.update(type(message).__name__.encode("utf-8"))
+            digest.update(str(getattr(message, "content", message)).encode("utf-8"))
+        return random.Random(digest.digest())
+
+    def _reply_text(self, messages: List[object], rng: random.Random) -> str:
+        system = next((str(m.content) for m in messages if isinstance(m, SystemMessage)), "")
+        user = next((str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+
+        if "Directeur de Scenario" in system:
+            match = ALLOWED_STAGES_RE.search(system)
+            stages = [item.strip() for item in match.group(1).split(",")] if match else []
+            return json.dumps(
+                {
+                    "next_stage_key": rng.choice(stages) if stages else "",
+                    "objective": "",
+                    "reason": "Decision du fournisseur simule.",
+                }
+            )
+        if "correcteur orthographique" in system:
+            return json.dumps(LIST_ITEM_RE.findall(user), ensure_ascii=False)
+        if "moderateur audience" in system:
+            return json.dumps(LIST_ITEM_RE.findall(user)[:3], ensure_ascii=False)
+        return rng.choice(FAKE_VICTIM_REPLIES)
+
+    def _maybe_fail(self, rng: random.Random) -> None:
+        if rng.random() < self.settings.fake_llm_error_rate:
+            raise FakeLLMError("Erreur simulee du fournisseur LLM.")
+
+    def _wants_tool(self, messages: List[object], rng: random.Random) -> bool:
+        if not self._bound_tool_names or any(isinstance(m, ToolMessage) for m in messages):
+            return False
+        return rng.random() < self.settings.fake_llm_tool_call_rate
+
+    def _sleep_tokens(self, count: int) -> None:
+        rate = self.settings.fake_llm_tokens_per_second
+        if rate > 0 and count > 0:
+            time.sleep(count / rate)
+
+    def invoke(self, messages: List[object]) -> AIMessage:
+        rng = self._rng(messages)
+        time.sleep(self.settings.fake_llm_ttft_ms / 1000.0)
+        self._maybe_fail(rng)
+        if self._wants_tool(messages, rng):
+            name = rng.choice([n for n in FAKE_TOOL_NAMES if n in self._bound_tool_names] or self._bound_tool_names)
+            return AIMessage(content="", tool_calls=[{"name": name, "args": {}, "id": f"fake_{rng.getrandbits(32):08x}"}])
+        text = self._reply_text(messages, rng)
+        self._sleep_tokens(len(TOKEN_RE.findall(text)))
+        return AIMessage(content=text)
+
+    def stream(self, messages: List[object]) -> Iterator[AIMessage]:
+        rng = self._rng(messages)
+        time.sleep(self.settings.fake_llm_ttft_ms / 1000.0)
+        self._maybe_fail(rng)
+        text = self._reply_text(messages, rng)
+        if self._wants_tool(messages, rng):
+            # Streams carry effects inline, the way the Gemini adapter asks its model to.
+            effect = rng.choice(("DOG_BARKING", "DOORBELL", "COUGHING_FIT", "TV_BACKGROUND_BFMTV"))
+            text = f"{text} [SOUND_EFFECT: {effect}]"
+        rate = self.settings.fake_llm_tokens_per_second
+        for index, token in enumerate(TOKEN_RE.findall(text)):
+            if index and rate > 0:
+                time.sleep(1.0 / rate)
+            yield AIMessage(content=token)
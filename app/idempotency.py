@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from threading import Condition, Event as ThreadEvent, Lock
+from typing import AsyncIterator, Callable, Dict, List, Tuple
+
+Event = Tuple[str, Dict[str, object]]
+
+
+class IdempotencyKeyReused(RuntimeError):
+    def __init__(self) -> None:
+        super().__init__("Idempotency-Key deja utilise pour une autre requete.")
+
+
+def request_fingerprint(route: str, body: Dict[str, object]) -> str:
+    encoded = json.dumps([route, body], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class EventLog:
+    # Everything one request produced, in order. The first client and any retry with the same key
+    # follow the same log: a late subscriber replays it from the start, then waits for the rest.
+
+    def __init__(self, fingerprint: str = "", grace_seconds: float = 0.0) -> None:
+        self.fingerprint = fingerprint
+        # How long a log without followers waits for a retry to reattach before cancelling.
+        self.grace_seconds = max(0.0, float(grace_seconds))
+        self.created_at = time.monotonic()
+        self._cond = Condition()
+        self._events: List[Event] = []
+        self.closed = False
+        self.subscribers = 0
+        self._wakers: List[Callable[[], None]] = []
+        # Set when the last follower left before the work was done and nobody reattached within
+        # grace_seconds: nobody is left to read it.
+        self.cancelled = ThreadEvent()
+
+    def append(self, event: str, payload: Dict[str, object]) -> None:
+        with self._cond:
+            self._events.append((event, payload))
+            self._wake_unlocked()
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._wake_unlocked()
+
+    def _wake_unlocked(self) -> None:
+        self._cond.notify_all()
+        for wake in self._wakers:
+            wake()
+
+    async def follow(self) -> AsyncIterator[Event]:
+        # Runs on the event loop, so a client disconnect (the response task is cancelled) leaves
+        # at once instead of waiting in a thread for the next event.
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(ready.set)
+
+        with self._cond:
+            self.subscribers += 1
+            self._wakers.append(wake)
+        try:
+            index = 0
+            while True:
+                with self._cond:
+                    pending = self._events[index:]
+                    index += len(pending)
+                    finished = self.closed
+                    if not pending and not finished:
+                        ready.clear()
+                for item in pending:
+                    yield item
+                if finished and not pending:
+                    return
+                if not pending:
+                    await ready.wait()
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+                self._wakers.remove(wake)
+                abandoned = not self.subscribers and not self.closed
+            if abandoned:
+                if self.grace_seconds:
+                    loop.call_later(self.grace_seconds, self._cancel_if_abandoned)
+                else:
+                    self._cancel_if_abandoned()
+
+    def _cancel_if_abandoned(self) -> None:
+        with self._cond:
+            if not self.subscribers and not self.closed:
+                self.cancelled.set()
+
+    def result(self) -> Event:
+        # Last event once the request has finished: the stored response of a plain endpoint.
+        with self._cond:
+            while not self.closed:
+                self._cond.wait()
+            return self._events[-1] if self._events else ("error", {"status": 500, "detail": ""})
+
+
+class IdempotencyCache:
+    # Bounded LRU of event logs by Idempotency-Key. In-flight logs are never evicted; finished
+    # ones expire after ttl_seconds or when the cache is over max_entries.
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 600.0, grace_seconds: float = 5.0) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.grace_seconds = max(0.0, float(grace_seconds))
+        self._lock = Lock()
+        self._logs: "OrderedDict[str, EventLog]" = OrderedDict()
+        self.replayed = 0
+
+    def __len__(self) -> int:
+        return len(self._logs)
+
+    def begin(self, key: str, fingerprint: str) -> Tuple[EventLog, bool]:
+        # (log, True) when the caller must do the work, (log, False) when it should follow it.
+        with self._lock:
+            self._expire_unlocked()
+            log = self._logs.get(key)
+            if log is not None and log.cancelled.is_set():
+                # Abandoned by its client and being rolled back: the retry runs the work again.
+                del self._logs[key]
+                log = None
+            if log is not None:
+                if log.fingerprint != fingerprint:
+                    raise IdempotencyKeyReused()
+                self._logs.move_to_end(key)
+                self.replayed += 1
+                return log, False
+            log = EventLog(fingerprint, self.grace_seconds)
+            self._logs[key] = log
+            self._evict_unlocked()
+            return log, True
+
+    def forget(self, key: str, log: EventLog) -> None:
+        # Failed requests are not kept: a retry with the same key runs again.
+        with self._lock:
+            if self._logs.get(key) is log:
+                del self._logs[key]
+
+    def _expire_unlocked(self) -> None:
+        if not self.ttl_seconds:
+            return
+        deadline = time.monotonic() - self.ttl_seconds
+        for key, log in list(self._logs.items()):
+            if log.created_at >= deadline:
+                break
+            if log.closed:
+                del self._logs[key]
+
+    def _evict_unlocked(self) -> None:
+        for key, log in list(self._logs.items()):
+            if len(self._logs) <= self.max_entries:
+                return
+            if log.closed:
+                del self._logs[key]
+
+    def stats(self) -> dict:
+        return {"entries": len(self._logs), "max_entries": self.max_entries, "replayed": self.replayed}
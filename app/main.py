@@ -1,25 +1,173 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from queue import Queue
+from contextlib import asynccontextmanager
+from dataclasses import asdict
 from threading import Thread
 from pathlib import Path
+from typing import Callable, List, Tuple
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response, StreamingResponse
-from fastapi.staticfiles import StaticFiles
-
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from .admission import AdmissionController, AdmissionMiddleware, RouteClass
+from .agents import TurnCancelled, heuristic_voice_segments
+from .analytics import append_transcript, build_columns, compute_stats, iter_transcripts, transcript_record
+from .assets import AssetStore
+from .audio_bank import AudioBank
+from .audio_mix import SoundEffectMixer, build_cue_plan
+from .cassette import close_cassettes
+from .concurrency import CapacityExceeded, ConcurrencyLimiter, SingleFlight, StreamSingleFlight
 from .config import get_settings
-from .schemas import ProposalRequest, SelectChoicesRequest, StepRequest, VictimVoiceRequest, VoteRequest
-from .state import SimulationEngine
-from .voice import VictimVoiceSynthesizer, VoiceSynthesisError
+from .idempotency import EventLog, IdempotencyCache, IdempotencyKeyReused, request_fingerprint
+from .metrics import ACTIVE_STREAMS, CONTENT_TYPE, QUEUE_DEPTH, TURNS_CANCELLED, render_metrics
+from .schemas import (
+    ProposalRequest,
+    ResetRequest,
+    SelectChoicesRequest,
+    StepRequest,
+    VictimVoiceRequest,
+    VoteRequest,
+)
+from .sound_catalog import SoundCatalog
+from .state import ConversationMessage, SimulationEngine, SimulationState
+from .state_store import StateConflict, build_state_store
+from .tracing import TRACES
+from .voice import VictimVoiceSynthesizer, VoiceSynthesisError, audio_duration_ms
+from .voice_cache import is_voice_cache_key
+from .voice_prefetch import VoiceJob, VoiceJobCancelled, VoicePrefetcher
 
 settings = get_settings()
-engine = SimulationEngine(settings)
+TRACES.configure(settings.trace_buffer_size, settings.trace_export_file)
+engine = SimulationEngine(settings, store=build_state_store(settings))
 victim_voice = VictimVoiceSynthesizer(settings)
-app = FastAPI(title="Simulateur d'Arnaque Dynamique")
+sound_mixer = SoundEffectMixer(settings)
+voice_limiter = ConcurrencyLimiter(
+    "voix",
+    max_concurrency=settings.voice_max_concurrency,
+    max_queue=settings.voice_max_queue,
+    queue_timeout=settings.voice_queue_timeout_seconds,
+)
+voice_flights: SingleFlight[tuple[bytes, str]] = SingleFlight()
+voice_stream_flights = StreamSingleFlight()
+audio_bank = AudioBank(victim_voice)
+
+
+def _render_message_voice(text: str, sound_effects: List[str], job: VoiceJob) -> None:
+    audio_bytes = audio_bank.assemble(text)
+    if audio_bytes is None and not (sound_mixer.enabled and build_cue_plan(text, sound_effects)):
+        # Nothing to mix in: relay the provider stream so the browser can start playing at once.
+        chunks, mime_type = victim_voice.synthesize_stream(text)
+        job.open(mime_type)
+        for chunk in chunks:
+            job.append(chunk)
+        return
+    mime_type = "audio/wav"
+    if audio_bytes is None:
+        audio_bytes, mime_type = victim_voice.synthesize(text)
+    mixed_bytes = sound_mixer.mix(audio_bytes, mime_type, text, sound_effects)
+    if mixed_bytes:
+        job.open("audio/wav", effects_mixed=True)
+        job.append(mixed_bytes)
+        return
+    job.open(mime_type)
+    job.append(audio_bytes)
+
+
+voice_prefetcher = VoicePrefetcher(_render_message_voice)
+
+
+def _prefetch_victim_voice(message: ConversationMessage) -> None:
+    if victim_voice.enabled:
+        voice_prefetcher.schedule(message.id, message.content, message.sound_effects)
+
+
+engine.add_victim_message_listener(_prefetch_victim_voice)
+
+
+def _archive_show(finished: SimulationState) -> None:
+    # One JSON line per finished show, in the batch transcript format, for /api/analytics.
+    if settings.transcripts_file:
+        record = transcript_record(finished.scenario_name, [asdict(msg) for msg in finished.messages], origin="live")
+        append_transcript(settings.transcripts_file, record)
+
+
+engine.add_show_end_listener(_archive_show)
+
+
+# Expensive routes share one budget of slots; operator turns are served before the audience,
+# and the audience before spectators' voice requests.
+admission = AdmissionController(
+    settings.admission_max_concurrency,
+    [
+        RouteClass(
+            "turn",
+            priority=0,
+            max_concurrency=settings.admission_turn_concurrency,
+            max_queue=settings.admission_turn_queue,
+            queue_timeout=settings.admission_turn_timeout_seconds,
+        ),
+        RouteClass(
+            "audience",
+            priority=1,
+            max_concurrency=settings.admission_audience_concurrency,
+            max_queue=settings.admission_audience_queue,
+            queue_timeout=settings.admission_audience_timeout_seconds,
+        ),
+        RouteClass(
+            "voice",
+            priority=2,
+            max_concurrency=settings.admission_voice_concurrency,
+            max_queue=settings.admission_voice_queue,
+            queue_timeout=settings.admission_voice_timeout_seconds,
+        ),
+    ],
+)
+ADMISSION_ROUTES = {
+    ("POST", "/api/simulation/step"): "turn",
+    ("POST", "/api/simulation/step/stream"): "turn",
+    ("POST", "/api/audience/select"): "audience",
+    ("POST", "/api/voice/victim"): "voice",
+    ("GET", "/api/voice/victim/stream"): "voice",
+}
+
+
+def _queue_depths() -> dict:
+    # Read at scrape time from the structures that own the queues; nothing is tracked twice.
+    return {
+        **admission.queue_depths(),
+        ("voice_tts", "active"): voice_limiter.active,
+        ("voice_tts", "waiting"): voice_limiter.waiting,
+        ("voice_coalesced", "inflight"): len(voice_flights),
+        ("voice_stream_coalesced", "inflight"): len(voice_stream_flights),
+        ("voice_prefetch", "pending"): voice_prefetcher.pending,
+        ("audio_bank", "pending"): audio_bank.pending,
+        ("audience_proposals", "pending"): len(engine.state.pending_proposals),
+    }
+
 
+QUEUE_DEPTH.set_collector(_queue_depths)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Renders the canned heuristic sentences in the background so degraded turns speak at once.
+    audio_bank.prewarm(heuristic_voice_segments(str(engine.snapshot().get("audience_constraint", ""))))
+    yield
+    voice_prefetcher.shutdown()
+    audio_bank.shutdown()
+    sound_assets.close()
+    close_cassettes()
+    if engine.store is not None:
+        engine.store.close()
+
+
+app = FastAPI(title="Simulateur d'Arnaque Dynamique", lifespan=lifespan)
+
+app.add_middleware(AdmissionMiddleware, controller=admission, routes=ADMISSION_ROUTES)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -44,25 +192,115 @@ def health() -> dict:
         "victim_voice_name": voice_status.get("voice", ""),
         "victim_voice_language": voice_status.get("language", ""),
         "victim_voice_reason": voice_status.get("reason", ""),
+        "victim_voice_server_mix": sound_mixer.enabled,
+        "victim_voice_queue": {**voice_limiter.stats(), **voice_flights.stats()},
+        "victim_voice_stream_flights": voice_stream_flights.stats(),
+        "victim_voice_bank_segments": len(audio_bank),
+        "admission": admission.stats(),
+        "idempotency": idempotency.stats(),
     }
 
 
+@app.get("/api/metrics", include_in_schema=False)
+def get_metrics() -> Response:
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+
+@app.get("/api/debug/traces")
+def get_debug_traces(limit: int = Query(20, ge=1, le=500)) -> dict:
+    return {"traces": TRACES.recent(limit)}
+
+
+@app.get("/api/analytics")
+def get_analytics(include_current: bool = True) -> dict:
+    records = list(iter_transcripts([settings.transcripts_file] if settings.transcripts_file else []))
+    if include_current:
+        snapshot = engine.snapshot()
+        if snapshot["messages"]:
+            records.append(transcript_record(snapshot["scenario_name"], snapshot["messages"], origin="live", record_id="current"))
+    try:
+        return compute_stats(build_columns(records))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+
 @app.get("/api/simulation/state")
 def get_state() -> dict:
     return engine.snapshot()
 
 
-@app.post("/api/simulation/reset")
-def reset_simulation() -> dict:
-    return engine.reset()
+@app.get("/api/scenarios")
+def list_scenarios() -> dict:
+    return {"default": engine.default_scenario_key, "scenarios": engine.list_scenarios()}
 
 
-@app.post("/api/simulation/step")
-def simulation_step(payload: StepRequest) -> dict:
+@app.post("/api/simulation/reset")
+def reset_simulation(payload: ResetRequest | None = None) -> dict:
     try:
-        return engine.step(payload.scammer_input)
+        return engine.reset(payload.scenario if payload else None)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except StateConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+# Retried operator and audience requests carry the same Idempotency-Key: they replay the stored
+# result, or follow the in-flight request, instead of running the turn again.
+idempotency = IdempotencyCache(
+    settings.idempotency_max_entries,
+    settings.idempotency_ttl_seconds,
+    settings.idempotency_grace_seconds,
+)
+IDEMPOTENCY_KEY = Header(default=None, alias="Idempotency-Key", max_length=200)
+
+
+def _begin_idempotent(key: str | None, route: str, body: dict) -> Tuple[EventLog, bool]:
+    if not key:
+        return EventLog(), True
+    try:
+        return idempotency.begin(key, request_fingerprint(route, body))
+    except IdempotencyKeyReused as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+def _fail_idempotent(key: str | None, log: EventLog, status_code: int, detail: object) -> None:
+    log.append("error", {"status": status_code, "detail": detail})
+    log.close()
+    if key:
+        idempotency.forget(key, log)
+
+
+def _idempotent(key: str | None, route: str, body: dict, work: Callable[[], dict]) -> dict:
+    log, created = _begin_idempotent(key, route, body)
+    if not created:
+        event_name, result = log.result()
+        if event_name == "error":
+            raise HTTPException(status_code=int(result["status"]), detail=result["detail"])
+        return result
+    try:
+        result = work()
+    except HTTPException as exc:
+        _fail_idempotent(key, log, exc.status_code, exc.detail)
+        raise
+    except Exception:
+        _fail_idempotent(key, log, 500, "Erreur interne.")
+        raise
+    log.append("done", result)
+    log.close()
+    return result
+
+
+@app.post("/api/simulation/step")
+def simulation_step(payload: StepRequest, idempotency_key: str | None = IDEMPOTENCY_KEY) -> dict:
+    def work() -> dict:
+        try:
+            return engine.step(payload.scammer_input, include_timings=payload.include_timings)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except StateConflict as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+    return _idempotent(idempotency_key, "step", payload.model_dump(), work)
 
 
 def _sse_event(event: str, payload: dict) -> str:
@@ -70,85 +308,335 @@ def _sse_event(event: str, payload: dict) -> str:
 
 
 @app.post("/api/simulation/step/stream")
-def simulation_step_stream(payload: StepRequest) -> StreamingResponse:
-    def event_stream():
-        queue: Queue[tuple[str, dict] | None] = Queue()
+def simulation_step_stream(payload: StepRequest, idempotency_key: str | None = IDEMPOTENCY_KEY) -> StreamingResponse:
+    log, created = _begin_idempotent(idempotency_key, "step/stream", payload.model_dump())
+    if created:
 
         def on_text_chunk(chunk: str) -> None:
             if chunk:
-                queue.put(("chunk", {"text": chunk}))
+                log.append("chunk", {"text": chunk})
 
         def run_step() -> None:
             try:
-                snapshot = engine.step_stream(payload.scammer_input, on_text_chunk=on_text_chunk)
-                queue.put(("done", {"state": snapshot}))
+                snapshot = engine.step_stream(
+                    payload.scammer_input,
+                    on_text_chunk=on_text_chunk,
+                    include_timings=payload.include_timings,
+                    cancel=log.cancelled,
+                )
+            except TurnCancelled as exc:
+                # Every client left: the turn was rolled back and a retry with the key runs it anew.
+                TURNS_CANCELLED.inc()
+                _fail_idempotent(idempotency_key, log, 499, str(exc))
             except ValueError as exc:
-                queue.put(("error", {"detail": str(exc)}))
+                _fail_idempotent(idempotency_key, log, 400, str(exc))
+            except StateConflict as exc:
+                _fail_idempotent(idempotency_key, log, 409, str(exc))
             except Exception:
-                queue.put(("error", {"detail": "Erreur interne pendant la reponse en streaming."}))
-            finally:
-                queue.put(None)
+                _fail_idempotent(idempotency_key, log, 500, "Erreur interne pendant la reponse en streaming.")
+            else:
+                log.append("done", {"state": snapshot})
+                log.close()
 
         worker = Thread(target=run_step, daemon=True)
         worker.start()
 
-        while True:
-            item = queue.get()
-            if item is None:
-                break
-            event_name, event_payload = item
-            yield _sse_event(event_name, event_payload)
+    async def event_stream():
+        # A retry with the same key replays the chunks already sent, then follows the live turn.
+        # When the last client disconnects and no retry reattaches in time, the log cancels the turn.
+        with ACTIVE_STREAMS.track("step"):
+            async for event_name, event_payload in log.follow():
+                yield _sse_event(event_name, event_payload)
 
     headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
 
 
+async def _synthesize_victim_voice(text: str, cache_key: str) -> tuple[bytes, str]:
+    assembled = audio_bank.assemble(text)
+    if assembled is not None:
+        return assembled, "audio/wav"
+    # Cache hits are a file read; only provider calls go through the limiter.
+    if cache_key in victim_voice.cache:
+        return await run_in_threadpool(victim_voice.synthesize, text)
+    async with voice_limiter:
+        return await run_in_threadpool(victim_voice.synthesize, text)
+
+
+def _set_duration_header(headers: dict, audio_bytes: bytes, mime_type: str) -> None:
+    # Lets the browser schedule sound effects without waiting for the audio metadata to load.
+    duration_ms = audio_duration_ms(audio_bytes, mime_type)
+    if duration_ms is not None:
+        headers["X-Audio-Duration-Ms"] = str(duration_ms)
+
+
 @app.post("/api/voice/victim")
-def synthesize_victim_voice(payload: VictimVoiceRequest) -> Response:
+async def synthesize_victim_voice(payload: VictimVoiceRequest) -> Response:
     try:
-        audio_bytes, mime_type = victim_voice.synthesize(payload.text)
+        cache_key = victim_voice.cache_key(payload.text)
+        # Spectators replaying the same reply share a single provider call.
+        audio_bytes, mime_type = await voice_flights.run(
+            cache_key,
+            lambda: _synthesize_victim_voice(payload.text, cache_key),
+        )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except CapacityExceeded as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": str(exc.retry_after)}) from exc
     except VoiceSynthesisError as exc:
         raise HTTPException(status_code=503, detail=str(exc)) from exc
-    return Response(content=audio_bytes, media_type=mime_type, headers={"Cache-Control": "no-store"})
-
 
-@app.post("/api/audience/submit")
-def submit_audience_proposal(payload: ProposalRequest) -> dict:
+    mixed_bytes = None
+    if payload.mix_effects:
+        mixed_bytes = await run_in_threadpool(
+            sound_mixer.mix, audio_bytes, mime_type, payload.text, payload.sound_effects
+        )
+    headers = {"Cache-Control": "no-store", "X-Sound-Effects-Mixed": "1" if mixed_bytes else "0"}
+    if mixed_bytes:
+        _set_duration_header(headers, mixed_bytes, "audio/wav")
+        return Response(content=mixed_bytes, media_type="audio/wav", headers=headers)
+    _set_duration_header(headers, audio_bytes, mime_type)
+    if cache_key in victim_voice.cache:
+        # The same clip is addressable by GET, which browsers are allowed to cache.
+        headers["ETag"] = f'"{cache_key}"'
+        headers["Content-Location"] = f"/api/voice/victim/cache/{cache_key}"
+    return Response(content=audio_bytes, media_type=mime_type, headers=headers)
+
+
+async def _open_voice_stream(text: str, cache_key: str):
+    limited = cache_key not in victim_voice.cache
+    if limited:
+        await voice_limiter.acquire()
+    try:
+        chunks, mime_type = await run_in_threadpool(victim_voice.synthesize_stream, text)
+    except BaseException:
+        if limited:
+            voice_limiter.release()
+        raise
+
+    async def drain():
+        # The slot is held until the provider stream is drained or every listener went away.
+        try:
+            async for chunk in iterate_in_threadpool(chunks):
+                yield chunk
+        finally:
+            if limited:
+                voice_limiter.release()
+
+    return drain(), mime_type
+
+
+@app.get("/api/voice/victim/stream")
+async def stream_victim_voice(text: str = Query(..., min_length=1, max_length=4000)) -> Response:
     try:
-        return engine.submit_proposal(payload.proposal)
+        cache_key = victim_voice.cache_key(text)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
+    assembled = audio_bank.assemble(text)
+    if assembled is not None:
+        return Response(content=assembled, media_type="audio/wav", headers={"Cache-Control": "no-store"})
 
-@app.post("/api/audience/select")
-def select_audience_choices(payload: SelectChoicesRequest) -> dict:
     try:
-        return engine.select_choices(payload.proposals)
+        # Listeners asking for the same reply at once share one provider stream and one slot.
+        chunks, mime_type = await voice_stream_flights.open(cache_key, lambda: _open_voice_stream(text, cache_key))
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except CapacityExceeded as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": str(exc.retry_after)}) from exc
+    except VoiceSynthesisError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+    async def relay():
+        with ACTIVE_STREAMS.track("voice"):
+            async for chunk in chunks:
+                yield chunk
+
+    # Same text, same clip: the browser may replay this URL from its own cache.
+    headers = {"Cache-Control": "private, max-age=3600", "ETag": f'"{cache_key}"', "X-Accel-Buffering": "no"}
+    return StreamingResponse(relay(), media_type=mime_type, headers=headers)
+
+
+def _find_victim_message(message_id: str) -> dict | None:
+    for message in reversed(engine.snapshot()["messages"]):
+        if message.get("id") == message_id and message.get("role") == "victim":
+            return message
+    return None
+
+
+async def _message_voice_job(message_id: str) -> VoiceJob | None:
+    job = voice_prefetcher.get(message_id)
+    if job is not None:
+        return job
+    # Evicted, lost on restart or committed by another worker: the text is in the shared state.
+    message = await run_in_threadpool(_find_victim_message, message_id)
+    if message is None:
+        return None
+    return voice_prefetcher.schedule(
+        message_id,
+        str(message.get("content") or ""),
+        list(message.get("sound_effects") or []),
+    )
+
+
+async def _ready_message_voice(message_id: str) -> VoiceJob:
+    for attempt in range(2):
+        job = await _message_voice_job(message_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Aucune voix pour ce message.")
+        try:
+            # Waits on the job started when the reply was committed, without holding a thread.
+            await job.wait_ready()
+            break
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except VoiceSynthesisError as exc:
+            raise HTTPException(status_code=503, detail=str(exc)) from exc
+        except VoiceJobCancelled as exc:
+            # Evicted before it started: the next attempt schedules it again.
+            if attempt:
+                raise HTTPException(status_code=503, detail=str(exc)) from exc
+    return job
+
+
+@app.get("/api/voice/message/{message_id}/meta")
+async def get_message_voice_meta(message_id: str) -> dict:
+    # What the browser needs before playing /api/voice/message/{id} once: whether the effects are
+    # already mixed in, and the duration when the clip is complete.
+    job = await _ready_message_voice(message_id)
+    complete = job.done and job.error is None
+    return {
+        "media_type": job.mime_type,
+        "effects_mixed": job.effects_mixed,
+        "duration_ms": audio_duration_ms(job.audio(), job.mime_type) if complete else None,
+    }
+
+
+@app.get("/api/voice/message/{message_id}")
+async def get_message_voice(message_id: str) -> Response:
+    job = await _ready_message_voice(message_id)
+    headers = {
+        "Cache-Control": "private, max-age=3600",
+        "X-Sound-Effects-Mixed": "1" if job.effects_mixed else "0",
+    }
+    if job.done and job.error is None:
+        audio = job.audio()
+        _set_duration_header(headers, audio, job.mime_type)
+        return Response(content=audio, media_type=job.mime_type, headers=headers)
+
+    async def relay():
+        with ACTIVE_STREAMS.track("voice"):
+            async for chunk in job.follow():
+                yield chunk
+
+    headers["X-Accel-Buffering"] = "no"
+    return StreamingResponse(relay(), media_type=job.mime_type, headers=headers)
+
+
+@app.get("/api/voice/victim/cache/{cache_key}")
+def get_cached_victim_voice(cache_key: str, request: Request) -> Response:
+    if not is_voice_cache_key(cache_key):
+        raise HTTPException(status_code=404, detail="Audio introuvable.")
+    etag = f'"{cache_key}"'
+    # Keys are content hashes: a client holding this tag already has the right bytes.
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    cached = victim_voice.cache.get(cache_key)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Audio introuvable.")
+    audio_bytes, mime_type = cached
+    _set_duration_header(headers, audio_bytes, mime_type)
+    return Response(content=audio_bytes, media_type=mime_type, headers=headers)
+
+
+@app.post("/api/audience/submit")
+def submit_audience_proposal(payload: ProposalRequest, idempotency_key: str | None = IDEMPOTENCY_KEY) -> dict:
+    def work() -> dict:
+        try:
+            return engine.submit_proposal(payload.proposal)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except StateConflict as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+    return _idempotent(idempotency_key, "audience/submit", payload.model_dump(), work)
+
+
+@app.post("/api/audience/select")
+def select_audience_choices(payload: SelectChoicesRequest, idempotency_key: str | None = IDEMPOTENCY_KEY) -> dict:
+    def work() -> dict:
+        try:
+            return engine.select_choices(payload.proposals)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except StateConflict as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+    return _idempotent(idempotency_key, "audience/select", payload.model_dump(), work)
 
 
 @app.post("/api/audience/vote")
-def vote_audience_choice(payload: VoteRequest) -> dict:
-    try:
-        return engine.vote_choice(payload.winner_index)
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+def vote_audience_choice(payload: VoteRequest, idempotency_key: str | None = IDEMPOTENCY_KEY) -> dict:
+    def work() -> dict:
+        try:
+            snapshot = engine.vote_choice(payload.winner_index)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except StateConflict as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+        audio_bank.prewarm(heuristic_voice_segments(str(snapshot.get("audience_constraint", ""))))
+        return snapshot
+
+    return _idempotent(idempotency_key, "audience/vote", payload.model_dump(), work)
 
 
 @app.post("/api/audience/vote/simulate")
-def simulate_vote() -> dict:
-    try:
-        return engine.simulate_vote()
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+def simulate_vote(idempotency_key: str | None = IDEMPOTENCY_KEY) -> dict:
+    def work() -> dict:
+        try:
+            snapshot = engine.simulate_vote()
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except StateConflict as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+        audio_bank.prewarm(heuristic_voice_segments(str(snapshot.get("audience_constraint", ""))))
+        return snapshot
+
+    return _idempotent(idempotency_key, "audience/vote/simulate", {}, work)
 
 
 frontend_dir = Path(__file__).resolve().parent.parent / "frontend"
 sounds_dir = Path(__file__).resolve().parent / "sounds"
-if sounds_dir.exists():
-    app.mount("/sounds", StaticFiles(directory=str(sounds_dir)), name="sounds")
-if frontend_dir.exists():
-    app.mount("/", StaticFiles(directory=str(frontend_dir), html=True), name="frontend")
+sound_assets = AssetStore(sounds_dir, url_prefix="/sounds")
+frontend_assets = AssetStore(frontend_dir)
+index_page = frontend_dir / "index.html"
+if index_page.is_file():
+    frontend_assets.render_html(index_page, {**sound_assets.manifest(), **frontend_assets.manifest()})
+sound_catalog = SoundCatalog(sounds_dir, url_for=sound_assets.url_for)
+
+
+@app.get("/api/sounds/catalog")
+def get_sound_catalog() -> dict:
+    return sound_catalog.to_payload()
+
+
+@app.api_route("/sounds/{name:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def get_sound_asset(name: str, request: Request) -> Response:
+    url_path = f"/sounds/{name}"
+    asset = sound_assets.get(url_path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return sound_assets.respond(asset, request, url_path)
+
+
+# Registered last: every path not matched by the API falls through to the frontend files.
+@app.api_route("/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def get_frontend_asset(path: str, request: Request) -> Response:
+    url_path = f"/{path}"
+    if url_path.endswith("/"):
+        url_path += "index.html"
+    asset = frontend_assets.get(url_path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return frontend_assets.respond(asset, request, url_path)
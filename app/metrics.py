@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds. LLM and TTS calls span tens of milliseconds to tens of seconds.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+LOCK_WAIT_BUCKETS = (0.0001, 0.001, 0.01, 0.05, 0.25, 1.0, 5.0, 20.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        key = tuple(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(tuple(label_values), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    # Fixed buckets, one lock and a bisect per observation: cheap enough for every request.
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non cumulative, last one is +Inf), sum].
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        key = tuple(label_values)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[key] = series
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(tuple(label_values))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    # Either set directly or read from a callback at scrape time (queue depths owned elsewhere).
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        collect: Callable[[], Dict[LabelValues, float]] | None = None,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._collect = collect
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = Lock()
+
+    def set_collector(self, collect: Callable[[], Dict[LabelValues, float]]) -> None:
+        self._collect = collect
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        key = tuple(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    @contextmanager
+    def track(self, *label_values: str) -> Iterator[None]:
+        self.inc(*label_values)
+        try:
+            yield
+        finally:
+            self.dec(*label_values)
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(tuple(label_values), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = dict(self._values)
+        if self._collect is not None:
+            values.update(self._collect())
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+@contextmanager
+def timed_call(histogram: Histogram, *label_values: str) -> Iterator[None]:
+    # Appends an "ok"/"error" outcome label after the given ones.
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        histogram.observe(time.perf_counter() - started, *label_values, outcome)
+
+
+class TimedLock:
+    # threading.Lock drop-in that records how long callers waited to get it.
+
+    def __init__(self, wait_histogram: Histogram, *label_values: str) -> None:
+        self._lock = Lock()
+        self._histogram = wait_histogram
+        self._label_values = label_values
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        started = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._histogram.observe(time.perf_counter() - started, *self._label_values)
+        return acquired
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *_exc_info) -> None:
+        self.release()
+
+
+LLM_CALL_SECONDS = Histogram(
+    "scam_llm_call_seconds",
+    "Duration of remote LLM calls per agent, failed calls included.",
+    ("agent", "outcome"),
+)
+LLM_STREAM_FIRST_TOKEN_SECONDS = Histogram(
+    "scam_llm_stream_first_token_seconds",
+    "Time from opening an LLM stream to its first non-empty chunk.",
+    ("agent",),
+)
+TTS_CALL_SECONDS = Histogram(
+    "scam_tts_call_seconds",
+    "Duration of TTS provider calls (first audio chunk for streams).",
+    ("mode", "outcome"),
+)
+AGENT_FALLBACKS = Counter(
+    "scam_agent_heuristic_fallbacks_total",
+    "Turns answered by the local heuristic instead of the remote LLM.",
+    ("agent",),
+)
+AGENT_REMOTE_DISABLED = Counter(
+    "scam_agent_remote_disabled_total",
+    "Times an agent switched its remote LLM off after a network or auth error.",
+    ("agent",),
+)
+ENGINE_LOCK_WAIT_SECONDS = Histogram(
+    "scam_engine_lock_wait_seconds",
+    "Time spent waiting for the simulation engine lock.",
+    buckets=LOCK_WAIT_BUCKETS,
+)
+ACTIVE_STREAMS = Gauge("scam_active_streams", "Open streaming responses.", ("kind",))
+ACTIVE_TURNS = Gauge("scam_active_turns", "Simulation turns running or waiting for the engine lock.")
+QUEUE_DEPTH = Gauge("scam_queue_depth", "Items waiting or running in internal queues.", ("queue", "state"))
+ADMISSION_REJECTED = Counter(
+    "scam_admission_rejected_total",
+    "Requests turned away by admission control (429 queue full, 503 wait timeout).",
+    ("route_class", "status"),
+)
+TURNS_CANCELLED = Counter(
+    "scam_turns_cancelled_total",
+    "Streamed turns rolled back because every client disconnected.",
+)
+
+REGISTRY = (
+    LLM_CALL_SECONDS,
+    LLM_STREAM_FIRST_TOKEN_SECONDS,
+    TTS_CALL_SECONDS,
+    AGENT_FALLBACKS,
+    AGENT_REMOTE_DISABLED,
+    ENGINE_LOCK_WAIT_SECONDS,
+    ACTIVE_STREAMS,
+    ACTIVE_TURNS,
+    QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    TURNS_CANCELLED,
+)
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
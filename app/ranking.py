@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+from .text import fold_text
+
+FRENCH_STOPWORDS = frozenset(
+    {
+        "a", "au", "aux", "avec", "ce", "ces", "cet", "cette", "dans", "de", "des", "du", "elle", "en", "est",
+        "et", "il", "ils", "je", "la", "le", "les", "leur", "lui", "ma", "mais", "me", "mes", "mon", "ne", "nous",
+        "on", "ou", "par", "pas", "pour", "qu", "que", "qui", "sa", "se", "ses", "son", "sur", "ta", "te", "tes",
+        "ton", "tu", "un", "une", "vos", "votre", "vous", "y",
+    }
+)
+RELEVANCE_WEIGHT = 0.55
+POPULARITY_WEIGHT = 0.45
+# Maximal marginal relevance trade-off: 1.0 ignores diversity, 0.0 only looks for novelty.
+MMR_LAMBDA = 0.7
+
+
+@dataclass(frozen=True)
+class RankedProposal:
+    text: str
+    score: float
+    relevance: float
+    popularity: int
+
+
+def _terms(text: str) -> List[str]:
+    return [token for token in fold_text(text).split() if len(token) > 2 and token not in FRENCH_STOPWORDS]
+
+
+def _tfidf_vectors(documents: Sequence[List[str]]) -> List[Dict[str, float]]:
+    document_frequency: Dict[str, int] = {}
+    for terms in documents:
+        for term in set(terms):
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+
+    total = len(documents)
+    vectors: List[Dict[str, float]] = []
+    for terms in documents:
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        vector = {
+            term: (1.0 + math.log(count)) * (math.log((1 + total) / (1 + document_frequency[term])) + 1.0)
+            for term, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if norm:
+            vector = {term: weight / norm for term, weight in vector.items()}
+        vectors.append(vector)
+    return vectors
+
+
+def _cosine(left: Dict[str, float], right: Dict[str, float]) -> float:
+    if len(left) > len(right):
+        left, right = right, left
+    return sum(weight * right.get(term, 0.0) for term, weight in left.items())
+
+
+def rank_proposals(
+    candidates: Sequence[str],
+    popularity: Sequence[int],
+    context: Sequence[str],
+    limit: int = 3,
+) -> List[RankedProposal]:
+    if not candidates:
+        return []
+
+    # The stage context is ranked as one more document so that its rare words weigh the most.
+    documents = [_terms(text) for text in candidates]
+    documents.append(_terms(" ".join(context)))
+    vectors = _tfidf_vectors(documents)
+    query = vectors.pop()
+
+    max_popularity = max(max(popularity, default=1), 1)
+    base_scores: List[float] = []
+    relevances: List[float] = []
+    for idx, vector in enumerate(vectors):
+        relevance = _cosine(vector, query)
+        count = popularity[idx] if idx < len(popularity) else 1
+        popularity_score = math.log1p(count) / math.log1p(max_popularity)
+        relevances.append(relevance)
+        base_scores.append(RELEVANCE_WEIGHT * relevance + POPULARITY_WEIGHT * popularity_score)
+
+    remaining = list(range(len(candidates)))
+    picked: List[int] = []
+    ranked: List[RankedProposal] = []
+    while remaining and len(ranked) < limit:
+        best_idx = -1
+        best_score = -math.inf
+        for idx in remaining:
+            redundancy = max((_cosine(vectors[idx], vectors[other]) for other in picked), default=0.0)
+            score = MMR_LAMBDA * base_scores[idx] - (1.0 - MMR_LAMBDA) * redundancy
+            # Strict comparison keeps the earliest candidate on ties, which makes the order stable.
+            if score > best_score:
+                best_score = score
+                best_idx = idx
+        remaining.remove(best_idx)
+        picked.append(best_idx)
+        count = popularity[best_idx] if best_idx < len(popularity) else 1
+        ranked.append(
+            RankedProposal(
+                text=candidates[best_idx],
+                score=round(best_score, 6),
+                relevance=round(relevances[best_idx], 6),
+                popularity=count,
+            )
+        )
+    return ranked
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import logging
+import time
+from pathlib import Path
+from threading import Lock
+from typing import List, Tuple
+
+from .text import KeywordAutomaton
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_SAFETY_LEXICON_PATH = Path(__file__).resolve().parent / "data" / "safety_lexicon.txt"
+RELOAD_CHECK_INTERVAL_SECONDS = 2.0
+
+
+def _read_terms(path: Path) -> List[str]:
+    terms: List[str] = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        term = line.strip()
+        if term and not term.startswith("#"):
+            terms.append(term)
+    return terms
+
+
+class SafetyFilter:
+    def __init__(self, lexicon_path: str = "", reload_interval: float = RELOAD_CHECK_INTERVAL_SECONDS) -> None:
+        self.lexicon_path = Path(lexicon_path) if lexicon_path else DEFAULT_SAFETY_LEXICON_PATH
+        self._reload_interval = reload_interval
+        self._lock = Lock()
+        self._automaton = KeywordAutomaton([])
+        self._signature: Tuple[int, int] | None = None
+        self._next_check = 0.0
+        self.reload(force=True)
+
+    @property
+    def term_count(self) -> int:
+        return len(self._automaton)
+
+    def reload(self, force: bool = False) -> bool:
+        with self._lock:
+            try:
+                stat = self.lexicon_path.stat()
+            except OSError as exc:
+                if force:
+                    LOGGER.warning("Safety lexicon unavailable (%s): %s", self.lexicon_path, exc)
+                return False
+
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if not force and signature == self._signature:
+                return False
+
+            try:
+                terms = _read_terms(self.lexicon_path)
+            except Exception as exc:
+                LOGGER.warning("Safety lexicon reload failed; keeping previous terms: %s", exc)
+                return False
+
+            # Readers keep using the previous automaton until the new one is fully built.
+            self._automaton = KeywordAutomaton((term, term) for term in terms)
+            self._signature = signature
+            LOGGER.info("Safety lexicon loaded: %d terms from %s", len(terms), self.lexicon_path)
+            return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self._reload_interval
+        self.reload()
+
+    def matches(self, text: str) -> List[str]:
+        self._maybe_reload()
+        return [str(label) for label, _start, _end in self._automaton.iter_matches(text)]
+
+    def is_blocked(self, text: str) -> bool:
+        self._maybe_reload()
+        return self._automaton.first_match(text) is not None
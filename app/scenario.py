@@ -1,7 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List
+import json
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Tuple
+
+from .text import KeywordAutomaton, fold_text
+
+LOGGER = logging.getLogger(__name__)
+SCENARIO_PACKS_DIR = Path(__file__).resolve().parent / "data" / "scenarios"
+DEFAULT_SCENARIO_KEY = "tech_support_microsoft"
 
 
 @dataclass(frozen=True)
@@ -23,7 +33,7 @@ TECH_SUPPORT_STEPS: List[ScenarioStep] = [
         key="problem_claim",
         name="Probleme annonce",
         objective="Demander des precisions confuses sur le probleme pretendu.",
-        trigger_keywords=["virus", "alerte", "infecte", "erreur", "securite"],
+        trigger_keywords=["virus", "alerte*", "infecte*", "erreur*", "securite"],
     ),
     ScenarioStep(
         key="remote_access_request",
@@ -46,13 +56,166 @@ TECH_SUPPORT_STEPS: List[ScenarioStep] = [
 ]
 
 
-def detect_stage_from_text(latest_scammer: str, current_stage: int) -> int:
-    text = latest_scammer.lower()
-    next_stage = current_stage
+@dataclass(frozen=True)
+class StageTransition:
+    source: str
+    target: str
+    # Empty triggers reuse the keywords of the target stage.
+    triggers: List[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    key: str
+    name: str
+    steps: List[ScenarioStep]
+    # Extra edges (branches, retries after a refusal) on top of the implicit forward edges.
+    transitions: List[StageTransition] = field(default_factory=list)
+    matcher: KeywordAutomaton = field(init=False, repr=False, compare=False)
+    _key_index: Dict[str, int] = field(init=False, repr=False, compare=False)
+    _stage_keywords: List[List[int]] = field(init=False, repr=False, compare=False)
+    # Per source stage: (target, explicit, keyword ids) for each outgoing edge.
+    _outgoing: List[List[Tuple[int, bool, List[int]]]] = field(init=False, repr=False, compare=False)
+    _allowed: List[FrozenSet[int]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        key_index = {step.key: idx for idx, step in enumerate(self.steps)}
+        keyword_ids: Dict[str, int] = {}
+
+        def _ids(keywords: List[str]) -> List[int]:
+            out: List[int] = []
+            for keyword in keywords:
+                # Keywords match whole words ("vite" never fires inside "invite"); a trailing "*"
+                # written in the scenario opts into a prefix match ("alerte*" also catches "alertes").
+                pattern = keyword.strip()
+                out.append(keyword_ids.setdefault(pattern, len(keyword_ids)))
+            return out
+
+        stage_keywords = [_ids(step.trigger_keywords) for step in self.steps]
+        outgoing: List[List[Tuple[int, bool, List[int]]]] = [
+            [(target, False, stage_keywords[target]) for target in range(source + 1, len(self.steps))]
+            for source in range(len(self.steps))
+        ]
+        for transition in self.transitions:
+            source = key_index.get(transition.source)
+            target = key_index.get(transition.target)
+            if source is None or target is None or source == target:
+                raise ValueError(f"transition invalide: {transition.source} -> {transition.target}")
+            triggers = _ids(transition.triggers) if transition.triggers else stage_keywords[target]
+            edges = [edge for edge in outgoing[source] if edge[0] != target]
+            edges.append((target, True, triggers))
+            outgoing[source] = edges
+
+        # Every keyword of every stage and edge shares one automaton; labels are keyword ids.
+        matcher = KeywordAutomaton((pattern, keyword_id) for pattern, keyword_id in keyword_ids.items())
+        allowed = [frozenset({source, *(edge[0] for edge in edges)}) for source, edges in enumerate(outgoing)]
+
+        object.__setattr__(self, "matcher", matcher)
+        object.__setattr__(self, "_key_index", key_index)
+        object.__setattr__(self, "_stage_keywords", stage_keywords)
+        object.__setattr__(self, "_outgoing", outgoing)
+        object.__setattr__(self, "_allowed", allowed)
+
+    def _keyword_hits(self, text: str) -> Dict[int, int]:
+        return self.matcher.counts(fold_text(text), folded=True)
+
+    def stage_hits(self, text: str) -> List[int]:
+        hits = self._keyword_hits(text)
+        return [sum(hits.get(keyword_id, 0) for keyword_id in ids) for ids in self._stage_keywords]
+
+    def stage_index(self, stage_key: str) -> int | None:
+        return self._key_index.get((stage_key or "").strip().lower())
+
+    def can_transition(self, source: int, target: int) -> bool:
+        return 0 <= source < len(self._allowed) and target in self._allowed[source]
+
+    def next_stage_keys(self, source: int) -> List[str]:
+        return [self.steps[edge[0]].key for edge in self._outgoing[source]]
+
+    def next_stage(self, text: str, current_stage: int) -> int:
+        hits = self._keyword_hits(text)
+        if not hits:
+            return current_stage
+
+        # The current stage competes with its own keywords and wins ties: only a stronger signal
+        # moves the show on.
+        stay_score = sum(hits.get(keyword_id, 0) for keyword_id in self._stage_keywords[current_stage])
+        best_stage = current_stage
+        best_rank: Tuple[int, bool, int] | None = None
+        for target, explicit, keyword_ids in self._outgoing[current_stage]:
+            score = sum(hits.get(keyword_id, 0) for keyword_id in keyword_ids)
+            if score <= stay_score:
+                continue
+            # Most triggered edge first, declared branches before implicit ones, then the furthest stage.
+            rank = (score, explicit, target)
+            if best_rank is None or rank > best_rank:
+                best_rank = rank
+                best_stage = target
+        return best_stage
+
+
+TECH_SUPPORT_SCENARIO = Scenario(
+    key=DEFAULT_SCENARIO_KEY,
+    name="Faux support technique Microsoft",
+    steps=TECH_SUPPORT_STEPS,
+    transitions=[
+        # After a refusal the caller often goes back to remote access or to the payment demand.
+        StageTransition(source="credential_or_payment", target="remote_access_request"),
+        StageTransition(source="pressure_closing", target="credential_or_payment"),
+        StageTransition(source="pressure_closing", target="remote_access_request"),
+    ],
+)
+
+
+def _scenario_from_payload(payload: dict) -> Scenario:
+    steps = [
+        ScenarioStep(
+            key=str(item["key"]).strip().lower(),
+            name=str(item["name"]).strip(),
+            objective=str(item["objective"]).strip(),
+            trigger_keywords=[str(keyword).strip() for keyword in item.get("trigger_keywords", []) if str(keyword).strip()],
+        )
+        for item in payload["steps"]
+    ]
+    if not steps:
+        raise ValueError("scenario sans etape")
+    transitions = [
+        StageTransition(
+            source=str(item["from"]).strip().lower(),
+            target=str(item["to"]).strip().lower(),
+            triggers=[str(keyword).strip() for keyword in item.get("triggers", []) if str(keyword).strip()],
+        )
+        for item in payload.get("transitions", [])
+    ]
+    return Scenario(
+        key=str(payload["key"]).strip(),
+        name=str(payload.get("name") or payload["key"]).strip(),
+        steps=steps,
+        transitions=transitions,
+    )
+
+
+def _load_pack_dir(directory: Path, out: Dict[str, Scenario]) -> None:
+    if not directory.is_dir():
+        return
+    for path in sorted(directory.glob("*.json")):
+        try:
+            scenario = _scenario_from_payload(json.loads(path.read_text(encoding="utf-8")))
+        except Exception as exc:
+            LOGGER.warning("Scenario pack ignored (%s): %s", path, exc)
+            continue
+        out[scenario.key] = scenario
+
+
+@lru_cache(maxsize=8)
+def load_scenarios(extra_dir: str = "") -> Dict[str, Scenario]:
+    scenarios: Dict[str, Scenario] = {TECH_SUPPORT_SCENARIO.key: TECH_SUPPORT_SCENARIO}
+    _load_pack_dir(SCENARIO_PACKS_DIR, scenarios)
+    if extra_dir:
+        _load_pack_dir(Path(extra_dir), scenarios)
+    return scenarios
 
-    for idx in range(current_stage, len(TECH_SUPPORT_STEPS)):
-        step = TECH_SUPPORT_STEPS[idx]
-        if any(keyword in text for keyword in step.trigger_keywords):
-            next_stage = max(next_stage, idx)
 
-    return min(next_stage, len(TECH_SUPPORT_STEPS) - 1)
+def detect_stage_from_text(latest_scammer: str, current_stage: int, scenario: Scenario | None = None) -> int:
+    active = scenario or TECH_SUPPORT_SCENARIO
+    return active.next_stage(latest_scammer, current_stage)
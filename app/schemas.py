@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 
 class StepRequest(BaseModel):
     scammer_input: str = Field(..., min_length=1, max_length=1200)
+    include_timings: bool = False
 
 
 class ProposalRequest(BaseModel):
@@ -21,5 +22,11 @@ class VoteRequest(BaseModel):
     winner_index: int = Field(..., ge=0, le=2)
 
 
+class ResetRequest(BaseModel):
+    scenario: Optional[str] = Field(default=None, max_length=80)
+
+
 class VictimVoiceRequest(BaseModel):
     text: str = Field(..., min_length=1, max_length=4000)
+    mix_effects: bool = False
+    sound_effects: List[str] = Field(default_factory=list, max_length=8)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import logging
+import math
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import miniaudio
+except Exception:
+    miniaudio = None
+
+from .tools import SOUND_EFFECT_SPECS
+
+LOGGER = logging.getLogger(__name__)
+SOUNDS_DIR = Path(__file__).resolve().parent / "sounds"
+
+# Bitrates in kbps, indexed by the 4-bit header field, per (MPEG-1?, layer).
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates indexed by the 2-bit version field (0: MPEG-2.5, 2: MPEG-2, 3: MPEG-1).
+_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+
+@dataclass(frozen=True)
+class Mp3Frame:
+    sample_rate: int
+    bitrate_kbps: int
+    samples: int
+    length: int
+    mono: bool
+    mpeg1: bool
+
+
+@dataclass(frozen=True)
+class Mp3Info:
+    duration_ms: int
+    sample_rate: int
+    bitrate_kbps: int
+    frames: int
+
+
+def _parse_frame_header(data: bytes, offset: int) -> Mp3Frame | None:
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+    version = (data[offset + 1] >> 3) & 0x03
+    layer = 4 - ((data[offset + 1] >> 1) & 0x03)
+    bitrate_index = data[offset + 2] >> 4
+    rate_index = (data[offset + 2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index]
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (data[offset + 2] >> 1) & 0x01
+    if layer == 1:
+        samples = 384
+    elif layer == 3 and not mpeg1:
+        samples = 576
+    else:
+        samples = 1152
+    length = samples // 8 * bitrate * 1000 // sample_rate + padding * (4 if layer == 1 else 1)
+    return Mp3Frame(
+        sample_rate=sample_rate,
+        bitrate_kbps=bitrate,
+        samples=samples,
+        length=length,
+        mono=(data[offset + 3] >> 6) == 3,
+        mpeg1=mpeg1,
+    )
+
+
+def _id3v2_size(data: bytes) -> int:
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _vbr_frame_count(data: bytes, offset: int, frame: Mp3Frame) -> int | None:
+    # Xing/Info sits right after the side information; VBRI (Fraunhofer) at a fixed 32-byte offset.
+    side_info = (17 if frame.mono else 32) if frame.mpeg1 else (9 if frame.mono else 17)
+    xing = offset + 4 + side_info
+    if data[xing : xing + 4] in (b"Xing", b"Info"):
+        flags = int.from_bytes(data[xing + 4 : xing + 8], "big")
+        if flags & 0x01:
+            return int.from_bytes(data[xing + 8 : xing + 12], "big")
+        return None
+    vbri = offset + 36
+    if data[vbri : vbri + 4] == b"VBRI":
+        return int.from_bytes(data[vbri + 14 : vbri + 18], "big")
+    return None
+
+
+def mp3_info(data: bytes) -> Mp3Info | None:
+    # Duration from the frame headers alone, without decoding any audio.
+    offset = _id3v2_size(data)
+    end = len(data) - (128 if data[-128:-125] == b"TAG" else 0)
+
+    while offset < end and _parse_frame_header(data, offset) is None:
+        offset += 1
+    first = _parse_frame_header(data, offset)
+    if first is None:
+        return None
+
+    vbr_frames = _vbr_frame_count(data, offset, first)
+    if vbr_frames:
+        total_samples = vbr_frames * first.samples
+        duration_ms = round(1000 * total_samples / first.sample_rate)
+        audio_bytes = end - offset - first.length
+        bitrate = round(audio_bytes * 8 / max(duration_ms, 1)) if duration_ms else first.bitrate_kbps
+        return Mp3Info(duration_ms, first.sample_rate, bitrate, vbr_frames)
+
+    frames = 0
+    total_samples = 0
+    bitrate_sum = 0
+    while offset < end:
+        frame = _parse_frame_header(data, offset)
+        if frame is None or frame.length <= 0:
+            # Lost sync (junk between frames): scan forward to the next plausible header.
+            offset += 1
+            continue
+        frames += 1
+        total_samples += frame.samples
+        bitrate_sum += frame.bitrate_kbps
+        offset += frame.length
+    if not frames:
+        return None
+    return Mp3Info(
+        duration_ms=round(1000 * total_samples / first.sample_rate),
+        sample_rate=first.sample_rate,
+        bitrate_kbps=round(bitrate_sum / frames),
+        frames=frames,
+    )
+
+
+def _loudness_dbfs(path: Path) -> float | None:
+    # RMS level of the whole clip; needs the optional decoder, otherwise left unknown.
+    if np is None or miniaudio is None:
+        return None
+    try:
+        decoded = miniaudio.decode_file(str(path), output_format=miniaudio.SampleFormat.FLOAT32, nchannels=1)
+    except Exception as exc:
+        LOGGER.warning("Sound loudness unavailable (%s): %s", path, exc)
+        return None
+    samples = np.frombuffer(decoded.samples, dtype=np.float32)
+    if not len(samples):
+        return None
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    return round(20.0 * math.log10(rms), 1) if rms > 0 else None
+
+
+@dataclass(frozen=True)
+class SoundEffectEntry:
+    id: str
+    tool: str
+    label: str
+    file: str
+    url: str
+    volume: float
+    duration_ms: int | None
+    sample_rate: int | None
+    bitrate_kbps: int | None
+    loudness_dbfs: float | None
+    size_bytes: int
+
+
+class SoundCatalog:
+    # Built once at startup: every effect with the metadata the browser would otherwise have to
+    # discover by loading the MP3.
+
+    def __init__(self, sounds_dir: Path = SOUNDS_DIR, url_for: Callable[[str], str] | None = None) -> None:
+        resolve_url = url_for or (lambda path: path)
+        self._entries: Dict[str, SoundEffectEntry] = {}
+        for spec in SOUND_EFFECT_SPECS:
+            path = sounds_dir / spec.file_name
+            try:
+                data = path.read_bytes()
+            except OSError as exc:
+                LOGGER.warning("Sound effect missing (%s): %s", path, exc)
+                continue
+            info = mp3_info(data) if path.suffix.lower() == ".mp3" else None
+            self._entries[spec.effect_id] = SoundEffectEntry(
+                id=spec.effect_id,
+                tool=spec.tool_name,
+                label=spec.label,
+                file=spec.file_name,
+                url=resolve_url(f"/sounds/{spec.file_name}"),
+                volume=spec.volume,
+                duration_ms=info.duration_ms if info else None,
+                sample_rate=info.sample_rate if info else None,
+                bitrate_kbps=info.bitrate_kbps if info else None,
+                loudness_dbfs=_loudness_dbfs(path),
+                size_bytes=len(data),
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, effect_id: str) -> SoundEffectEntry | None:
+        return self._entries.get(str(effect_id or "").strip().upper())
+
+    def entries(self) -> List[SoundEffectEntry]:
+        return list(self._entries.values())
+
+    def to_payload(self) -> Dict[str, object]:
+        return {"effects": [asdict(entry) for entry in self._entries.values()]}
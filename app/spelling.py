@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+from .text import bounded_edit_distance, fold_text
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_LEXICON_PATH = Path(__file__).resolve().parent / "data" / "lexique_fr.txt"
+
+
+def load_lexicon(path: str | Path = "") -> List[str]:
+    # The bundled lexicon is always loaded; a configured file adds its words to it.
+    words = _read_lexicon(DEFAULT_LEXICON_PATH)
+    if path and Path(path).resolve() != DEFAULT_LEXICON_PATH:
+        words.extend(_read_lexicon(Path(path)))
+    return words
+
+
+def _read_lexicon(target: Path) -> List[str]:
+    try:
+        lines = target.read_text(encoding="utf-8").splitlines()
+    except Exception as exc:
+        LOGGER.warning("Spelling lexicon unavailable (%s): %s", target, exc)
+        return []
+
+    words: List[str] = []
+    for line in lines:
+        word = line.strip()
+        if not word or word.startswith("#"):
+            continue
+        words.append(word.lower())
+    return words
+
+
+def _deletes(term: str, max_distance: int) -> Set[str]:
+    out: Set[str] = set()
+    frontier = {term}
+    for _ in range(max_distance):
+        next_frontier: Set[str] = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for idx in range(len(item)):
+                variant = item[:idx] + item[idx + 1 :]
+                if variant not in out:
+                    out.add(variant)
+                    next_frontier.add(variant)
+        frontier = next_frontier
+    return out
+
+
+class SymSpellIndex:
+    # Symmetric-delete index: every delete-variant of every folded term is precomputed once, so a
+    # lookup only generates the deletes of the query and verifies the few terms sharing one.
+
+    def __init__(self, words: Iterable[str], max_distance: int = 2) -> None:
+        self.max_distance = max_distance
+        self._terms: Dict[str, str] = {}
+        self._ranks: Dict[str, int] = {}
+        self._deletes: Dict[str, List[str]] = {}
+
+        for word in words:
+            token = str(word).strip().lower()
+            folded = fold_text(token)
+            if not folded or " " in folded:
+                continue
+            chosen = self._terms.get(folded)
+            if chosen is None:
+                self._ranks[folded] = len(self._ranks)
+            if chosen is None or (chosen == folded and token != folded):
+                # Prefer the accented spelling when both forms are listed.
+                self._terms[folded] = token
+
+        for folded in self._terms:
+            for variant in _deletes(folded, max_distance):
+                self._deletes.setdefault(variant, []).append(folded)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, folded: str) -> bool:
+        return folded in self._terms
+
+    def exact(self, folded: str) -> str | None:
+        return self._terms.get(folded)
+
+    def lookup(self, folded: str, max_distance: int | None = None) -> str | None:
+        budget = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if not folded:
+            return None
+        exact = self._terms.get(folded)
+        if exact is not None:
+            return exact
+        if budget <= 0:
+            return None
+
+        candidates: Set[str] = set()
+        if folded in self._deletes:
+            candidates.update(self._deletes[folded])
+        for variant in _deletes(folded, budget):
+            if variant in self._terms:
+                candidates.add(variant)
+            hits = self._deletes.get(variant)
+            if hits:
+                candidates.update(hits)
+
+        best: str | None = None
+        best_key: tuple[int, int] | None = None
+        for term in candidates:
+            distance = bounded_edit_distance(folded, term, budget)
+            if distance > budget:
+                continue
+            key = (distance, self._ranks[term])
+            if best_key is None or key < best_key:
+                best_key = key
+                best = term
+        if best is None:
+            return None
+        return self._terms[best]
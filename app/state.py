@@ -1,14 +1,22 @@
 from __future__ import annotations
 
 import random
-from dataclasses import asdict, dataclass, field
+from collections import Counter
+from dataclasses import asdict, dataclass, field, fields, replace
 from datetime import datetime, timezone
-from threading import Lock
+from threading import Event
+from uuid import uuid4
 from typing import Callable, Dict, List, Optional
 
-from .agents import AudienceModeratorAgent, DirectorAgent, VictimAgent
+from .agents import AudienceModeratorAgent, DirectorAgent, VictimAgent, raise_if_cancelled, run_until_cancelled
 from .config import Settings
-from .scenario import TECH_SUPPORT_STEPS
+from .metrics import ACTIVE_TURNS, ENGINE_LOCK_WAIT_SECONDS, TimedLock
+from .scenario import DEFAULT_SCENARIO_KEY, TECH_SUPPORT_STEPS, Scenario, load_scenarios
+from .state_store import StateConflict, StateStore
+from .tracing import span, turn_timings
+
+# Re-applications of a short operation after another worker committed first.
+STATE_CONFLICT_RETRIES = 5
 
 
 def _utc_now_iso() -> str:
@@ -21,11 +29,15 @@ class ConversationMessage:
     content: str
     timestamp: str
     sound_effects: List[str] = field(default_factory=list)
+    id: str = field(default_factory=lambda: uuid4().hex)
+    stage_key: str = ""
+    # Victim replies only: "llm" or "heuristic".
+    reply_source: str = ""
 
 
 @dataclass
 class SimulationState:
-    scenario_name: str = "tech_support_microsoft"
+    scenario_name: str = DEFAULT_SCENARIO_KEY
     stage_index: int = 0
     current_objective: str = TECH_SUPPORT_STEPS[0].objective
     director_reason: str = "Simulation initialisee."
@@ -38,22 +50,95 @@ class SimulationState:
     last_winner: str = ""
 
 
+_STATE_FIELDS = frozenset(item.name for item in fields(SimulationState))
+_MESSAGE_FIELDS = frozenset(item.name for item in fields(ConversationMessage))
+
+
+def _state_from_payload(payload: Dict[str, object]) -> SimulationState:
+    # Unknown keys are dropped so a worker can read state written by a newer (or older) release.
+    values = {key: value for key, value in payload.items() if key in _STATE_FIELDS}
+    values["messages"] = [
+        ConversationMessage(**{key: value for key, value in message.items() if key in _MESSAGE_FIELDS})
+        for message in payload.get("messages") or []
+    ]
+    return SimulationState(**values)
+
+
 class SimulationEngine:
-    def __init__(self, settings: Settings) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        director: Optional[DirectorAgent] = None,
+        moderator: Optional[AudienceModeratorAgent] = None,
+        victim: Optional[VictimAgent] = None,
+        scenarios: Optional[Dict[str, Scenario]] = None,
+        store: Optional[StateStore] = None,
+    ) -> None:
+        # Agents and scenarios hold no per-conversation state: batch runs build them once per
+        # worker and share them (and their LLM clients) across engines.
         self.settings = settings
-        self.director = DirectorAgent(settings)
-        self.moderator = AudienceModeratorAgent(settings)
-        self.victim = VictimAgent(settings)
-        self._lock = Lock()
-        self.state = SimulationState()
+        self.director = director or DirectorAgent(settings)
+        self.moderator = moderator or AudienceModeratorAgent(settings)
+        self.victim = victim or VictimAgent(settings)
+        self._lock = TimedLock(ENGINE_LOCK_WAIT_SECONDS)
+        self._victim_message_listeners: List[Callable[[ConversationMessage], None]] = []
+        self._show_end_listeners: List[Callable[[SimulationState], None]] = []
+        self.scenarios = scenarios or load_scenarios(settings.scenario_packs_dir)
+        default_key = settings.default_scenario if settings.default_scenario in self.scenarios else DEFAULT_SCENARIO_KEY
+        self.default_scenario_key = default_key
+        self.state = self._new_state(default_key)
+        # Without a store the state lives in this process only (batch runs, benchmarks).
+        self.store = store
+        self._version = 0
+        # Without a store, a failed or cancelled turn restores this copy taken when it started.
+        self._checkpoint: Optional[SimulationState] = None
+
+    def add_victim_message_listener(self, listener: Callable[[ConversationMessage], None]) -> None:
+        # Listeners run under the engine lock, right after the reply is committed: they must only
+        # hand the message off (e.g. to an executor), never do slow work inline.
+        self._victim_message_listeners.append(listener)
+
+    def add_show_end_listener(self, listener: Callable[[SimulationState], None]) -> None:
+        # Called under the engine lock on reset with the finished show, if it had any message.
+        self._show_end_listeners.append(listener)
+
+    def _new_state(self, scenario_key: str) -> SimulationState:
+        scenario = self.scenarios[scenario_key]
+        return SimulationState(scenario_name=scenario.key, current_objective=scenario.steps[0].objective)
+
+    def _scenario_unlocked(self) -> Scenario:
+        return self.scenarios.get(self.state.scenario_name) or self.scenarios[self.default_scenario_key]
+
+    def list_scenarios(self) -> List[Dict[str, object]]:
+        return [
+            {
+                "key": scenario.key,
+                "name": scenario.name,
+                "stages": [{"key": step.key, "name": step.name} for step in scenario.steps],
+            }
+            for scenario in self.scenarios.values()
+        ]
+
+    def reset(self, scenario: Optional[str] = None) -> Dict[str, object]:
+        finished: List[SimulationState] = []
+
+        def apply() -> None:
+            scenario_key = (scenario or "").strip() or self.state.scenario_name
+            if scenario_key not in self.scenarios:
+                raise ValueError(f"Scenario inconnu: {scenario_key}.")
+            finished[:] = [self.state]
+            self.state = self._new_state(scenario_key)
 
-    def reset(self) -> Dict[str, object]:
         with self._lock:
-            self.state = SimulationState()
-            return self._snapshot_unlocked()
+            snapshot = self._mutate_unlocked(apply)
+            if finished and finished[0].messages:
+                for listener in self._show_end_listeners:
+                    listener(finished[0])
+            return snapshot
 
     def snapshot(self) -> Dict[str, object]:
         with self._lock:
+            self._refresh_unlocked()
             return self._snapshot_unlocked()
 
     def submit_proposal(self, proposal: str) -> Dict[str, object]:
@@ -61,38 +146,52 @@ class SimulationEngine:
         if not clean:
             raise ValueError("La proposition audience est vide.")
 
-        with self._lock:
+        def apply() -> None:
             self.state.pending_proposals.append(clean[:180])
-            return self._snapshot_unlocked()
 
-    def select_choices(self, proposals: Optional[List[str]] = None) -> Dict[str, object]:
         with self._lock:
-            if proposals:
-                for proposal in proposals:
-                    clean = str(proposal).strip()
-                    if clean:
-                        self.state.pending_proposals.append(clean[:180])
+            return self._mutate_unlocked(apply)
 
-            if not self.state.pending_proposals:
+    def select_choices(self, proposals: Optional[List[str]] = None) -> Dict[str, object]:
+        extra = [str(proposal).strip()[:180] for proposal in proposals or [] if str(proposal).strip()]
+        with self._lock:
+            # The moderator (clustering, ranking, maybe an LLM rerank) runs once; only the write
+            # below is retried when another worker commits in between.
+            self._refresh_unlocked()
+            used = list(self.state.pending_proposals)
+            candidates = used + extra
+            if not candidates:
                 raise ValueError("Aucune proposition audience en attente. Ajoutez des propositions avant la selection.")
 
-            stage_name = TECH_SUPPORT_STEPS[self.state.stage_index].name
-            objective = self.state.current_objective
-            selected = self.moderator.select_choices(
-                proposals=self.state.pending_proposals,
-                stage_name=stage_name,
-                objective=objective,
-            )
+            step = self._scenario_unlocked().steps[self.state.stage_index]
+            with span("moderator.select_choices", proposals=len(candidates)):
+                selected = self.moderator.select_choices(
+                    proposals=candidates,
+                    stage_name=step.name,
+                    objective=self.state.current_objective,
+                    keywords=step.trigger_keywords,
+                )
             if not selected:
                 raise ValueError(
                     "Aucune proposition audience valide disponible. Verifiez les propositions puis recommencez."
                 )
-            self.state.selected_choices = selected
-            self.state.pending_proposals = []
-            return self._snapshot_unlocked()
+
+            def apply() -> None:
+                # Proposals submitted meanwhile were not seen by the moderator: they stay pending.
+                seen = Counter(used)
+                remaining = []
+                for proposal in self.state.pending_proposals:
+                    if seen[proposal]:
+                        seen[proposal] -= 1
+                    else:
+                        remaining.append(proposal)
+                self.state.selected_choices = list(selected)
+                self.state.pending_proposals = remaining
+
+            return self._mutate_unlocked(apply)
 
     def vote_choice(self, winner_index: int) -> Dict[str, object]:
-        with self._lock:
+        def apply() -> None:
             if not self.state.selected_choices:
                 raise ValueError("Aucun choix audience disponible. Lancez /api/audience/select.")
             if winner_index < 0 or winner_index >= len(self.state.selected_choices):
@@ -102,92 +201,210 @@ class SimulationEngine:
             self.state.last_winner = winner
             self.state.audience_constraint = winner
             self.state.audience_constraint_turns_left = 2
-            return self._snapshot_unlocked()
 
-    def simulate_vote(self) -> Dict[str, object]:
         with self._lock:
+            return self._mutate_unlocked(apply)
+
+    def simulate_vote(self) -> Dict[str, object]:
+        def apply() -> None:
             if not self.state.selected_choices:
                 raise ValueError("Aucun choix audience disponible pour un vote simule.")
             winner = random.choice(self.state.selected_choices)
             self.state.last_winner = winner
             self.state.audience_constraint = winner
             self.state.audience_constraint_turns_left = 2
+
+        with self._lock:
+            return self._mutate_unlocked(apply)
+
+    def _refresh_unlocked(self) -> None:
+        # Picks up commits made by other workers; a no-op read of the version when nothing changed.
+        if self.store is None:
+            return
+        version, payload = self.store.load(self._version)
+        if version == self._version:
+            return
+        self.state = _state_from_payload(payload) if payload else self._new_state(self.default_scenario_key)
+        self._version = version
+        # A show stored by an older release may name a scenario or stage that no longer exists.
+        if self.state.scenario_name not in self.scenarios:
+            self.state.scenario_name = self.default_scenario_key
+        last_stage = len(self._scenario_unlocked().steps) - 1
+        self.state.stage_index = min(max(0, int(self.state.stage_index)), last_stage)
+
+    def _commit_unlocked(self) -> None:
+        if self.store is not None:
+            self._version = self.store.commit(self._version, asdict(self.state))
+
+    def _discard_unlocked(self) -> None:
+        # Drops local changes that were not committed: the next refresh reloads the stored state.
+        if self.store is None:
+            if self._checkpoint is not None:
+                self.state = self._checkpoint
+            return
+        self._version = -1
+        self._refresh_unlocked()
+
+    def _mutate_unlocked(self, apply: Callable[[], None]) -> Dict[str, object]:
+        # Short audience and show operations: when another worker committed in between, re-read
+        # its state and apply the change again instead of failing the request.
+        for attempt in range(STATE_CONFLICT_RETRIES + 1):
+            self._refresh_unlocked()
+            try:
+                apply()
+                self._commit_unlocked()
+            except StateConflict:
+                self._discard_unlocked()
+                if attempt == STATE_CONFLICT_RETRIES:
+                    raise
+                continue
+            except BaseException:
+                self._discard_unlocked()
+                raise
             return self._snapshot_unlocked()
+        raise AssertionError("unreachable")
 
-    def step(self, scammer_input: str) -> Dict[str, object]:
+    def step(self, scammer_input: str, include_timings: bool = False) -> Dict[str, object]:
         clean_input = scammer_input.strip()
         if not clean_input:
             raise ValueError("Le message arnaqueur est vide.")
 
-        with self._lock:
-            return self._step_unlocked(clean_input)
+        return self._run_turn(clean_input, None, include_timings)
 
-    def step_stream(self, scammer_input: str, on_text_chunk: Callable[[str], None]) -> Dict[str, object]:
+    def step_stream(
+        self,
+        scammer_input: str,
+        on_text_chunk: Callable[[str], None],
+        include_timings: bool = False,
+        cancel: Event | None = None,
+    ) -> Dict[str, object]:
+        # Setting cancel (client gone) stops the turn within CANCEL_POLL_SECONDS, even while the
+        # director call or the victim's first token is still pending, and raises TurnCancelled;
+        # the turn is rolled back as if it never started.
         clean_input = scammer_input.strip()
         if not clean_input:
             raise ValueError("Le message arnaqueur est vide.")
 
-        with self._lock:
-            return self._step_unlocked(clean_input, on_text_chunk=on_text_chunk)
+        return self._run_turn(clean_input, on_text_chunk, include_timings, cancel)
+
+    def _run_turn(
+        self,
+        clean_input: str,
+        on_text_chunk: Callable[[str], None] | None,
+        include_timings: bool,
+        cancel: Event | None = None,
+    ) -> Dict[str, object]:
+        with ACTIVE_TURNS.track(), span("turn", streaming=on_text_chunk is not None) as root:
+            with span("engine.lock_wait"):
+                self._lock.acquire()
+            try:
+                raise_if_cancelled(cancel)
+                self._refresh_unlocked()
+                if self.store is None:
+                    self._checkpoint = replace(self.state, messages=list(self.state.messages))
+                snapshot = self._step_unlocked(clean_input, on_text_chunk=on_text_chunk, cancel=cancel)
+            except BaseException:
+                # Turns are not retried (the LLM work would be redone): a turn that lost the race
+                # against another worker fails with StateConflict and leaves no trace here.
+                self._discard_unlocked()
+                raise
+            finally:
+                self._checkpoint = None
+                self._lock.release()
+        if include_timings:
+            snapshot["timings"] = turn_timings(root)
+        return snapshot
 
     def _step_unlocked(
         self,
         clean_input: str,
         on_text_chunk: Callable[[str], None] | None = None,
+        cancel: Event | None = None,
     ) -> Dict[str, object]:
         emit = on_text_chunk or (lambda _chunk: None)
 
         prior_history = [asdict(msg) for msg in self.state.messages]
         history_window = prior_history[-self.settings.max_history_messages :]
 
+        scenario = self._scenario_unlocked()
         self.state.turn_count += 1
-        self._add_message_unlocked(role="scammer", content=clean_input)
-
-        decision = self.director.decide(
-            latest_scammer=clean_input,
-            history=history_window,
-            current_stage=self.state.stage_index,
+        self._add_message_unlocked(
+            role="scammer",
+            content=clean_input,
+            stage_key=scenario.steps[self.state.stage_index].key,
         )
+
+        with span("director.decide", scenario=scenario.key, stage_before=self.state.stage_index) as director_span:
+            # A client gone during the director call frees the engine without waiting for the reply.
+            decision = run_until_cancelled(
+                lambda: self.director.decide(
+                    latest_scammer=clean_input,
+                    history=history_window,
+                    current_stage=self.state.stage_index,
+                    scenario=scenario,
+                ),
+                cancel,
+            )
+            director_span.set("stage_after", decision.stage_index)
+        raise_if_cancelled(cancel)
         self.state.stage_index = decision.stage_index
         self.state.current_objective = decision.objective
         self.state.director_reason = decision.reason
 
-        stage_name = TECH_SUPPORT_STEPS[self.state.stage_index].name
+        stage_name = scenario.steps[self.state.stage_index].name
         if on_text_chunk is None:
-            victim_reply = self.victim.respond(
-                latest_scammer=clean_input,
-                history=history_window,
-                objective=self.state.current_objective,
-                audience_constraint=self.state.audience_constraint,
-                stage_name=stage_name,
-            )
+            with span("victim.respond"):
+                victim_reply = self.victim.respond(
+                    latest_scammer=clean_input,
+                    history=history_window,
+                    objective=self.state.current_objective,
+                    audience_constraint=self.state.audience_constraint,
+                    stage_name=stage_name,
+                )
         else:
-            victim_reply = self.victim.respond_stream(
-                latest_scammer=clean_input,
-                history=history_window,
-                objective=self.state.current_objective,
-                audience_constraint=self.state.audience_constraint,
-                stage_name=stage_name,
-                on_text_chunk=emit,
+            with span("victim.respond_stream"):
+                victim_reply = self.victim.respond_stream(
+                    latest_scammer=clean_input,
+                    history=history_window,
+                    objective=self.state.current_objective,
+                    audience_constraint=self.state.audience_constraint,
+                    stage_name=stage_name,
+                    on_text_chunk=emit,
+                    cancel=cancel,
+                )
+        raise_if_cancelled(cancel)
+        with span("engine.commit"):
+            victim_message = self._add_message_unlocked(
+                role="victim",
+                content=victim_reply.text,
+                sound_effects=victim_reply.sound_effects,
+                stage_key=scenario.steps[self.state.stage_index].key,
+                reply_source=victim_reply.source,
             )
-        self._add_message_unlocked(
-            role="victim",
-            content=victim_reply.text,
-            sound_effects=victim_reply.sound_effects,
-        )
-
-        self._tick_audience_constraint_unlocked()
-        return self._snapshot_unlocked()
+            self._tick_audience_constraint_unlocked()
+            self._commit_unlocked()
+            for listener in self._victim_message_listeners:
+                listener(victim_message)
+            return self._snapshot_unlocked()
 
-    def _add_message_unlocked(self, role: str, content: str, sound_effects: Optional[List[str]] = None) -> None:
-        self.state.messages.append(
-            ConversationMessage(
-                role=role,
-                content=content,
-                timestamp=_utc_now_iso(),
-                sound_effects=sound_effects or [],
-            )
+    def _add_message_unlocked(
+        self,
+        role: str,
+        content: str,
+        sound_effects: Optional[List[str]] = None,
+        stage_key: str = "",
+        reply_source: str = "",
+    ) -> ConversationMessage:
+        message = ConversationMessage(
+            role=role,
+            content=content,
+            timestamp=_utc_now_iso(),
+            sound_effects=sound_effects or [],
+            stage_key=stage_key,
+            reply_source=reply_source,
         )
+        self.state.messages.append(message)
+        return message
 
     def _tick_audience_constraint_unlocked(self) -> None:
         if self.state.audience_constraint_turns_left <= 0:
@@ -198,10 +415,12 @@ class SimulationEngine:
 
     def _snapshot_unlocked(self) -> Dict[str, object]:
         llm_runtime_enabled = bool(self.director.chat and self.moderator.chat and self.victim.chat)
+        scenario = self._scenario_unlocked()
         return {
             "scenario_name": self.state.scenario_name,
+            "scenario_label": scenario.name,
             "stage_index": self.state.stage_index,
-            "stage_name": TECH_SUPPORT_STEPS[self.state.stage_index].name,
+            "stage_name": scenario.steps[self.state.stage_index].name,
             "current_objective": self.state.current_objective,
             "director_reason": self.state.director_reason,
             "audience_constraint": self.state.audience_constraint,
@@ -211,7 +430,9 @@ class SimulationEngine:
             "pending_proposals": list(self.state.pending_proposals),
             "selected_choices": list(self.state.selected_choices),
             "last_winner": self.state.last_winner,
-            "available_stages": [step.name for step in TECH_SUPPORT_STEPS],
+            "available_stages": [step.name for step in scenario.steps],
+            "next_stages": scenario.next_stage_keys(self.state.stage_index),
+            "available_scenarios": [{"key": item.key, "name": item.name} for item in self.scenarios.values()],
             "llm_enabled": llm_runtime_enabled,
             "llm_configured": self.settings.llm_enabled,
             "llm_provider": self.settings.llm_provider,
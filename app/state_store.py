@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+try:
+    import redis
+except Exception:
+    redis = None
+
+from .config import Settings
+
+LOGGER = logging.getLogger(__name__)
+STATE_BACKENDS = frozenset({"sqlite", "redis", "memory", "none"})
+# Atomic compare-and-set on a {version, value} hash.
+_REDIS_CAS_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'version') or '0')
+if current ~= tonumber(ARGV[1]) then
+    return -1
+end
+redis.call('HSET', KEYS[1], 'version', current + 1, 'value', ARGV[2])
+return current + 1
+"""
+
+
+class StateConflict(RuntimeError):
+    def __init__(self, expected: int, found: int) -> None:
+        super().__init__(
+            f"L'etat du spectacle a change pendant l'operation (version {expected} attendue, {found} trouvee). "
+            "Rechargez l'etat puis recommencez."
+        )
+        self.expected = expected
+        self.found = found
+
+
+class MemoryKV:
+    # In-process stand-in for a network key-value server: same contract as RedisKV, for tests
+    # and single-process runs.
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._items: Dict[str, Tuple[int, str]] = {}
+
+    def version(self, key: str) -> int:
+        with self._lock:
+            return self._items.get(key, (0, ""))[0]
+
+    def read(self, key: str) -> Tuple[int, Optional[str]]:
+        with self._lock:
+            version, value = self._items.get(key, (0, None))
+            return version, value
+
+    def compare_and_set(self, key: str, expected: int, value: str) -> int:
+        with self._lock:
+            current = self._items.get(key, (0, ""))[0]
+            if current != expected:
+                return -1
+            self._items[key] = (current + 1, value)
+            return current + 1
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteKV:
+    # Embedded default: every worker on the host opens the same file. WAL lets readers proceed
+    # while one writer commits; a compare-and-set is a single conditional statement.
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, version INTEGER NOT NULL, value TEXT NOT NULL)"
+        )
+
+    def version(self, key: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM kv WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def read(self, key: str) -> Tuple[int, Optional[str]]:
+        with self._lock:
+            row = self._conn.execute("SELECT version, value FROM kv WHERE key = ?", (key,)).fetchone()
+        return (int(row[0]), str(row[1])) if row else (0, None)
+
+    def compare_and_set(self, key: str, expected: int, value: str) -> int:
+        with self._lock:
+            if expected == 0:
+                cursor = self._conn.execute(
+                    "INSERT INTO kv (key, version, value) VALUES (?, 1, ?) ON CONFLICT(key) DO NOTHING", (key, value)
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE kv SET version = version + 1, value = ? WHERE key = ? AND version = ?",
+                    (value, key, expected),
+                )
+        return expected + 1 if cursor.rowcount == 1 else -1
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisKV:
+    # Network backend for several hosts. Requires the optional redis package.
+
+    def __init__(self, url: str) -> None:
+        if redis is None:
+            raise RuntimeError("Le paquet redis est requis pour STATE_BACKEND=redis.")
+        self._client = redis.Redis.from_url(url)
+        self._cas = self._client.register_script(_REDIS_CAS_SCRIPT)
+
+    def version(self, key: str) -> int:
+        return int(self._client.hget(key, "version") or 0)
+
+    def read(self, key: str) -> Tuple[int, Optional[str]]:
+        version, value = self._client.hmget(key, "version", "value")
+        return int(version or 0), value.decode("utf-8") if value is not None else None
+
+    def compare_and_set(self, key: str, expected: int, value: str) -> int:
+        return int(self._cas(keys=[key], args=[expected, value]))
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class StateStore:
+    # One JSON document per show, versioned. Readers skip the document when their version is
+    # current; writers must name the version they read, so a stale worker cannot overwrite.
+
+    def __init__(self, kv: object, key: str) -> None:
+        self.kv = kv
+        self.key = key
+
+    def load(self, known_version: int) -> Tuple[int, Optional[Dict[str, object]]]:
+        if self.kv.version(self.key) == known_version:
+            return known_version, None
+        version, value = self.kv.read(self.key)
+        return version, json.loads(value) if value is not None else None
+
+    def commit(self, expected_version: int, payload: Dict[str, object]) -> int:
+        value = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        version = self.kv.compare_and_set(self.key, expected_version, value)
+        if version < 0:
+            raise StateConflict(expected_version, self.kv.version(self.key))
+        return version
+
+    def close(self) -> None:
+        self.kv.close()
+
+
+def build_state_store(settings: Settings) -> StateStore | None:
+    backend = settings.state_backend
+    if backend == "none":
+        return None
+    if backend == "memory":
+        kv: object = MemoryKV()
+    elif backend == "redis":
+        kv = RedisKV(settings.state_redis_url)
+    else:
+        kv = SQLiteKV(settings.state_db_file)
+    LOGGER.info("Etat partage: %s (cle %s)", backend, settings.state_key)
+    return StateStore(kv, settings.state_key)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Hashable, Iterable, Iterator, List, Tuple
+
+NON_WORD_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+@lru_cache(maxsize=65536)
+def fold_text(text: str) -> str:
+    # Accent-free, punctuation-free, lowercase form shared by every matcher.
+    decomposed = unicodedata.normalize("NFKD", text)
+    without_marks = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    without_punct = NON_WORD_RE.sub(" ", without_marks)
+    return " ".join(without_punct.lower().split())
+
+
+@lru_cache(maxsize=65536)
+def bounded_edit_distance(source: str, target: str, max_distance: int) -> int:
+    # Optimal string alignment distance; returns max_distance + 1 as soon as the budget is exceeded.
+    if source == target:
+        return 0
+
+    len_source = len(source)
+    len_target = len(target)
+    overflow = max_distance + 1
+    if abs(len_source - len_target) > max_distance:
+        return overflow
+    if not len_source:
+        return len_target
+    if not len_target:
+        return len_source
+
+    previous_previous: list[int] | None = None
+    previous = list(range(len_target + 1))
+    for i in range(1, len_source + 1):
+        current = [i] + [overflow] * len_target
+        # Only cells within the diagonal band can stay under the budget.
+        low = max(1, i - max_distance)
+        high = min(len_target, i + max_distance)
+        row_min = current[0] if low == 1 else overflow
+        source_char = source[i - 1]
+        for j in range(low, high + 1):
+            cost = 0 if source_char == target[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (
+                previous_previous is not None
+                and j > 1
+                and source_char == target[j - 2]
+                and source[i - 2] == target[j - 1]
+            ):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return overflow
+        previous_previous, previous = previous, current
+
+    distance = previous[len_target]
+    return distance if distance <= max_distance else overflow
+
+
+class KeywordAutomaton:
+    # Aho-Corasick automaton over folded text. A trailing "*" on a pattern turns it into a prefix
+    # match (racis* -> raciste, racisme); other patterns must match whole words.
+
+    def __init__(self, patterns: Iterable[Tuple[str, Hashable]]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[int]] = [[]]
+        self._lengths: List[int] = []
+        self._prefix: List[bool] = []
+        self._labels: List[Hashable] = []
+
+        for raw, label in patterns:
+            pattern = str(raw).strip()
+            is_prefix = pattern.endswith("*")
+            folded = fold_text(pattern.rstrip("*"))
+            if not folded:
+                continue
+            state = 0
+            for char in folded:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append(len(self._labels))
+            self._lengths.append(len(folded))
+            self._prefix.append(is_prefix)
+            self._labels.append(label)
+
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._outputs[next_state].extend(self._outputs[self._fail[next_state]])
+
+    def iter_matches(self, text: str, folded: bool = False) -> Iterator[Tuple[Hashable, int, int]]:
+        haystack = text if folded else fold_text(text)
+        size = len(haystack)
+        state = 0
+        for end, char in enumerate(haystack, start=1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern_id in self._outputs[state]:
+                start = end - self._lengths[pattern_id]
+                if start > 0 and haystack[start - 1] != " ":
+                    continue
+                if not self._prefix[pattern_id] and end < size and haystack[end] != " ":
+                    continue
+                yield self._labels[pattern_id], start, end
+
+    def counts(self, text: str, folded: bool = False) -> Dict[Hashable, int]:
+        out: Dict[Hashable, int] = {}
+        for label, _start, _end in self.iter_matches(text, folded=folded):
+            out[label] = out.get(label, 0) + 1
+        return out
+
+    def first_match(self, text: str, folded: bool = False) -> Hashable | None:
+        for label, _start, _end in self.iter_matches(text, folded=folded):
+            return label
+        return None
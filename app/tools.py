@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, List
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
 
 from langchain_core.tools import tool
 
 SOUND_TAG_PATTERN = re.compile(r"\[SOUND_EFFECT:\s*([A-Z_]+)\s*\]")
+SOUND_EFFECT_TAG = "[SOUND_EFFECT: {effect}]"
 
 
 @tool
@@ -32,6 +34,29 @@ def tv_background() -> str:
     return "[SOUND_EFFECT: TV_BACKGROUND_BFMTV]"
 
 
+@dataclass(frozen=True)
+class SoundEffectSpec:
+    effect_id: str
+    tool_name: str
+    file_name: str
+    label: str
+    # Playback gain; the TV stays under the voice.
+    volume: float
+
+
+SOUND_EFFECT_SPECS: Tuple[SoundEffectSpec, ...] = (
+    SoundEffectSpec("DOG_BARKING", "dog_bark", "dog-barking.mp3", "Chien aboie", 0.85),
+    SoundEffectSpec("DOORBELL", "doorbell", "doorbell.mp3", "Sonnette", 0.85),
+    SoundEffectSpec("COUGHING_FIT", "coughing_fit", "coughing.mp3", "Quinte de toux", 0.85),
+    SoundEffectSpec("TV_BACKGROUND_BFMTV", "tv_background", "tvbackground.mp3", "TV en fond (BFMTV)", 0.45),
+)
+# Effect tag -> (file in app/sounds, playback gain).
+SOUND_EFFECT_ASSETS: Dict[str, Tuple[str, float]] = {
+    spec.effect_id: (spec.file_name, spec.volume) for spec in SOUND_EFFECT_SPECS
+}
+SOUND_TOOL_EFFECTS: Dict[str, str] = {spec.tool_name: spec.effect_id for spec in SOUND_EFFECT_SPECS}
+
+# LangChain tools are only needed to describe the effects to the LLM (bind_tools).
 SOUND_TOOL_REGISTRY: Dict[str, object] = {
     "dog_bark": dog_bark,
     "doorbell": doorbell,
@@ -41,16 +66,8 @@ SOUND_TOOL_REGISTRY: Dict[str, object] = {
 
 
 def run_tool_by_name(tool_name: str, args: dict | None = None) -> str:
-    tool_obj = SOUND_TOOL_REGISTRY.get(tool_name)
-    if tool_obj is None:
-        return "[SOUND_EFFECT: UNKNOWN]"
-
-    payload = args or {}
-    try:
-        result = tool_obj.invoke(payload)
-    except Exception:
-        result = tool_obj.invoke({})
-    return str(result)
+    # Every effect tool returns a fixed tag, so executing one is a table lookup.
+    return SOUND_EFFECT_TAG.format(effect=SOUND_TOOL_EFFECTS.get(tool_name, "UNKNOWN"))
 
 
 def extract_sound_effects(text: str) -> List[str]:
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Deque, Dict, Iterator, List
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_MAX_TRACES = 50
+SERVICE_NAME = "simulateur-arnaque"
+# OTLP status codes.
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, object] = field(default_factory=dict)
+    error: str = ""
+    # Every span of the trace, shared by reference from the root down.
+    spans: List["Span"] = field(default_factory=list, repr=False)
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns or time.time_ns()
+        return round((end_ns - self.start_ns) / 1e6, 3)
+
+    def set(self, key: str, value: object) -> None:
+        self.attributes[key] = value
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: object) -> Iterator[Span]:
+    # Nested calls become children of the innermost open span; a span opened with no parent
+    # starts a new trace, which is recorded once that root span ends.
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+        span_id=os.urandom(8).hex(),
+        parent_id=parent.span_id if parent else "",
+        start_ns=time.time_ns(),
+        attributes=dict(attributes),
+    )
+    current.spans = parent.spans if parent else []
+    current.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = type(exc).__name__
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        if parent is None:
+            TRACES.record(current)
+
+
+def span_tree(root: Span) -> List[Dict[str, object]]:
+    # Spans in start order, with their depth and offset from the start of the trace.
+    depths = {root.span_id: 0}
+    rows: List[Dict[str, object]] = []
+    for item in sorted(root.spans, key=lambda s: s.start_ns):
+        depth = depths.get(item.parent_id, -1) + 1 if item.parent_id else 0
+        depths[item.span_id] = depth
+        row: Dict[str, object] = {
+            "name": item.name,
+            "depth": depth,
+            "offset_ms": round((item.start_ns - root.start_ns) / 1e6, 3),
+            "duration_ms": item.duration_ms,
+        }
+        if item.attributes:
+            row["attributes"] = dict(item.attributes)
+        if item.error:
+            row["error"] = item.error
+        rows.append(row)
+    return rows
+
+
+def turn_timings(root: Span) -> Dict[str, object]:
+    return {"trace_id": root.trace_id, "total_ms": root.duration_ms, "spans": span_tree(root)}
+
+
+def _otlp_value(value: object) -> Dict[str, object]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(root: Span) -> Dict[str, object]:
+    # One ExportTraceServiceRequest in OTLP/JSON, as written by the collector's file exporter.
+    spans = []
+    for item in root.spans:
+        otlp_span: Dict[str, object] = {
+            "traceId": item.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": 1,
+            "startTimeUnixNano": str(item.start_ns),
+            "endTimeUnixNano": str(item.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in item.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": item.error} if item.error else {"code": STATUS_OK},
+        }
+        if item.parent_id:
+            otlp_span["parentSpanId"] = item.parent_id
+        spans.append(otlp_span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+            }
+        ]
+    }
+
+
+class TraceBuffer:
+    # The last max_traces finished traces, plus an optional append-only OTLP/JSON lines file.
+
+    def __init__(self, max_traces: int = DEFAULT_MAX_TRACES, export_file: str = "") -> None:
+        self._lock = Lock()
+        self._traces: Deque[Span] = deque(maxlen=max(1, max_traces))
+        self.export_file = export_file
+
+    def configure(self, max_traces: int, export_file: str = "") -> None:
+        with self._lock:
+            self._traces = deque(self._traces, maxlen=max(1, max_traces))
+            self.export_file = export_file
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+    def record(self, root: Span) -> None:
+        with self._lock:
+            self._traces.append(root)
+            export_file = self.export_file
+            if export_file:
+                self._export_unlocked(root, Path(export_file))
+
+    def _export_unlocked(self, root: Span, path: Path) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(to_otlp(root), ensure_ascii=False, separators=(",", ":")) + "\n")
+        except OSError as exc:
+            LOGGER.warning("Trace export failed (%s): %s", path, exc)
+
+    def recent(self, limit: int = DEFAULT_MAX_TRACES) -> List[Dict[str, object]]:
+        with self._lock:
+            roots = list(self._traces)[-max(0, limit) :] if limit > 0 else []
+        return [
+            {
+                "trace_id": root.trace_id,
+                "name": root.name,
+                "started_at_ns": root.start_ns,
+                "duration_ms": root.duration_ms,
+                "error": root.error,
+                "spans": span_tree(root),
+            }
+            for root in reversed(roots)
+        ]
+
+
+TRACES = TraceBuffer()
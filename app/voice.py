@@ -3,9 +3,11 @@ from __future__ import annotations
 import base64
 import logging
 import re
+import struct
+import time
 import wave
 from io import BytesIO
-from typing import Tuple
+from typing import Iterator, Tuple
 
 try:
     from google import genai
@@ -19,18 +21,26 @@ try:
 except Exception:
     service_account = None
 
+from .cassette import open_cassette, record_tts, replay_tts
 from .config import Settings
+from .metrics import TTS_CALL_SECONDS, timed_call
+from .voice_cache import VoiceCache, voice_cache_key
 
 LOGGER = logging.getLogger(__name__)
 GOOGLE_CLOUD_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
 L16_RATE_RE = re.compile(r"rate\s*=\s*(\d+)", re.IGNORECASE)
 SOUND_TAG_RE = re.compile(r"\[SOUND_EFFECT:\s*[A-Z_]+\s*\]", re.IGNORECASE)
+STREAMING_WAV_SIZE = 0xFFFFFFFF
 
 
 class VoiceSynthesisError(RuntimeError):
     pass
 
 
+def spoken_text(text: str) -> str:
+    return re.sub(r"\s+", " ", SOUND_TAG_RE.sub(" ", str(text or ""))).strip()
+
+
 def _decode_maybe_base64(raw: str) -> bytes:
     try:
         return base64.b64decode(raw, validate=True)
@@ -58,13 +68,10 @@ def _extract_audio_bytes(response: object) -> Tuple[bytes, str]:
     return b"", ""
 
 
-def _pcm_l16_to_wav(audio_bytes: bytes, mime_type: str) -> Tuple[bytes, str]:
-    if not audio_bytes:
-        return audio_bytes, mime_type
-
+def _l16_rate(mime_type: str) -> int | None:
     normalized = str(mime_type or "").lower()
     if "audio/l16" not in normalized:
-        return audio_bytes, mime_type
+        return None
 
     rate = 24000
     match = L16_RATE_RE.search(normalized)
@@ -75,6 +82,16 @@ def _pcm_l16_to_wav(audio_bytes: bytes, mime_type: str) -> Tuple[bytes, str]:
                 rate = parsed
         except Exception:
             rate = 24000
+    return rate
+
+
+def _pcm_l16_to_wav(audio_bytes: bytes, mime_type: str) -> Tuple[bytes, str]:
+    if not audio_bytes:
+        return audio_bytes, mime_type
+
+    rate = _l16_rate(mime_type)
+    if rate is None:
+        return audio_bytes, mime_type
 
     out = BytesIO()
     with wave.open(out, "wb") as wav_file:
@@ -86,16 +103,60 @@ def _pcm_l16_to_wav(audio_bytes: bytes, mime_type: str) -> Tuple[bytes, str]:
     return out.getvalue(), "audio/wav"
 
 
+def audio_duration_ms(audio_bytes: bytes, mime_type: str) -> int | None:
+    # Only WAV carries its length in the header; other formats are left to the player.
+    if "wav" not in str(mime_type or "").lower():
+        return None
+    try:
+        with wave.open(BytesIO(audio_bytes), "rb") as wav_file:
+            rate = wav_file.getframerate()
+            return round(1000 * wav_file.getnframes() / rate) if rate else None
+    except (wave.Error, EOFError):
+        return None
+
+
+def _wav_header(rate: int, data_size: int = STREAMING_WAV_SIZE) -> bytes:
+    # Mono 16-bit PCM. While streaming the length is unknown, so both size fields use the
+    # maximum value, which players treat as "read until the connection closes".
+    riff_size = STREAMING_WAV_SIZE if data_size == STREAMING_WAV_SIZE else data_size + 36
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        riff_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,
+        1,
+        rate,
+        rate * 2,
+        2,
+        16,
+        b"data",
+        data_size,
+    )
+
+
 class VictimVoiceSynthesizer:
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
         self._client = None
         self._unavailable_reason = ""
+        self.cache = VoiceCache(settings.voice_cache_dir, settings.voice_cache_max_bytes)
+        self._cassette = open_cassette(settings.llm_cassette_file, settings.llm_cassette_mode, settings.llm_cassette_speed)
         self._init_client()
 
+    @property
+    def replaying(self) -> bool:
+        return self._cassette is not None and self._cassette.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self._cassette is not None and self._cassette.mode == "record"
+
     @property
     def enabled(self) -> bool:
-        return self._client is not None
+        return self._client is not None or self.replaying
 
     @property
     def unavailable_reason(self) -> str:
@@ -117,6 +178,10 @@ class VictimVoiceSynthesizer:
             self._unavailable_reason = "Synthese vocale desactivee (VICTIM_VOICE_ENABLED=false)."
             return
 
+        if self.replaying:
+            # Audio comes from the cassette; no provider client is needed.
+            return
+
         if genai is None or genai_types is None:
             self._unavailable_reason = "SDK google-genai indisponible."
             return
@@ -149,34 +214,165 @@ class VictimVoiceSynthesizer:
             self._unavailable_reason = f"Initialisation voix impossible: {exc}"
             LOGGER.warning("Victim voice init failed: %s", exc)
 
-    def synthesize(self, text: str) -> Tuple[bytes, str]:
+    def _prepare_text(self, text: str) -> str:
         clean_text = str(text or "").strip()
         if not clean_text:
             raise ValueError("Le texte a lire est vide.")
-        tts_text = SOUND_TAG_RE.sub(" ", clean_text)
-        tts_text = re.sub(r"\s+", " ", tts_text).strip() or clean_text
+        tts_text = spoken_text(clean_text) or clean_text
         if len(tts_text) > 4000:
             raise ValueError("Le texte a lire est trop long (max 4000 caracteres).")
+        return tts_text
+
+    def _cache_key(self, tts_text: str, style_prompt: str) -> str:
+        return voice_cache_key(
+            tts_text,
+            self.settings.vertex_tts_model,
+            self.settings.vertex_tts_voice,
+            self.settings.vertex_tts_language,
+            style_prompt,
+        )
+
+    def cache_key(self, text: str) -> str:
+        style_prompt = str(self.settings.vertex_tts_style_prompt or "").strip()
+        return self._cache_key(self._prepare_text(text), style_prompt)
+
+    def synthesize(self, text: str) -> Tuple[bytes, str]:
+        tts_text = self._prepare_text(text)
 
         if not self.enabled:
             raise VoiceSynthesisError(self._unavailable_reason or "Synthese vocale indisponible.")
 
         style_prompt = str(self.settings.vertex_tts_style_prompt or "").strip()
+        cached = self.cache.get(self._cache_key(tts_text, style_prompt))
+        if cached is not None:
+            return cached
 
         try:
-            return self._synthesize_once(tts_text, style_prompt=style_prompt)
+            return self._synthesize_cached(tts_text, style_prompt=style_prompt)
         except Exception as exc:
             if style_prompt:
                 LOGGER.warning("Victim voice styled synthesis failed, retrying without style: %s", exc)
                 try:
-                    return self._synthesize_once(tts_text, style_prompt="")
+                    return self._synthesize_cached(tts_text, style_prompt="")
                 except Exception as fallback_exc:
                     LOGGER.warning("Victim voice fallback synthesis failed: %s", fallback_exc)
                     raise VoiceSynthesisError(f"Echec de generation vocale: {fallback_exc}") from fallback_exc
             LOGGER.warning("Victim voice synthesis failed: %s", exc)
             raise VoiceSynthesisError(f"Echec de generation vocale: {exc}") from exc
 
-    def _synthesize_once(self, text: str, style_prompt: str) -> Tuple[bytes, str]:
+    def _synthesize_cached(self, text: str, style_prompt: str) -> Tuple[bytes, str]:
+        # The unstyled fallback is stored under its own key, so the styled voice is retried next time.
+        with timed_call(TTS_CALL_SECONDS, "full"):
+            audio_bytes, mime_type = self._synthesize_once(text, style_prompt=style_prompt)
+        self.cache.put(self._cache_key(text, style_prompt), audio_bytes, mime_type)
+        return audio_bytes, mime_type
+
+    def synthesize_stream(self, text: str) -> Tuple[Iterator[bytes], str]:
+        # The provider call and its first audio chunk happen here, so failures surface before
+        # any HTTP header is sent; the returned iterator only relays the remaining chunks.
+        tts_text = self._prepare_text(text)
+
+        if not self.enabled:
+            raise VoiceSynthesisError(self._unavailable_reason or "Synthese vocale indisponible.")
+
+        style_prompt = str(self.settings.vertex_tts_style_prompt or "").strip()
+        cached = self.cache.get(self._cache_key(tts_text, style_prompt))
+        if cached is not None:
+            return iter([cached[0]]), cached[1]
+        if self.replaying:
+            audio_bytes, mime_type = self.synthesize(text)
+            return iter([audio_bytes]), mime_type
+
+        try:
+            parts, first = self._open_stream(tts_text, style_prompt=style_prompt)
+        except Exception as exc:
+            if not style_prompt:
+                LOGGER.warning("Victim voice streaming failed: %s", exc)
+                raise VoiceSynthesisError(f"Echec de generation vocale: {exc}") from exc
+            LOGGER.warning("Victim voice styled streaming failed, retrying without style: %s", exc)
+            style_prompt = ""
+            try:
+                parts, first = self._open_stream(tts_text, style_prompt="")
+            except Exception as fallback_exc:
+                LOGGER.warning("Victim voice fallback streaming failed: %s", fallback_exc)
+                raise VoiceSynthesisError(f"Echec de generation vocale: {fallback_exc}") from fallback_exc
+
+        rate = _l16_rate(first[1])
+        mime_type = "audio/wav" if rate is not None else first[1]
+        key = self._cache_key(tts_text, style_prompt)
+        return self._relay_stream(parts, first[0], rate, key, mime_type), mime_type
+
+    def _open_stream(self, text: str, style_prompt: str) -> Tuple[Iterator[Tuple[bytes, str]], Tuple[bytes, str]]:
+        # Measured up to the first audio chunk: that is the latency the listener waits for.
+        with timed_call(TTS_CALL_SECONDS, "stream_first_chunk"):
+            stream = self._client.models.generate_content_stream(
+                model=self.settings.vertex_tts_model,
+                contents=text,
+                config=self._tts_config(style_prompt),
+            )
+            parts = (
+                (audio_bytes, mime_type or "audio/wav")
+                for audio_bytes, mime_type in map(_extract_audio_bytes, stream)
+                if audio_bytes
+            )
+            first = next(parts, None)
+            if first is None:
+                raise VoiceSynthesisError("Le modele TTS n'a retourne aucun audio exploitable.")
+        return parts, first
+
+    def _relay_stream(
+        self,
+        parts: Iterator[Tuple[bytes, str]],
+        first_chunk: bytes,
+        rate: int | None,
+        key: str,
+        mime_type: str,
+    ) -> Iterator[bytes]:
+        # Chunks are forwarded as they arrive and teed into the disk cache; nothing is buffered
+        # beyond the current chunk.
+        writer = self.cache.open_writer(key, mime_type)
+        # Only kept when recording a cassette, which stores whole clips.
+        recorded: list[bytes] | None = [] if self.recording else None
+        started = time.perf_counter()
+        completed = False
+        try:
+            if rate is not None:
+                header = _wav_header(rate)
+                if writer is not None:
+                    writer.write(header)
+                yield header
+            data_size = len(first_chunk)
+            if writer is not None:
+                writer.write(first_chunk)
+            if recorded is not None:
+                recorded.append(first_chunk)
+            yield first_chunk
+            for chunk, _mime in parts:
+                data_size += len(chunk)
+                if writer is not None:
+                    writer.write(chunk)
+                if recorded is not None:
+                    recorded.append(chunk)
+                yield chunk
+            completed = True
+            if writer is not None and rate is not None:
+                writer.patch(0, _wav_header(rate, data_size))
+            if recorded is not None:
+                header = _wav_header(rate, data_size) if rate is not None else b""
+                record_tts(self._cassette, key, started, header + b"".join(recorded), mime_type)
+        except Exception as exc:
+            # The response has already started: aborting it is the only way to tell the client.
+            LOGGER.warning("Victim voice stream interrupted: %s", exc)
+            raise
+        finally:
+            # A clip cut short (provider error or client gone) must not be cached.
+            if writer is not None:
+                if completed:
+                    writer.commit()
+                else:
+                    writer.abort()
+
+    def _tts_config(self, style_prompt: str):
         config_kwargs = {
             "response_modalities": ["AUDIO"],
             "speech_config": genai_types.SpeechConfig(
@@ -190,12 +386,18 @@ class VictimVoiceSynthesizer:
         }
         if style_prompt:
             config_kwargs["system_instruction"] = style_prompt
+        return genai_types.GenerateContentConfig(**config_kwargs)
+
+    def _synthesize_once(self, text: str, style_prompt: str) -> Tuple[bytes, str]:
+        key = self._cache_key(text, style_prompt)
+        if self.replaying:
+            return replay_tts(self._cassette, key)
 
-        config = genai_types.GenerateContentConfig(**config_kwargs)
+        started = time.perf_counter()
         response = self._client.models.generate_content(
             model=self.settings.vertex_tts_model,
             contents=text,
-            config=config,
+            config=self._tts_config(style_prompt),
         )
 
         audio_bytes, mime_type = _extract_audio_bytes(response)
@@ -203,4 +405,6 @@ class VictimVoiceSynthesizer:
             raise VoiceSynthesisError("Le modele TTS n'a retourne aucun audio exploitable.")
 
         converted_bytes, converted_mime = _pcm_l16_to_wav(audio_bytes, mime_type or "audio/wav")
+        if self.recording:
+            record_tts(self._cassette, key, started, converted_bytes, converted_mime)
         return converted_bytes, converted_mime
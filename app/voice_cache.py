@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Tuple
+
+LOGGER = logging.getLogger(__name__)
+TMP_PREFIX = ".tmp-"
+KEY_CHARS = frozenset("0123456789abcdef")
+MIME_EXTENSIONS = {
+    "audio/wav": ".wav",
+    "audio/mpeg": ".mp3",
+    "audio/ogg": ".ogg",
+}
+EXTENSION_MIMES = {extension: mime for mime, extension in MIME_EXTENSIONS.items()}
+
+
+def voice_cache_key(text: str, model: str, voice: str, language: str, style_prompt: str) -> str:
+    # Every input that changes the rendered audio is part of the key; NUL cannot appear in any of them.
+    payload = "\0".join([text, model, voice, language, style_prompt])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_voice_cache_key(value: str) -> bool:
+    return len(value) == 64 and set(value) <= KEY_CHARS
+
+
+class VoiceCache:
+    # Content-addressed files on disk, with an in-memory LRU index (key -> size, mime) so that
+    # lookups and evictions never list the directory after startup.
+
+    def __init__(self, directory: str | Path, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max(0, int(max_bytes))
+        self._index: OrderedDict[str, Tuple[int, str]] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = Lock()
+        if self.enabled:
+            self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def _path(self, key: str, mime_type: str) -> Path:
+        return self.directory / f"{key}{MIME_EXTENSIONS[mime_type]}"
+
+    def _load_index(self) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            entries = []
+            for path in self.directory.iterdir():
+                if path.name.startswith(TMP_PREFIX):
+                    # Left behind by a write interrupted before its rename.
+                    path.unlink()
+                    continue
+                if not path.is_file() or path.suffix not in EXTENSION_MIMES or not is_voice_cache_key(path.stem):
+                    continue
+                stat = path.stat()
+                entries.append((stat.st_mtime_ns, path.stem, stat.st_size, EXTENSION_MIMES[path.suffix]))
+        except OSError as exc:
+            LOGGER.warning("Voice cache disabled (%s): %s", self.directory, exc)
+            self.max_bytes = 0
+            return
+
+        # Modification times are refreshed on every hit, so they restore the LRU order.
+        for _mtime, key, size, mime_type in sorted(entries):
+            self._index[key] = (size, mime_type)
+            self._total_bytes += size
+        with self._lock:
+            self._evict_unlocked()
+
+    def get(self, key: str) -> Tuple[bytes, str] | None:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            self._index.move_to_end(key)
+        path = self._path(key, entry[1])
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                dropped = self._index.pop(key, None)
+                if dropped is not None:
+                    self._total_bytes -= dropped[0]
+            return None
+        return data, entry[1]
+
+    def open_writer(self, key: str, mime_type: str) -> "VoiceCacheWriter | None":
+        mime_type = str(mime_type or "").split(";", 1)[0].strip().lower()
+        # Unknown formats are not cached: their type could not be restored from the file name.
+        if not self.enabled or mime_type not in MIME_EXTENSIONS:
+            return None
+        try:
+            # Written next to the target then renamed, so readers never see a partial file.
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=TMP_PREFIX, suffix=MIME_EXTENSIONS[mime_type])
+        except OSError as exc:
+            LOGGER.warning("Voice cache write failed (%s): %s", self.directory, exc)
+            return None
+        return VoiceCacheWriter(self, key, mime_type, os.fdopen(fd, "w+b"), tmp_name)
+
+    def put(self, key: str, data: bytes, mime_type: str) -> None:
+        if not data:
+            return
+        writer = self.open_writer(key, mime_type)
+        if writer is None:
+            return
+        writer.write(data)
+        writer.commit()
+
+    def _commit(self, writer: "VoiceCacheWriter") -> None:
+        path = self._path(writer.key, writer.mime_type)
+        if writer.size > self.max_bytes:
+            writer.abort()
+            return
+        try:
+            os.replace(writer.tmp_name, path)
+        except OSError as exc:
+            LOGGER.warning("Voice cache write failed (%s): %s", path, exc)
+            writer.abort()
+            return
+
+        with self._lock:
+            previous = self._index.pop(writer.key, None)
+            if previous is not None:
+                self._total_bytes -= previous[0]
+            self._index[writer.key] = (writer.size, writer.mime_type)
+            self._total_bytes += writer.size
+            self._evict_unlocked()
+
+    def _evict_unlocked(self) -> None:
+        while self._total_bytes > self.max_bytes and self._index:
+            key, (size, mime_type) = self._index.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                self._path(key, mime_type).unlink()
+            except OSError:
+                pass
+
+
+class VoiceCacheWriter:
+    # Incremental cache entry, used to tee a streamed clip to disk without buffering it in memory.
+
+    def __init__(self, cache: VoiceCache, key: str, mime_type: str, handle, tmp_name: str) -> None:
+        self.key = key
+        self.mime_type = mime_type
+        self.tmp_name = tmp_name
+        self.size = 0
+        self._cache = cache
+        self._handle = handle
+        self._failed = False
+
+    def write(self, data: bytes) -> None:
+        if self._failed or self._handle is None:
+            return
+        try:
+            self._handle.write(data)
+            self.size += len(data)
+        except OSError as exc:
+            LOGGER.warning("Voice cache write failed (%s): %s", self.tmp_name, exc)
+            self._failed = True
+
+    def patch(self, offset: int, data: bytes) -> None:
+        # Rewrites bytes already written, e.g. the size fields of a WAV header once the length is known.
+        if self._failed or self._handle is None:
+            return
+        try:
+            self._handle.seek(offset)
+            self._handle.write(data)
+            self._handle.seek(0, os.SEEK_END)
+        except OSError as exc:
+            LOGGER.warning("Voice cache write failed (%s): %s", self.tmp_name, exc)
+            self._failed = True
+
+    def _close(self) -> bool:
+        if self._handle is None:
+            return False
+        try:
+            self._handle.close()
+        except OSError:
+            self._failed = True
+        self._handle = None
+        return not self._failed
+
+    def commit(self) -> None:
+        if self._close() and self.size:
+            self._cache._commit(self)
+        else:
+            self.abort()
+
+    def abort(self) -> None:
+        self._close()
+        try:
+            os.unlink(self.tmp_name)
+        except OSError:
+            pass
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import AsyncIterator, Callable, List, Tuple
+
+LOGGER = logging.getLogger(__name__)
+MAX_PREFETCH_JOBS = 32
+PREFETCH_WORKERS = 2
+
+
+class VoiceJobCancelled(RuntimeError):
+    def __init__(self) -> None:
+        super().__init__("Voix du message abandonnee avant sa generation.")
+
+
+class VoiceJob:
+    # Audio of one message as the renderer produces it: the media type first, then the chunks.
+    # Readers on the event loop replay the chunks already produced, then follow the rest, so the
+    # browser can start playing before the clip is complete.
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._chunks: List[bytes] = []
+        self._wakers: List[Callable[[], None]] = []
+        self.mime_type = ""
+        self.effects_mixed = False
+        self.opened = False
+        self.done = False
+        self.error: BaseException | None = None
+        self.future: Future | None = None
+
+    def open(self, mime_type: str, effects_mixed: bool = False) -> None:
+        with self._lock:
+            self.mime_type = mime_type
+            self.effects_mixed = effects_mixed
+            self.opened = True
+            self._wake_unlocked()
+
+    def append(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        with self._lock:
+            self._chunks.append(chunk)
+            self._wake_unlocked()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        with self._lock:
+            if self.done:
+                return
+            self.done = True
+            self.error = error
+            self._wake_unlocked()
+
+    def audio(self) -> bytes:
+        with self._lock:
+            return b"".join(self._chunks)
+
+    def _wake_unlocked(self) -> None:
+        for wake in self._wakers:
+            wake()
+
+    def _watch(self) -> Tuple[Callable[[], None], asyncio.Event]:
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(changed.set)
+
+        with self._lock:
+            self._wakers.append(wake)
+        return wake, changed
+
+    def _unwatch(self, wake: Callable[[], None]) -> None:
+        with self._lock:
+            self._wakers.remove(wake)
+
+    async def wait_ready(self) -> None:
+        # Returns once the media type is known; raises the renderer's error if it failed first.
+        wake, changed = self._watch()
+        try:
+            while True:
+                with self._lock:
+                    if self.opened:
+                        return
+                    if self.done:
+                        raise self.error or VoiceJobCancelled()
+                    changed.clear()
+                await changed.wait()
+        finally:
+            self._unwatch(wake)
+
+    async def follow(self) -> AsyncIterator[bytes]:
+        wake, changed = self._watch()
+        try:
+            index = 0
+            while True:
+                with self._lock:
+                    pending = self._chunks[index:]
+                    index += len(pending)
+                    finished, error = self.done, self.error
+                    if not pending and not finished:
+                        changed.clear()
+                for chunk in pending:
+                    yield chunk
+                if finished and not pending:
+                    if error is not None:
+                        raise error
+                    return
+                if not pending:
+                    await changed.wait()
+        finally:
+            self._unwatch(wake)
+
+
+class VoicePrefetcher:
+    # Starts the voice of a victim message as soon as the engine commits it, keyed by message id,
+    # so the browser only has to fetch /api/voice/message/{id} instead of uploading the text again.
+
+    def __init__(
+        self,
+        render: Callable[[str, List[str], VoiceJob], None],
+        max_jobs: int = MAX_PREFETCH_JOBS,
+        workers: int = PREFETCH_WORKERS,
+    ) -> None:
+        self._render = render
+        self.max_jobs = max(1, max_jobs)
+        self._jobs: OrderedDict[str, VoiceJob] = OrderedDict()
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="voice-prefetch")
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def schedule(self, message_id: str, text: str, sound_effects: List[str] | None = None) -> VoiceJob | None:
+        with self._lock:
+            if not message_id:
+                return None
+            job = self._jobs.get(message_id)
+            if job is not None:
+                return job
+            job = VoiceJob()
+            job.future = self._executor.submit(self._run, job, text, list(sound_effects or []))
+            # A job cancelled before it started still has to release its readers.
+            job.future.add_done_callback(lambda future: future.cancelled() and job.finish(VoiceJobCancelled()))
+            self._jobs[message_id] = job
+            # Oldest turns go first; a finished clip stays reachable through the voice cache anyway.
+            while len(self._jobs) > self.max_jobs:
+                _old_id, old_job = self._jobs.popitem(last=False)
+                old_job.future.cancel()
+            return job
+
+    def _run(self, job: VoiceJob, text: str, sound_effects: List[str]) -> None:
+        try:
+            self._render(text, sound_effects, job)
+        except Exception as exc:
+            LOGGER.warning("Voice prefetch failed: %s", exc)
+            job.finish(exc)
+            raise
+        job.finish()
+
+    def get(self, message_id: str) -> VoiceJob | None:
+        with self._lock:
+            return self._jobs.get(message_id)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
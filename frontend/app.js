@@ -14,15 +14,20 @@ const scammerInput = document.getElementById("scammer-input");
 const proposalForm = document.getElementById("proposal-form");
 const proposalInput = document.getElementById("proposal-input");
 const resetBtn = document.getElementById("reset-btn");
+const scenarioSelect = document.getElementById("scenario-select");
 const selectChoicesBtn = document.getElementById("select-choices-btn");
 const simulateVoteBtn = document.getElementById("simulate-vote-btn");
 const SOUND_EFFECT_TAG_RE = /\[SOUND_EFFECT:\s*([A-Z_]+)\s*\]/gi;
+// Fingerprinted URLs injected by the server into index.html (long-lived browser caching).
+const ASSET_MANIFEST = readAssetManifest();
 const SOUND_EFFECT_AUDIO_MAP = {
-  DOG_BARKING: "/sounds/dog-barking.mp3",
-  DOORBELL: "/sounds/doorbell.mp3",
-  COUGHING_FIT: "/sounds/coughing.mp3",
-  TV_BACKGROUND_BFMTV: "/sounds/tvbackground.mp3",
+  DOG_BARKING: assetUrl("/sounds/dog-barking.mp3"),
+  DOORBELL: assetUrl("/sounds/doorbell.mp3"),
+  COUGHING_FIT: assetUrl("/sounds/coughing.mp3"),
+  TV_BACKGROUND_BFMTV: assetUrl("/sounds/tvbackground.mp3"),
 };
+// Effect id -> { url, volume, duration_ms } from /api/sounds/catalog; filled at startup.
+let soundCatalog = {};
 const SOUND_EFFECT_LABEL_MAP = {
   DOG_BARKING: "Son : Chien aboie",
   DOORBELL: "Son : Sonnette",
@@ -37,11 +42,15 @@ let pendingVictimCharQueue = "";
 let victimTypingIntervalId = null;
 let victimTypingDrainResolvers = [];
 let victimVoiceEnabled = false;
+let victimVoiceServerMix = false;
 let activeVictimAudio = null;
 let activeVictimAudioUrl = "";
 let activeEffectAudios = [];
 let activeEffectCueTimeoutIds = [];
 let lastSpokenVictimKey = "";
+// Voice request body -> cacheable GET URL announced by the server (Content-Location).
+const victimVoiceUrlCache = new Map();
+const MAX_VICTIM_VOICE_URLS = 200;
 let simulationStateVisible = false;
 let nextAudienceTrigger = 3;
 let audienceFlowInProgress = false;
@@ -99,6 +108,39 @@ async function parseHttpError(response) {
   return body || `Erreur HTTP ${response.status}`;
 }
 
+function readAssetManifest() {
+  const element = document.getElementById("asset-manifest");
+  if (!element) return {};
+  try {
+    return JSON.parse(element.textContent || "{}");
+  } catch {
+    return {};
+  }
+}
+
+function assetUrl(path) {
+  return ASSET_MANIFEST[path] || path;
+}
+
+function getSoundEffectSpec(effect) {
+  const entry = soundCatalog[effect];
+  return {
+    url: entry?.url || SOUND_EFFECT_AUDIO_MAP[effect] || "",
+    volume: Number.isFinite(entry?.volume) ? entry.volume : 0.85,
+    durationMs: Number.isFinite(entry?.duration_ms) ? entry.duration_ms : null,
+  };
+}
+
+async function loadSoundCatalog() {
+  try {
+    const catalog = await api("/api/sounds/catalog");
+    const entries = Array.isArray(catalog?.effects) ? catalog.effects : [];
+    soundCatalog = Object.fromEntries(entries.map((entry) => [normalizeSoundEffect(entry.id), entry]));
+  } catch {
+    soundCatalog = {};
+  }
+}
+
 function normalizeSoundEffect(effect) {
   return String(effect || "").trim().toUpperCase();
 }
@@ -170,7 +212,7 @@ function buildSoundCuePlan(message) {
     const plainSegment = stripSoundTagsForSpeech(content.slice(cursor, start));
     spokenCharsBefore += plainSegment.length;
     const effect = normalizeSoundEffect(effectRaw);
-    if (effect && SOUND_EFFECT_AUDIO_MAP[effect]) {
+    if (effect && getSoundEffectSpec(effect).url) {
       cues.push({
         effect,
         spokenCharsBefore,
@@ -188,7 +230,7 @@ function buildSoundCuePlan(message) {
 
   const fallbackEffects = getMessageSoundEffects(message);
   return fallbackEffects
-    .filter((effect) => SOUND_EFFECT_AUDIO_MAP[effect])
+    .filter((effect) => getSoundEffectSpec(effect).url)
     .map((effect) => ({ effect, spokenCharsBefore: 0, totalSpokenChars: 1 }));
 }
 
@@ -215,20 +257,25 @@ function waitForAudioMetadata(audio, timeoutMs = 1200) {
   });
 }
 
-async function scheduleSoundEffectsForMessage(voiceAudio, message) {
+async function scheduleSoundEffectsForMessage(voiceAudio, message, voiceDurationMs = null) {
   const cuePlan = buildSoundCuePlan(message);
   stopSoundEffectsPlayback();
   if (cuePlan.length === 0) {
     return false;
   }
 
-  await waitForAudioMetadata(voiceAudio);
-  const durationSec =
-    Number.isFinite(voiceAudio?.duration) && voiceAudio.duration > 0 ? voiceAudio.duration : null;
+  // The server announces the clip length, so the metadata wait is only needed without it.
+  let durationSec = Number.isFinite(voiceDurationMs) && voiceDurationMs > 0 ? voiceDurationMs / 1000 : null;
+  if (durationSec === null && voiceAudio) {
+    await waitForAudioMetadata(voiceAudio);
+    durationSec = Number.isFinite(voiceAudio.duration) && voiceAudio.duration > 0 ? voiceAudio.duration : null;
+  }
+  const withoutVoice = !voiceAudio && durationSec === null;
+  let previousEndMs = 0;
 
   for (const cue of cuePlan) {
-    const src = SOUND_EFFECT_AUDIO_MAP[cue.effect];
-    if (!src) continue;
+    const spec = getSoundEffectSpec(cue.effect);
+    if (!spec.url) continue;
 
     let delayMs;
     if (durationSec !== null) {
@@ -237,12 +284,17 @@ async function scheduleSoundEffectsForMessage(voiceAudio, message) {
       // Fallback when duration is unavailable: ~18 chars/sec.
       delayMs = cue.spokenCharsBefore * 55;
     }
+    if (withoutVoice && spec.durationMs !== null) {
+      // Nothing to sync with: effects play one after the other instead of on top of each other.
+      delayMs = Math.max(delayMs, previousEndMs);
+      previousEndMs = delayMs + spec.durationMs;
+    }
     const safeDelayMs = Math.max(0, Math.min(delayMs, 30000));
 
     const timeoutId = window.setTimeout(() => {
-      const fxAudio = new Audio(src);
+      const fxAudio = new Audio(spec.url);
       fxAudio.preload = "auto";
-      fxAudio.volume = cue.effect === "TV_BACKGROUND_BFMTV" ? 0.45 : 0.85;
+      fxAudio.volume = spec.volume;
       activeEffectAudios.push(fxAudio);
       fxAudio.play().catch((err) => {
         console.warn("Lecture d'effet sonore impossible:", err);
@@ -364,7 +416,7 @@ function completeAudienceFlow() {
 
 function victimMessageKey(msg) {
   if (!msg) return "";
-  return `${msg.timestamp || ""}|${msg.content || ""}`;
+  return msg.id || `${msg.timestamp || ""}|${msg.content || ""}`;
 }
 
 function getLatestVictimMessage(state) {
@@ -378,6 +430,32 @@ function getLatestVictimMessage(state) {
   return null;
 }
 
+async function fetchVictimVoice(body) {
+  const cachedUrl = victimVoiceUrlCache.get(body);
+  if (cachedUrl) {
+    // Served from the browser cache when the clip was already played.
+    const cachedResponse = await fetch(cachedUrl);
+    if (cachedResponse.ok) {
+      return cachedResponse;
+    }
+    victimVoiceUrlCache.delete(body);
+  }
+
+  const response = await fetch("/api/voice/victim", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body,
+  });
+  const location = response.ok ? response.headers.get("Content-Location") : null;
+  if (location) {
+    if (victimVoiceUrlCache.size >= MAX_VICTIM_VOICE_URLS) {
+      victimVoiceUrlCache.delete(victimVoiceUrlCache.keys().next().value);
+    }
+    victimVoiceUrlCache.set(body, location);
+  }
+  return response;
+}
+
 function stopVictimAudioPlayback() {
   if (activeVictimAudio) {
     activeVictimAudio.pause();
@@ -422,46 +500,87 @@ async function speakLatestVictimMessage(state) {
   }
 
   const textForSpeech = stripSoundTagsForSpeech(latestVictim.content);
-  const payloadText = textForSpeech || latestVictim.content;
-
-  let response;
-  try {
-    response = await fetch("/api/voice/victim", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ text: payloadText }),
-    });
-  } catch (err) {
-    console.warn("Voix victime indisponible:", err);
-    const playedEffects = await playEffectsWithoutVoice();
-    if (playedEffects) {
-      lastSpokenVictimKey = key;
+  // In server mix mode the tags stay in the text so the backend can place each effect.
+  const voicePayload = victimVoiceServerMix
+    ? {
+        text: latestVictim.content,
+        mix_effects: true,
+        sound_effects: getMessageSoundEffects(latestVictim),
+      }
+    : { text: textForSpeech || latestVictim.content };
+
+  const streamUrl = `/api/voice/victim/stream?text=${encodeURIComponent(voicePayload.text)}`;
+  // The server starts this voice when it commits the reply; the id is enough to fetch it.
+  const messageVoiceUrl = latestVictim.id ? `/api/voice/message/${encodeURIComponent(latestVictim.id)}` : "";
+  let audioSrc = "";
+  let effectsMixed = false;
+  let voiceDurationMs = null;
+  if (messageVoiceUrl) {
+    // The metadata answers once the voice is ready; the audio element then fetches the clip
+    // itself, once, while the server is still streaming it.
+    try {
+      const response = await fetch(`${messageVoiceUrl}/meta`);
+      if (response.ok) {
+        const meta = await response.json();
+        effectsMixed = Boolean(meta.effects_mixed);
+        voiceDurationMs = Number(meta.duration_ms) || null;
+        audioSrc = messageVoiceUrl;
+      } else {
+        const detail = await parseHttpError(response).catch(() => `Erreur HTTP ${response.status}`);
+        console.warn("Voix du message indisponible, synthese directe:", detail);
+      }
+    } catch (err) {
+      console.warn("Voix du message indisponible, synthese directe:", err);
     }
-    return false;
   }
 
-  if (!response.ok) {
-    const detail = await parseHttpError(response).catch(() => `Erreur HTTP ${response.status}`);
-    console.warn("Synthese vocale victime impossible:", detail);
-    const playedEffects = await playEffectsWithoutVoice();
-    if (playedEffects) {
-      lastSpokenVictimKey = key;
+  if (!audioSrc && victimVoiceServerMix) {
+    // Fetched whole to read X-Sound-Effects-Mixed and X-Audio-Duration-Ms before playback.
+    let response;
+    try {
+      response = await fetchVictimVoice(JSON.stringify(voicePayload));
+    } catch (err) {
+      console.warn("Voix victime indisponible:", err);
+      const playedEffects = await playEffectsWithoutVoice();
+      if (playedEffects) {
+        lastSpokenVictimKey = key;
+      }
+      return false;
     }
-    return false;
-  }
 
-  const blob = await response.blob().catch(() => null);
-  if (!blob || blob.size === 0) {
-    const playedEffects = await playEffectsWithoutVoice();
-    if (playedEffects) {
-      lastSpokenVictimKey = key;
+    if (!response.ok) {
+      const detail = await parseHttpError(response).catch(() => `Erreur HTTP ${response.status}`);
+      console.warn("Synthese vocale victime impossible:", detail);
+      const playedEffects = await playEffectsWithoutVoice();
+      if (playedEffects) {
+        lastSpokenVictimKey = key;
+      }
+      return false;
     }
-    return false;
+
+    effectsMixed = response.headers.get("X-Sound-Effects-Mixed") === "1";
+    voiceDurationMs = Number(response.headers.get("X-Audio-Duration-Ms")) || null;
+    const blob = await response.blob().catch(() => null);
+    if (!blob || blob.size === 0) {
+      const playedEffects = await playEffectsWithoutVoice();
+      if (playedEffects) {
+        lastSpokenVictimKey = key;
+      }
+      return false;
+    }
+    audioSrc = URL.createObjectURL(blob);
+  } else if (!audioSrc) {
+    // Streamed WAV: playback starts with the first PCM chunk instead of the whole clip.
+    audioSrc = streamUrl;
   }
 
   stopVictimAudioPlayback();
-  activeVictimAudioUrl = URL.createObjectURL(blob);
-  activeVictimAudio = new Audio(activeVictimAudioUrl);
+  if (audioSrc.startsWith("blob:")) {
+    activeVictimAudioUrl = audioSrc;
+  }
+  // Streamed clips announce no real duration until they are complete.
+  const streamed = !audioSrc.startsWith("blob:") && !voiceDurationMs;
+  activeVictimAudio = new Audio(audioSrc);
   activeVictimAudio.preload = "auto";
   activeVictimAudio.onended = () => {
     stopVictimAudioPlayback();
@@ -475,7 +594,12 @@ async function speakLatestVictimMessage(state) {
   try {
     await activeVictimAudio.play();
     lastSpokenVictimKey = key;
-    void scheduleSoundEffectsForMessage(activeVictimAudio, latestVictim).catch((err) => {
+    if (effectsMixed) {
+      stopSoundEffectsPlayback();
+      return true;
+    }
+    // A streamed WAV announces no real duration, so effects use the speech-rate estimate.
+    void scheduleSoundEffectsForMessage(streamed ? null : activeVictimAudio, latestVictim, voiceDurationMs).catch((err) => {
       console.warn("Planification des effets sonores impossible:", err);
     });
     return true;
@@ -569,12 +693,52 @@ function parseSseBlock(block) {
   }
 }
 
+const STEP_STREAM_RETRIES = 2;
+
+function newIdempotencyKey() {
+  if (window.crypto && typeof window.crypto.randomUUID === "function") {
+    return window.crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
 async function streamSimulationStep(message) {
-  const response = await fetch("/api/simulation/step/stream", {
-    method: "POST",
-    headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
-    body: JSON.stringify({ scammer_input: message }),
-  });
+  // Same key on every retry: the server replays or follows the turn instead of running it again.
+  const idempotencyKey = newIdempotencyKey();
+  for (let attempt = 0; ; attempt += 1) {
+    try {
+      await readSimulationStepStream(message, idempotencyKey);
+      return;
+    } catch (err) {
+      if (!err.retryable || attempt >= STEP_STREAM_RETRIES) {
+        throw err;
+      }
+      await new Promise((resolve) => window.setTimeout(resolve, 500 * (attempt + 1)));
+    }
+  }
+}
+
+function retryableStreamError(err) {
+  const error = err instanceof Error ? err : new Error(String(err));
+  error.retryable = true;
+  return error;
+}
+
+async function readSimulationStepStream(message, idempotencyKey) {
+  let response;
+  try {
+    response = await fetch("/api/simulation/step/stream", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        Accept: "text/event-stream",
+        "Idempotency-Key": idempotencyKey,
+      },
+      body: JSON.stringify({ scammer_input: message }),
+    });
+  } catch (err) {
+    throw retryableStreamError(err);
+  }
 
   if (!response.ok) {
     throw new Error(await parseHttpError(response));
@@ -591,7 +755,13 @@ async function streamSimulationStep(message) {
   let streamError = "";
 
   while (true) {
-    const { value, done } = await reader.read();
+    let chunk;
+    try {
+      chunk = await reader.read();
+    } catch (err) {
+      throw retryableStreamError(err);
+    }
+    const { value, done } = chunk;
     if (done) {
       break;
     }
@@ -643,7 +813,7 @@ async function streamSimulationStep(message) {
     throw new Error(streamError);
   }
   if (!doneEventReceived) {
-    throw new Error("Flux interrompu avant la fin de la réponse.");
+    throw retryableStreamError("Flux interrompu avant la fin de la réponse.");
   }
 }
 
@@ -797,8 +967,28 @@ function renderChoices(choices) {
   });
 }
 
+function renderScenarioOptions(state) {
+  if (!scenarioSelect) return;
+  const scenarios = Array.isArray(state?.available_scenarios) ? state.available_scenarios : [];
+  const signature = scenarios.map((item) => item.key).join("|");
+  if (scenarioSelect.dataset.signature !== signature) {
+    scenarioSelect.replaceChildren();
+    for (const scenario of scenarios) {
+      const option = document.createElement("option");
+      option.value = scenario.key;
+      option.textContent = scenario.name || scenario.key;
+      scenarioSelect.appendChild(option);
+    }
+    scenarioSelect.dataset.signature = signature;
+  }
+  if (document.activeElement !== scenarioSelect && state?.scenario_name) {
+    scenarioSelect.value = state.scenario_name;
+  }
+}
+
 function render() {
   if (!currentState) return;
+  renderScenarioOptions(currentState);
   llmProvider.textContent = currentState.llm_provider || (currentState.llm_enabled ? "configuré" : "aucun");
   audienceConstraint.textContent = currentState.audience_constraint || "Aucune";
   winnerLabel.textContent = currentState.last_winner
@@ -811,14 +1001,18 @@ function render() {
 }
 
 async function refreshState() {
+  const catalogLoaded = loadSoundCatalog();
   try {
     const health = await api("/api/health");
     victimVoiceEnabled = Boolean(health?.victim_voice_enabled);
+    victimVoiceServerMix = Boolean(health?.victim_voice_server_mix);
   } catch {
     victimVoiceEnabled = false;
+    victimVoiceServerMix = false;
   }
 
   currentState = await api("/api/simulation/state");
+  await catalogLoaded;
   stopSoundEffectsPlayback();
   const latestVictim = getLatestVictimMessage(currentState);
   lastSpokenVictimKey = victimMessageKey(latestVictim);
@@ -907,9 +1101,10 @@ simulateVoteBtn.addEventListener("click", async () => {
 resetBtn.addEventListener("click", async () => {
   try {
     await withButtonLoading(resetBtn, async () => {
+      const scenario = scenarioSelect?.value || null;
       currentState = await api("/api/simulation/reset", {
         method: "POST",
-        body: JSON.stringify({}),
+        body: JSON.stringify({ scenario }),
       });
       pendingScammerMessage = "";
       pendingVictimMessage = "";
@@ -0,0 +1,289 @@
+"""Audience load generator: thousands of async clients against a running app.
+
+Usage:
+    TRANSCRIPTS_FILE= uvicorn app.main:app --port 8000
+    python scripts/audience_loadgen.py --clients 2000 --duration 60 --output loadgen.json
+
+Each simulated spectator submits proposals and votes at Poisson-distributed intervals and polls
+the state endpoint; a host task triggers the moderator selection periodically, as the show does.
+Proposals are misspelled with the moderator's own typo map (inverted) and repeated the way a
+crowd repeats popular ideas. The same --seed replays the same crowd.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BASE_PROPOSALS = (
+    "Demander de répéter le numéro de dossier",
+    "Dire que le téléphone est en panne",
+    "Faire semblant de télécharger le logiciel",
+    "Exiger une preuve de votre identité",
+    "Parler du problème de sécurité de la banque",
+    "Dire que le code reçu ne marche pas",
+    "Demander des précisions sur le remboursement",
+    "Passer le téléphone au voisin",
+    "Raconter ses vacances du mois d'août",
+    "Demander si ça peut attendre demain",
+    "Dire que la carte est déjà bloquée",
+    "Faire semblant de ne pas trouver ses lunettes",
+    "Proposer un nouvel appel au service client officiel",
+    "Dire que l'accès internet est coupé",
+    "Demander qui vous êtes exactement",
+    "Faire très peur avec le chien qui aboie",
+)
+METRIC_LINE_RE = re.compile(r'^scam_queue_depth\{queue="([^"]+)",state="([^"]+)"\}\s+(\S+)$', re.MULTILINE)
+TOKEN_RE = re.compile(r"\w+|\W+")
+
+
+def _typo_variants() -> Dict[str, List[str]]:
+    # The moderator's map is wrong -> right; a crowd goes the other way.
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from app.agents import AudienceModeratorAgent
+
+    variants: Dict[str, List[str]] = defaultdict(list)
+    for wrong, right in AudienceModeratorAgent._build_known_typo_corrections().items():
+        if wrong != right.lower():
+            variants[right.lower()].append(wrong)
+    return dict(variants)
+
+
+class Crowd:
+    # Proposal generator shared by every client; each draw uses the caller's own Random.
+
+    def __init__(self, typo_rate: float, duplicate_rate: float, zipf_s: float) -> None:
+        self.typo_rate = typo_rate
+        self.duplicate_rate = duplicate_rate
+        self.variants = _typo_variants()
+        # Popularity of base ideas follows a Zipf law: a few ideas dominate, as in a real room.
+        self.weights = [1.0 / (rank + 1) ** zipf_s for rank in range(len(BASE_PROPOSALS))]
+        self.recent: List[str] = []
+
+    def _misspell(self, text: str, rng: random.Random) -> str:
+        out = []
+        for token in TOKEN_RE.findall(text):
+            options = self.variants.get(token.lower())
+            if options and rng.random() < self.typo_rate:
+                wrong = rng.choice(options)
+                token = wrong.capitalize() if token[:1].isupper() else wrong
+            out.append(token)
+        return "".join(out)
+
+    def proposal(self, rng: random.Random) -> str:
+        if self.recent and rng.random() < self.duplicate_rate:
+            # Verbatim resubmission of something already on screen.
+            return rng.choice(self.recent)
+        base = rng.choices(BASE_PROPOSALS, weights=self.weights)[0]
+        text = self._misspell(base, rng)
+        self.recent.append(text)
+        if len(self.recent) > 64:
+            del self.recent[0]
+        return text
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.queue_samples: List[Dict[str, object]] = []
+
+    def add(self, endpoint: str, elapsed_ms: float, status: str) -> None:
+        self.latencies[endpoint].append(elapsed_ms)
+        self.statuses[endpoint][status] += 1
+
+
+def _summary(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {"count": 0}
+
+    def pct(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+async def _request(client: httpx.AsyncClient, stats: Stats, endpoint: str, method: str, path: str, **kwargs) -> httpx.Response | None:
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, path, **kwargs)
+    except httpx.HTTPError as exc:
+        stats.add(endpoint, 1000.0 * (time.perf_counter() - started), type(exc).__name__)
+        return None
+    stats.add(endpoint, 1000.0 * (time.perf_counter() - started), str(response.status_code))
+    return response
+
+
+async def _every(rate: float, rng: random.Random, deadline: float) -> None:
+    # Exponential gaps give a Poisson arrival process at `rate` events per second.
+    await asyncio.sleep(min(rng.expovariate(rate), max(0.0, deadline - time.monotonic())))
+
+
+async def spectator(index: int, args: argparse.Namespace, client: httpx.AsyncClient, crowd: Crowd, stats: Stats, deadline: float) -> None:
+    rng = random.Random(args.seed * 1_000_003 + index)
+    # Per-client rates: the crowd-wide rates spread over every client.
+    submit_rate = args.submit_rate / args.clients
+    vote_rate = args.vote_rate / args.clients
+    poll_rate = args.poll_rate / args.clients
+    total = submit_rate + vote_rate + poll_rate
+    if total <= 0:
+        return
+    await asyncio.sleep(rng.uniform(0.0, args.ramp_up))
+    while time.monotonic() < deadline:
+        await _every(total, rng, deadline)
+        if time.monotonic() >= deadline:
+            break
+        pick = rng.random() * total
+        if pick < submit_rate:
+            await _request(client, stats, "submit", "POST", "/api/audience/submit", json={"proposal": crowd.proposal(rng)})
+        elif pick < submit_rate + vote_rate:
+            await _request(client, stats, "vote", "POST", "/api/audience/vote", json={"winner_index": rng.randrange(3)})
+        else:
+            await _request(client, stats, "state", "GET", "/api/simulation/state")
+
+
+async def host(args: argparse.Namespace, client: httpx.AsyncClient, stats: Stats, deadline: float) -> None:
+    while time.monotonic() + args.select_interval < deadline:
+        await asyncio.sleep(args.select_interval)
+        await _request(client, stats, "select", "POST", "/api/audience/select", json={})
+
+
+async def monitor(args: argparse.Namespace, client: httpx.AsyncClient, stats: Stats, deadline: float) -> None:
+    started = time.monotonic()
+    while True:
+        sample: Dict[str, object] = {"t_s": round(time.monotonic() - started, 3)}
+        try:
+            metrics = (await client.get("/api/metrics")).text
+            for queue, state_name, value in METRIC_LINE_RE.findall(metrics):
+                sample[f"{queue}.{state_name}"] = float(value)
+        except httpx.HTTPError as exc:
+            sample["error"] = type(exc).__name__
+        stats.queue_samples.append(sample)
+        if time.monotonic() >= deadline:
+            return
+        await asyncio.sleep(min(args.sample_interval, max(0.0, deadline - time.monotonic())))
+
+
+def _queue_growth(samples: List[Dict[str, object]]) -> Dict[str, Dict[str, float]]:
+    series: Dict[str, List[tuple]] = defaultdict(list)
+    for sample in samples:
+        for key, value in sample.items():
+            if key != "t_s" and isinstance(value, (int, float)):
+                series[key].append((float(sample["t_s"]), float(value)))
+    growth: Dict[str, Dict[str, float]] = {}
+    for key, points in series.items():
+        (t0, first), (t1, last) = points[0], points[-1]
+        growth[key] = {
+            "start": first,
+            "max": max(value for _, value in points),
+            "end": last,
+            "per_s": round((last - first) / (t1 - t0), 3) if t1 > t0 else 0.0,
+        }
+    return growth
+
+
+def _report(args: argparse.Namespace, stats: Stats, wall_s: float) -> Dict[str, object]:
+    endpoints: Dict[str, object] = {}
+    for endpoint, samples in sorted(stats.latencies.items()):
+        statuses = dict(stats.statuses[endpoint])
+        # 4xx are the server refusing out-of-phase actions (vote before select...); errors are
+        # 5xx and transport failures.
+        errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500)
+        rejected = sum(count for status, count in statuses.items() if status.isdigit() and 400 <= int(status) < 500)
+        endpoints[endpoint] = {
+            "latency": _summary(samples),
+            "requests_per_s": round(len(samples) / wall_s, 3) if wall_s else 0.0,
+            "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+            "rejected_rate": round(rejected / len(samples), 4) if samples else 0.0,
+            "statuses": statuses,
+        }
+    return {
+        "meta": {
+            "created_at": datetime.now(tz=timezone.utc).isoformat(),
+            "base_url": args.base_url,
+            "clients": args.clients,
+            "duration_s": args.duration,
+            "seed": args.seed,
+            "submit_rate": args.submit_rate,
+            "vote_rate": args.vote_rate,
+            "poll_rate": args.poll_rate,
+            "typo_rate": args.typo_rate,
+            "duplicate_rate": args.duplicate_rate,
+        },
+        "results": {
+            "wall_s": round(wall_s, 3),
+            "endpoints": endpoints,
+            "queue_growth": _queue_growth(stats.queue_samples),
+        },
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, object]:
+    crowd = Crowd(args.typo_rate, args.duplicate_rate, args.zipf)
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        if args.reset:
+            await client.post("/api/simulation/reset", json={})
+        started = time.monotonic()
+        deadline = started + args.duration
+        tasks = [spectator(i, args, client, crowd, stats, deadline) for i in range(args.clients)]
+        tasks.append(host(args, client, stats, deadline))
+        tasks.append(monitor(args, client, stats, deadline))
+        await asyncio.gather(*tasks)
+        wall_s = time.monotonic() - started
+    return _report(args, stats, wall_s)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Simulate an audience crowd against a running app.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=1000, help="Simulated spectators.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load.")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Seconds over which clients join.")
+    parser.add_argument("--submit-rate", type=float, default=50.0, help="Proposals per second, whole crowd.")
+    parser.add_argument("--vote-rate", type=float, default=20.0, help="Votes per second, whole crowd.")
+    parser.add_argument("--poll-rate", type=float, default=100.0, help="State polls per second, whole crowd.")
+    parser.add_argument("--select-interval", type=float, default=10.0, help="Seconds between moderator selections.")
+    parser.add_argument("--typo-rate", type=float, default=0.3, help="Chance to misspell each word the typo map knows.")
+    parser.add_argument("--duplicate-rate", type=float, default=0.25, help="Chance to resubmit a recent proposal verbatim.")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of idea popularity.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between queue samples.")
+    parser.add_argument("--no-reset", dest="reset", action="store_false", help="Keep the current show state.")
+    parser.add_argument("--output", help="JSON results file (default: stdout).")
+    args = parser.parse_args()
+    if args.clients < 1:
+        parser.error("--clients doit etre positif.")
+
+    report = asyncio.run(run(args))
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
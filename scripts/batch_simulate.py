@@ -0,0 +1,206 @@
+"""Batch offline simulation: scripted scammer dialogues through the engine, no web server.
+
+Usage:
+    python scripts/batch_simulate.py dialogues.jsonl --output transcripts.jsonl --workers 8
+    python scripts/batch_simulate.py dialogues.jsonl --output transcripts.jsonl --resume
+
+Input is JSON lines, one dialogue each:
+    {"id": "tech-001", "scenario": "tech_support_microsoft",
+     "turns": ["Bonjour, ici Microsoft.", {"scammer": "Installez AnyDesk.", "audience": "Le chien aboie."}]}
+
+A turn given as an object may carry an audience constraint, selected and voted before the
+turn as the show does. Each worker process builds its agents (and their LLM clients) once and
+reuses them for every dialogue it runs; finished transcripts are appended to --output as they
+complete. With --resume, dialogues already written successfully are skipped.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Set
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Per-process agents, built by _init_worker.
+_WORKER: Dict[str, object] = {}
+
+
+def _init_worker() -> None:
+    from app.agents import AudienceModeratorAgent, DirectorAgent, VictimAgent
+    from app.config import get_settings
+    from app.scenario import load_scenarios
+
+    settings = get_settings()
+    _WORKER.update(
+        settings=settings,
+        director=DirectorAgent(settings),
+        moderator=AudienceModeratorAgent(settings),
+        victim=VictimAgent(settings),
+        scenarios=load_scenarios(settings.scenario_packs_dir),
+    )
+
+
+def _turn_fields(turn: object) -> tuple:
+    if isinstance(turn, dict):
+        return str(turn.get("scammer") or ""), str(turn.get("audience") or "")
+    return str(turn), ""
+
+
+def run_dialogue(dialogue: Dict[str, object], stream: bool = False) -> Dict[str, object]:
+    from app.state import SimulationEngine
+
+    engine = SimulationEngine(
+        _WORKER["settings"],
+        director=_WORKER["director"],
+        moderator=_WORKER["moderator"],
+        victim=_WORKER["victim"],
+        scenarios=_WORKER["scenarios"],
+    )
+    result: Dict[str, object] = {"id": dialogue["id"], "scenario": dialogue.get("scenario") or engine.default_scenario_key}
+    turns: List[Dict[str, object]] = []
+    started = time.perf_counter()
+    try:
+        snapshot = engine.reset(dialogue.get("scenario") or None)
+        for scammer_input, audience in (_turn_fields(turn) for turn in dialogue.get("turns") or []):
+            if audience:
+                engine.select_choices([audience])
+                engine.vote_choice(0)
+            turn_started = time.perf_counter()
+            if stream:
+                snapshot = engine.step_stream(scammer_input, on_text_chunk=lambda _chunk: None)
+            else:
+                snapshot = engine.step(scammer_input)
+            reply = snapshot["messages"][-1]
+            turns.append(
+                {
+                    "scammer": scammer_input,
+                    "audience": audience,
+                    "victim": reply["content"],
+                    "sound_effects": reply["sound_effects"],
+                    "stage_name": snapshot["stage_name"],
+                    "elapsed_ms": round(1000.0 * (time.perf_counter() - turn_started), 3),
+                }
+            )
+        result.update(status="ok", final_stage=snapshot["stage_name"], messages=snapshot["messages"])
+    except Exception as exc:
+        result.update(status="error", error=f"{type(exc).__name__}: {exc}")
+    result["turns"] = turns
+    result["elapsed_ms"] = round(1000.0 * (time.perf_counter() - started), 3)
+    result["worker_pid"] = os.getpid()
+    return result
+
+
+def load_dialogues(path: Path) -> Iterator[Dict[str, object]]:
+    with path.open("r", encoding="utf-8") as handle:
+        for line_no, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            dialogue = json.loads(line)
+            if isinstance(dialogue, list):
+                dialogue = {"turns": dialogue}
+            dialogue.setdefault("id", f"line-{line_no}")
+            dialogue["id"] = str(dialogue["id"])
+            yield dialogue
+
+
+def finished_ids(path: Path) -> Set[str]:
+    # Errors are not counted as finished: a resumed batch retries them. A line cut short by an
+    # interrupted run does not parse and is ignored.
+    done: Set[str] = set()
+    if not path.is_file():
+        return done
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done.add(str(record.get("id")))
+    return done
+
+
+def _open_output(path: Path, resume: bool):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not resume:
+        return path.open("w", encoding="utf-8")
+    handle = path.open("a+", encoding="utf-8")
+    # Terminate a partial last line so the next record starts clean.
+    if handle.tell() > 0:
+        handle.seek(handle.tell() - 1)
+        if handle.read(1) != "\n":
+            handle.write("\n")
+    return handle
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run scripted scammer dialogues through the engine in parallel.")
+    parser.add_argument("scripts", help="Dialogues file (JSON lines).")
+    parser.add_argument("--output", required=True, help="Transcripts file (JSON lines), appended as dialogues finish.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--resume", action="store_true", help="Skip dialogues already in --output.")
+    parser.add_argument("--limit", type=int, default=0, help="Run at most N dialogues (0 = all).")
+    parser.add_argument("--stream", action="store_true", help="Drive turns through step_stream, as the SSE endpoint does.")
+    parser.add_argument("--provider", help="Overrides LLM_PROVIDER (e.g. fake, replay through LLM_CASSETTE_MODE).")
+    args = parser.parse_args()
+
+    if args.provider:
+        os.environ["LLM_PROVIDER"] = args.provider
+    # Workers run concurrently: shared trace export or archive files would interleave their writes.
+    os.environ["TRACE_EXPORT_FILE"] = ""
+    os.environ["TRANSCRIPTS_FILE"] = ""
+    output = Path(args.output)
+    skip = finished_ids(output) if args.resume else set()
+    pending = (dialogue for dialogue in load_dialogues(Path(args.scripts)) if dialogue["id"] not in skip)
+
+    counts = {"ok": 0, "error": 0, "skipped": len(skip)}
+    started = time.perf_counter()
+    # Spawned workers start clean, without copies of the parent's threads or open clients.
+    context = multiprocessing.get_context("spawn")
+    with _open_output(output, args.resume) as sink, ProcessPoolExecutor(
+        max_workers=max(1, args.workers), mp_context=context, initializer=_init_worker
+    ) as pool:
+        # A bounded window of in-flight dialogues keeps memory flat on very large batches.
+        window = max(1, args.workers) * 4
+        in_flight: Set[Future] = set()
+        submitted = 0
+        for dialogue in pending:
+            if args.limit and submitted >= args.limit:
+                break
+            in_flight.add(pool.submit(run_dialogue, dialogue, args.stream))
+            submitted += 1
+            if len(in_flight) >= window:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                _write_done(done, sink, counts)
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            _write_done(done, sink, counts)
+
+    elapsed = time.perf_counter() - started
+    ran = counts["ok"] + counts["error"]
+    print(
+        f"{counts['ok']} ok, {counts['error']} en erreur, {counts['skipped']} deja faits "
+        f"en {elapsed:.1f}s ({ran / elapsed if elapsed else 0.0:.2f} dialogues/s)",
+        file=sys.stderr,
+    )
+    return 1 if counts["error"] else 0
+
+
+def _write_done(done: Set[Future], sink, counts: Dict[str, int]) -> None:
+    for future in done:
+        record = future.result()
+        counts[record["status"]] += 1
+        sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # One flush per transcript: an interrupted batch loses at most the dialogues in flight.
+        sink.flush()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
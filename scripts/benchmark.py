@@ -0,0 +1,283 @@
+"""Offline benchmark of the simulation loop against the fake LLM provider.
+
+Usage:
+    python scripts/benchmark.py --output bench.json
+    python scripts/benchmark.py --compare bench-before.json --output bench-after.json
+
+Everything runs in-process: no network, no TTS. Results are written as JSON so two commits can
+be compared with --compare.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCAMMER_LINES = (
+    "Bonjour, ici le support technique Microsoft.",
+    "Votre ordinateur est infecte par un virus dangereux.",
+    "Il faut installer AnyDesk pour que je puisse vous aider.",
+    "Donnez-moi le code recu par SMS pour confirmer.",
+    "C'est urgent, votre compte sera bloque maintenant.",
+    "J'ai besoin du numero de votre carte bancaire.",
+)
+
+
+def _configure_environment(args: argparse.Namespace) -> None:
+    # Must run before the app is imported: settings are read once, at import time.
+    os.environ.update(
+        {
+            "LLM_PROVIDER": "fake",
+            "VICTIM_VOICE_ENABLED": "false",
+            "FAKE_LLM_TTFT_MS": str(args.ttft_ms),
+            "FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+            "FAKE_LLM_TOOL_CALL_RATE": str(args.tool_call_rate),
+            "FAKE_LLM_ERROR_RATE": str(args.error_rate),
+            "FAKE_LLM_SEED": str(args.seed),
+            "TRACE_EXPORT_FILE": "",
+            "TRANSCRIPTS_FILE": "",
+        }
+    )
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def _summary(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {"count": 0}
+
+    def pct(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def _timed_ms(action: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    action()
+    return 1000.0 * (time.perf_counter() - started)
+
+
+def bench_step_latency(engine_factory: Callable[[], object], turns: int) -> Dict[str, object]:
+    engine = engine_factory()
+    samples = [_timed_ms(lambda i=i: engine.step(SCAMMER_LINES[i % len(SCAMMER_LINES)])) for i in range(turns)]
+    return _summary(samples)
+
+
+def bench_stream_first_token(engine_factory: Callable[[], object], turns: int) -> Dict[str, object]:
+    engine = engine_factory()
+    first_chunk_ms: List[float] = []
+    total_ms: List[float] = []
+    for i in range(turns):
+        started = time.perf_counter()
+        first: List[float] = []
+
+        def on_chunk(_chunk: str) -> None:
+            if not first:
+                first.append(1000.0 * (time.perf_counter() - started))
+
+        engine.step_stream(SCAMMER_LINES[i % len(SCAMMER_LINES)], on_text_chunk=on_chunk)
+        total_ms.append(1000.0 * (time.perf_counter() - started))
+        if first:
+            first_chunk_ms.append(first[0])
+    return {"first_chunk": _summary(first_chunk_ms), "total": _summary(total_ms)}
+
+
+def bench_http_stream_first_token(client: object, turns: int) -> Dict[str, object]:
+    first_event_ms: List[float] = []
+    for i in range(turns):
+        started = time.perf_counter()
+        body = {"scammer_input": SCAMMER_LINES[i % len(SCAMMER_LINES)]}
+        with client.stream("POST", "/api/simulation/step/stream", json=body) as response:
+            seen = False
+            for line in response.iter_lines():
+                if not seen and line.startswith("event: chunk"):
+                    first_event_ms.append(1000.0 * (time.perf_counter() - started))
+                    seen = True
+    return _summary(first_event_ms)
+
+
+def bench_snapshot(engine_factory: Callable[[], object], history_turns: int, iterations: int) -> Dict[str, object]:
+    engine = engine_factory()
+    for i in range(history_turns):
+        engine.step(SCAMMER_LINES[i % len(SCAMMER_LINES)])
+    started = time.perf_counter()
+    for _ in range(iterations):
+        engine.snapshot()
+    elapsed = time.perf_counter() - started
+    return {
+        "messages": len(engine.state.messages),
+        "iterations": iterations,
+        "per_call_us": round(1e6 * elapsed / iterations, 3),
+    }
+
+
+def bench_concurrent_sessions(engine_factory: Callable[[], object], sessions: int, turns: int) -> Dict[str, object]:
+    # One engine per session, each driven by its own thread: measures how well independent
+    # conversations overlap inside one process.
+    engines = [engine_factory() for _ in range(sessions)]
+
+    def run(engine: object) -> List[float]:
+        return [_timed_ms(lambda i=i: engine.step(SCAMMER_LINES[i % len(SCAMMER_LINES)])) for i in range(turns)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        per_session = list(pool.map(run, engines))
+    elapsed = time.perf_counter() - started
+    samples = [sample for session in per_session for sample in session]
+    return {
+        "sessions": sessions,
+        "turns": len(samples),
+        "wall_s": round(elapsed, 3),
+        "turns_per_s": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+        "step": _summary(samples),
+    }
+
+
+def bench_http_concurrent(client: object, clients: int, turns: int) -> Dict[str, object]:
+    # Same shared engine for every client, as in a live show.
+    def run(index: int) -> List[float]:
+        return [
+            _timed_ms(
+                lambda i=i: client.post(
+                    "/api/simulation/step", json={"scammer_input": SCAMMER_LINES[(index + i) % len(SCAMMER_LINES)]}
+                )
+            )
+            for i in range(turns)
+        ]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        per_client = list(pool.map(run, range(clients)))
+    elapsed = time.perf_counter() - started
+    samples = [sample for batch in per_client for sample in batch]
+    return {
+        "clients": clients,
+        "requests": len(samples),
+        "wall_s": round(elapsed, 3),
+        "requests_per_s": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+        "latency": _summary(samples),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def _flatten(prefix: str, value: object, out: Dict[str, float]) -> None:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = float(value)
+
+
+def compare(baseline: Dict[str, object], current: Dict[str, object]) -> List[str]:
+    before: Dict[str, float] = {}
+    after: Dict[str, float] = {}
+    _flatten("", baseline.get("results", {}), before)
+    _flatten("", current.get("results", {}), after)
+    lines = [f"{'metric':60} {'before':>12} {'after':>12} {'change':>9}"]
+    for key in sorted(before.keys() & after.keys()):
+        if not key.endswith(("_ms", "_us", "_per_s")):
+            continue
+        old, new = before[key], after[key]
+        change = f"{100.0 * (new - old) / old:+.1f}%" if old else "n/a"
+        lines.append(f"{key:60} {old:12.3f} {new:12.3f} {change:>9}")
+    return lines
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the simulation loop with the fake LLM provider.")
+    parser.add_argument("--turns", type=int, default=30, help="Turns per latency benchmark.")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions / HTTP clients.")
+    parser.add_argument("--session-turns", type=int, default=10, help="Turns per concurrent session.")
+    parser.add_argument("--snapshot-history", type=int, default=40, help="Turns played before timing snapshots.")
+    parser.add_argument("--snapshot-iterations", type=int, default=2000)
+    parser.add_argument("--ttft-ms", type=float, default=20.0)
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--tool-call-rate", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON results file (default: stdout).")
+    parser.add_argument("--compare", help="Previous results file to diff against.")
+    args = parser.parse_args()
+
+    _configure_environment(args)
+    from fastapi.testclient import TestClient
+
+    from app.config import get_settings
+    from app.main import app
+    from app.state import SimulationEngine
+
+    settings = get_settings()
+
+    def engine_factory() -> SimulationEngine:
+        return SimulationEngine(settings)
+
+    results: Dict[str, object] = {}
+    results["step_latency"] = bench_step_latency(engine_factory, args.turns)
+    results["stream_first_token"] = bench_stream_first_token(engine_factory, args.turns)
+    results["snapshot"] = bench_snapshot(engine_factory, args.snapshot_history, args.snapshot_iterations)
+    results["concurrent_sessions"] = bench_concurrent_sessions(engine_factory, args.sessions, args.session_turns)
+    with TestClient(app) as client:
+        client.post("/api/simulation/reset", json={})
+        results["http_stream_first_event"] = bench_http_stream_first_token(client, args.turns)
+        client.post("/api/simulation/reset", json={})
+        results["http_concurrent"] = bench_http_concurrent(client, args.sessions, args.session_turns)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(tz=timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fake_llm": {
+                "ttft_ms": args.ttft_ms,
+                "tokens_per_second": args.tokens_per_second,
+                "tool_call_rate": args.tool_call_rate,
+                "error_rate": args.error_rate,
+                "seed": args.seed,
+            },
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print("\n".join(compare(baseline, report)), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())